@@ -0,0 +1,78 @@
+import time
+
+# Intervals (seconds)
+FAST_INTERVAL = 0.5    # used while metrics are moving fast (incident)
+NORMAL_INTERVAL = 5    # the collector's usual INTERVAL
+IDLE_INTERVAL = 30     # used once the host has been quiet for a while
+
+# Thresholds that switch to FAST_INTERVAL (change between two samples)
+CPU_DELTA_THRESHOLD = 20.0      # percentage points
+RAM_DELTA_THRESHOLD = 10.0      # percentage points
+NET_RATE_THRESHOLD = 5.0        # MB/s sent + received
+
+# Thresholds under which the host counts as idle
+IDLE_CPU = 10.0                 # %
+IDLE_NET_RATE = 0.1             # MB/s
+IDLE_AFTER = 6                  # consecutive quiet samples before backing off
+
+
+class AdaptiveSampler:
+    """
+    Picks the next sampling interval from the change between two samples.
+
+    Any CPU, RAM or network delta above its threshold switches to the fast
+    interval immediately. Once things calm down the interval doubles back
+    towards the normal one, and after IDLE_AFTER quiet samples it backs off
+    to the idle interval. Samples are dicts as produced by collect_metrics()
+    (cpu, ram in %, net_sent / net_recv as cumulative MB).
+    """
+
+    def __init__(self, fast=FAST_INTERVAL, normal=NORMAL_INTERVAL, idle=IDLE_INTERVAL,
+                 cpu_delta=CPU_DELTA_THRESHOLD, ram_delta=RAM_DELTA_THRESHOLD,
+                 net_rate=NET_RATE_THRESHOLD, idle_cpu=IDLE_CPU,
+                 idle_net_rate=IDLE_NET_RATE, idle_after=IDLE_AFTER):
+        self.fast, self.normal, self.idle = fast, normal, idle
+        self.cpu_delta, self.ram_delta, self.net_rate = cpu_delta, ram_delta, net_rate
+        self.idle_cpu, self.idle_net_rate, self.idle_after = idle_cpu, idle_net_rate, idle_after
+        self.interval = normal
+        self._prev = None
+        self._prev_time = None
+        self._quiet = 0
+
+    def observe(self, sample, now=None):
+        """
+        Records a sample and returns the interval to wait before the next one.
+
+        Also stores the effective interval (seconds since the previous sample)
+        in sample["interval"], so rates computed downstream stay correct when
+        the sampling rate changes.
+        """
+        now = time.monotonic() if now is None else now
+        if self._prev is None:
+            sample["interval"] = self.interval
+            self._prev, self._prev_time = sample, now
+            return self.interval
+
+        elapsed = max(now - self._prev_time, 1e-6)
+        sample["interval"] = round(elapsed, 3)
+
+        cpu_change = abs(sample["cpu"] - self._prev["cpu"])
+        ram_change = abs(sample["ram"] - self._prev["ram"])
+        net_rate = ((sample["net_sent"] - self._prev["net_sent"])
+                    + (sample["net_recv"] - self._prev["net_recv"])) / elapsed
+
+        if cpu_change > self.cpu_delta or ram_change > self.ram_delta or net_rate > self.net_rate:
+            self.interval = self.fast
+            self._quiet = 0
+        elif sample["cpu"] < self.idle_cpu and net_rate < self.idle_net_rate:
+            self._quiet += 1
+            if self._quiet >= self.idle_after:
+                self.interval = self.idle
+            else:
+                self.interval = min(self.interval * 2, self.normal)
+        else:
+            self._quiet = 0
+            self.interval = min(self.interval * 2, self.normal)
+
+        self._prev, self._prev_time = sample, now
+        return self.interval
@@ -0,0 +1,135 @@
+import json
+import os
+from collections import deque
+
+import numpy as np
+import matplotlib.pyplot as plt
+from matplotlib.gridspec import GridSpec
+
+JSON_FILE = "system_metrics.json"
+INTERVAL = 1000  # milliseconds (1 second refresh)
+HISTORY = 600  # points kept per panel (ring buffer)
+
+# (metric key, title, y label, color, initial y limits)
+PANELS = [
+    ("cpu", "CPU Usage (%)", "CPU %", "orange", (0, 100)),
+    ("ram", "RAM Usage (%)", "RAM %", "green", (0, 100)),
+    ("disk", "Disk Usage (%)", "Disk %", "blue", (0, 100)),
+    ("notepad_running", "Notepad Availability", "Running (1) / Not (0)", "black", (-0.1, 1.1)),
+]
+
+
+class LiveDashboard:
+    """
+    Live dashboard that keeps one Line2D per panel and only updates its data.
+
+    New entries from JSON_FILE are appended to fixed-size ring buffers. The
+    static parts of the figure (axes, ticks, labels, grid) are rendered once
+    and cached as a background; each refresh restores that background and
+    draws only the animated lines (blitting). A full redraw happens only when
+    a value falls outside the current y limits or the window is resized.
+    The x axis is "samples ago", so it never changes as data scrolls.
+    """
+
+    def __init__(self, fig, axes):
+        self.fig = fig
+        self.axes = axes
+        self.canvas = fig.canvas
+        self.buffers = {key: deque(maxlen=HISTORY) for key, *_ in PANELS}
+        self.last_epoch = None  # "epoch" of the newest entry drawn
+        self.last_entry = None  # newest entry drawn, for files written before "epoch" existed
+        self.last_mtime = None
+        self.background = None
+
+        self.lines = []
+        for ax, (key, title, ylabel, color, ylim) in zip(axes, PANELS):
+            line, = ax.plot([], [], color=color, animated=True)  # animated: skipped by normal draws
+            self.lines.append(line)
+            ax.set_title(title)
+            ax.set_ylabel(ylabel)
+            ax.set_xlabel("Samples ago")
+            ax.set_xlim(-HISTORY + 1, 0)
+            ax.set_ylim(*ylim)
+            ax.grid(True)
+        axes[3].set_yticks([0, 1])
+        axes[3].set_yticklabels(["No", "Yes"])
+        self.status = fig.text(0.5, 0.93, "", ha="center", animated=True)
+
+        self.canvas.mpl_connect("draw_event", self.on_draw)
+
+    def on_draw(self, event):
+        # Any full draw (first show, resize, limit change) refreshes the cached background.
+        self.background = self.canvas.copy_from_bbox(self.fig.bbox)
+        self.draw_animated()
+
+    def draw_animated(self):
+        for line in self.lines:
+            line.axes.draw_artist(line)
+        self.fig.draw_artist(self.status)
+
+    def read_new_entries(self):
+        """Returns only entries newer than the last one seen (skips unchanged files)."""
+        try:
+            mtime = os.stat(JSON_FILE).st_mtime
+            if mtime == self.last_mtime:
+                return []
+            with open(JSON_FILE, "r") as f:
+                data = json.load(f)
+            self.last_mtime = mtime
+        except (OSError, json.JSONDecodeError):
+            return []  # file missing or mid-write; try again next tick
+
+        # The "%H:%M:%S" timestamp repeats when the adaptive sampler takes several
+        # samples per second, so new rows are found by their epoch instead.
+        if self.last_entry is None:
+            return data
+        if self.last_epoch is not None and data and "epoch" in data[-1]:
+            return [d for d in data if d.get("epoch", 0) > self.last_epoch]
+        for i in range(len(data) - 1, -1, -1):
+            if data[i] == self.last_entry:
+                return data[i + 1:]
+        return data  # last seen entry rotated out of the file
+
+    def update(self):
+        entries = self.read_new_entries()
+        if not entries:
+            return
+        for entry in entries:
+            for key, buf in self.buffers.items():
+                buf.append(entry[key])
+        self.last_entry = entries[-1]
+        self.last_epoch = self.last_entry.get("epoch")
+        self.status.set_text(f"Last sample: {self.last_entry['timestamp']}")
+
+        limits_changed = False
+        for line, (key, *_), ax in zip(self.lines, PANELS, self.axes):
+            y = np.fromiter(self.buffers[key], dtype=float)
+            line.set_data(np.arange(-len(y) + 1, 1), y)
+            lo, hi = ax.get_ylim()
+            if y.min() < lo or y.max() > hi:
+                pad = 0.05 * (max(y.max(), hi) - min(y.min(), lo) or 1)
+                ax.set_ylim(min(y.min(), lo) - pad, max(y.max(), hi) + pad)
+                limits_changed = True
+
+        if limits_changed or self.background is None:
+            self.canvas.draw()  # redraws ticks; on_draw re-caches the background
+        else:
+            self.canvas.restore_region(self.background)
+            self.draw_animated()
+        self.canvas.blit(self.fig.bbox)
+        self.canvas.flush_events()
+
+
+if __name__ == "__main__":
+    fig = plt.figure(figsize=(12, 10))
+    gs = GridSpec(2, 2, figure=fig)
+    axes = [fig.add_subplot(gs[i, j]) for i in range(2) for j in range(2)]
+    fig.suptitle("📊 Live System Metrics Dashboard", fontsize=16)
+    plt.tight_layout()
+    plt.subplots_adjust(top=0.88)
+
+    dashboard = LiveDashboard(fig, axes)
+    timer = fig.canvas.new_timer(interval=INTERVAL)
+    timer.add_callback(dashboard.update)
+    timer.start()
+    plt.show()
@@ -1,10 +1,19 @@
 import json
+import os
+import sys
+import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib.animation as animation
 from matplotlib.gridspec import GridSpec
 
+COMMON_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "common")  # modules shared by the course apps
+if COMMON_DIR not in sys.path:
+    sys.path.append(COMMON_DIR)
+from downsample import downsample_indices
+
 JSON_FILE = "system_metrics.json"
 INTERVAL = 5000  # milliseconds (5 seconds)
+MAX_POINTS = 1000  # points per panel; longer histories are decimated (LTTB)
 
 def read_metrics():
     try:
@@ -13,6 +22,11 @@ def read_metrics():
     except:
         return []
 
+def thin(times, values):
+    # Keeps at most MAX_POINTS points that preserve the shape of the line
+    idx = downsample_indices(np.arange(len(values)), values, MAX_POINTS)
+    return [times[i] for i in idx], [values[i] for i in idx]
+
 def update_dashboard(i, axes):
     data = read_metrics()
     if not data:
@@ -31,17 +45,17 @@ def update_dashboard(i, axes):
         ax.clear()
 
     # Plot CPU
-    axes[0].plot(times, cpu, marker='o', color='orange')
+    axes[0].plot(*thin(times, cpu), marker='o', color='orange')
     axes[0].set_title("CPU Usage (%)")
     axes[0].set_ylabel("CPU %")
 
     # Plot RAM
-    axes[1].plot(times, ram, marker='o', color='green')
+    axes[1].plot(*thin(times, ram), marker='o', color='green')
     axes[1].set_title("RAM Usage (%)")
     axes[1].set_ylabel("RAM %")
 
     # Plot Disk
-    axes[2].plot(times, disk, marker='o', color='blue')
+    axes[2].plot(*thin(times, disk), marker='o', color='blue')
     axes[2].set_title("Disk Usage (%)")
     axes[2].set_ylabel("Disk %")
 
@@ -54,15 +68,16 @@ def update_dashboard(i, axes):
 
     # Plot Notepad Availability
     axes[3].set_title("Notepad Availability")
-    axes[3].plot(times, notepad, marker='o', color='black')
+    axes[3].plot(*thin(times, notepad), marker='o', color='black')
     axes[3].set_ylabel("Running (1) / Not (0)")
     axes[3].set_yticks([0, 1])
     axes[3].set_yticklabels(["No", "Yes"])
 
     # Shared x-label formatting
     for ax in axes:
-        ax.set_xticks(times[::max(1, len(times)//8)])
-        ax.set_xticklabels(times[::max(1, len(times)//8)], rotation=45)
+        shown = list(ax.get_lines()[0].get_xdata())  # only the timestamps kept on this panel
+        ax.set_xticks(shown[::max(1, len(shown)//8)])
+        ax.set_xticklabels(shown[::max(1, len(shown)//8)], rotation=45)
         ax.set_xlabel("Time")
         ax.grid(True)
 
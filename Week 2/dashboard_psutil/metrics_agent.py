@@ -0,0 +1,177 @@
+"""
+metrics_agent.py
+
+Asyncio agent mode for the psutil collector. Samples the local host on a
+drift-free schedule and ships the samples in batches to a metrics backend.
+
+Usage examples:
+  # push to a local VictoriaMetrics (Prometheus text import, keeps timestamps)
+  python metrics_agent.py --url http://localhost:8428 --mode vm
+
+  # push to a Prometheus Pushgateway (no timestamps, latest sample only)
+  python metrics_agent.py --url http://localhost:9091 --mode pushgateway
+
+Options:
+  --interval    sampling interval in seconds (default: INTERVAL from metrics_collector.py)
+  --batch-size  number of samples per push (default: 12)
+  --buffer      max samples kept for retry while the backend is down (default: 720)
+  --label       extra label added to every series, e.g. --label env=lab (repeatable)
+  --adaptive    switch between fast / normal / idle intervals (see adaptive_sampler.py)
+"""
+import argparse
+import asyncio
+import socket
+import time
+from collections import deque
+
+import requests
+
+from metrics_collector import collect_metrics, INTERVAL
+from adaptive_sampler import AdaptiveSampler
+
+BATCH_SIZE = 12  # samples per push (1 minute at 5 s)
+MAX_BUFFERED_SAMPLES = 720  # retry buffer (1 hour at 5 s), oldest samples dropped first
+MAX_BACKOFF = 60  # seconds between retries when the backend is down
+METRIC_PREFIX = "psutil_"
+NUMERIC_FIELDS = ["cpu", "ram", "disk", "net_sent", "net_recv", "notepad_running", "interval"]
+
+
+def format_samples(samples, labels, with_timestamps=True):
+    """
+    Renders samples as Prometheus text exposition lines.
+
+    Args:
+        samples (list[tuple[int, dict]]): (timestamp in ms, metrics dict) pairs.
+        labels (dict): Labels attached to every series (e.g. host).
+        with_timestamps (bool): Append the sample timestamp to every line.
+
+    Returns:
+        str: Newline-terminated payload.
+    """
+    label_str = "{" + ",".join(f'{k}="{v}"' for k, v in labels.items()) + "}"
+    lines = []
+    for ts_ms, data in samples:
+        suffix = f" {ts_ms}" if with_timestamps else ""
+        for field in NUMERIC_FIELDS:
+            if field not in data:
+                continue
+            lines.append(f"{METRIC_PREFIX}{field}{label_str} {data[field]}{suffix}")
+    return "\n".join(lines) + "\n"
+
+
+def push_batch(url, mode, samples, labels, job="psutil_agent"):
+    """
+    Sends one batch of samples to the backend (blocking, run in a worker thread).
+
+    VictoriaMetrics accepts timestamped samples on /api/v1/import/prometheus.
+    The Pushgateway rejects timestamps and keeps one value per series, so only
+    the latest sample of the batch is pushed in that mode.
+    """
+    if mode == "vm":
+        endpoint = url.rstrip("/") + "/api/v1/import/prometheus"
+        payload = format_samples(samples, labels)
+    else:
+        endpoint = url.rstrip("/") + f"/metrics/job/{job}/instance/{labels['host']}"
+        payload = format_samples(samples[-1:], labels, with_timestamps=False)
+
+    resp = requests.post(endpoint, data=payload, timeout=10)
+    if resp.status_code not in (200, 202, 204):
+        raise RuntimeError(f"POST {endpoint} returned {resp.status_code}: {resp.text}")
+
+
+async def sample_loop(buffer, batch_ready, interval, batch_size, sampler=None):
+    """
+    Samples metrics every `interval` seconds against an absolute schedule.
+
+    Each tick is computed from the start time rather than from the end of the
+    previous sample, so collection time never accumulates as drift. If a
+    sample overruns one or more ticks, the missed ticks are skipped instead
+    of firing back to back. With an AdaptiveSampler the interval to the next
+    tick is chosen from the latest sample.
+    """
+    loop = asyncio.get_running_loop()
+    next_tick = loop.time()
+    while True:
+        # psutil calls block (process scan), so keep them off the event loop
+        data = await asyncio.to_thread(collect_metrics)
+        if sampler:
+            interval = sampler.observe(data, now=loop.time())
+        buffer.append((int(time.time() * 1000), data))
+        if len(buffer) >= batch_size:
+            batch_ready.set()
+
+        next_tick += interval
+        delay = next_tick - loop.time()
+        if delay < 0:
+            missed = int(-delay // interval) + 1
+            print(f"[Agent] Sampling overran by {-delay:.2f}s, skipping {missed} tick(s)")
+            next_tick += missed * interval
+            delay = next_tick - loop.time()
+        await asyncio.sleep(delay)
+
+
+async def push_loop(buffer, batch_ready, url, mode, labels, batch_size):
+    """
+    Ships buffered samples in batches, keeping them for retry on failure.
+
+    A failed batch is put back at the head of the buffer. When the buffer is
+    full the oldest samples are the ones dropped, so the newest data survives
+    a long backend outage.
+    """
+    backoff = 1
+    while True:
+        await batch_ready.wait()
+        batch_ready.clear()
+
+        while len(buffer) >= batch_size or (buffer and backoff > 1):
+            batch = [buffer.popleft() for _ in range(min(batch_size, len(buffer)))]
+            try:
+                await asyncio.to_thread(push_batch, url, mode, batch, labels)
+                print(f"[Agent] Pushed {len(batch)} samples ({len(buffer)} still buffered)")
+                backoff = 1
+            except Exception as e:
+                room = buffer.maxlen - len(buffer)
+                kept = batch[-room:] if room > 0 else []
+                buffer.extendleft(reversed(kept))
+                dropped = len(batch) - len(kept)
+                print(f"[Agent] Push failed ({e}); retrying in {backoff}s"
+                      + (f", dropped {dropped} oldest samples" if dropped else ""))
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, MAX_BACKOFF)
+
+
+async def run_agent(url, mode, interval=INTERVAL, batch_size=BATCH_SIZE,
+                    max_buffered=MAX_BUFFERED_SAMPLES, extra_labels=None, adaptive=False):
+    buffer = deque(maxlen=max_buffered)
+    batch_ready = asyncio.Event()
+    labels = {"host": socket.gethostname(), **(extra_labels or {})}
+    sampler = AdaptiveSampler(normal=interval) if adaptive else None
+
+    print(f"[Agent] Sampling every {interval}s, pushing batches of {batch_size} to {url} ({mode})")
+    await asyncio.gather(
+        sample_loop(buffer, batch_ready, interval, batch_size, sampler),
+        push_loop(buffer, batch_ready, url, mode, labels, batch_size),
+    )
+
+
+def main():
+    p = argparse.ArgumentParser(description="Async psutil metrics agent with batched push")
+    p.add_argument("--url", default="http://localhost:8428", help="VictoriaMetrics or Pushgateway base URL")
+    p.add_argument("--mode", choices=["vm", "pushgateway"], default="vm")
+    p.add_argument("--interval", type=float, default=INTERVAL)
+    p.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    p.add_argument("--buffer", type=int, default=MAX_BUFFERED_SAMPLES)
+    p.add_argument("--label", action="append", default=[], help="extra label as key=value")
+    p.add_argument("--adaptive", action="store_true", help="adapt the interval to host activity")
+    args = p.parse_args()
+
+    extra_labels = dict(item.split("=", 1) for item in args.label)
+    try:
+        asyncio.run(run_agent(args.url, args.mode, args.interval, args.batch_size,
+                              args.buffer, extra_labels, args.adaptive))
+    except KeyboardInterrupt:
+        print("[Agent] Stopped.")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,11 +2,13 @@ import psutil
 import json
 import time
 from datetime import datetime
+from adaptive_sampler import AdaptiveSampler
 
 # File to store the collected metrics
 JSON_FILE = "system_metrics.json"
 INTERVAL = 5  # seconds
 MAX_ENTRIES = 100  # store only the latest 100 entries
+ADAPTIVE_SAMPLING = False  # sample faster during bursts and slower when idle (see adaptive_sampler.py)
 
 def is_process_running(name):
     for proc in psutil.process_iter(['name']):
@@ -17,25 +19,42 @@ def is_process_running(name):
             continue
     return False
 
-metrics = []
-
-print(f"[Collector] Starting to collect metrics every {INTERVAL} seconds...")
-while True:
+def collect_metrics():
     now = datetime.now().strftime("%H:%M:%S")
-    data = {
+    net_io = psutil.net_io_counters()
+    return {
         "timestamp": now,
+        "epoch": round(time.time(), 3),  # unique per sample, even several per second
         "cpu": psutil.cpu_percent(),
         "ram": psutil.virtual_memory().percent,
         "disk": psutil.disk_usage('/').percent,
-        "net_sent": psutil.net_io_counters().bytes_sent / (1024 * 1024),   # in MB
-        "net_recv": psutil.net_io_counters().bytes_recv / (1024 * 1024),   # in MB
+        "net_sent": net_io.bytes_sent / (1024 * 1024),   # in MB
+        "net_recv": net_io.bytes_recv / (1024 * 1024),   # in MB
         "notepad_running": int(is_process_running("notepad.exe"))
     }
 
-    metrics.append(data)
-    metrics = metrics[-MAX_ENTRIES:]  # keep only latest entries
+if __name__ == "__main__":
+    metrics = []
+    sampler = AdaptiveSampler(normal=INTERVAL) if ADAPTIVE_SAMPLING else None
+    last_sample = None
+
+    if sampler:
+        print(f"[Collector] Starting adaptive collection ({sampler.fast}s - {sampler.idle}s)...")
+    else:
+        print(f"[Collector] Starting to collect metrics every {INTERVAL} seconds...")
+    while True:
+        data = collect_metrics()
+        if sampler:
+            wait = sampler.observe(data)
+        else:
+            now = time.monotonic()
+            data["interval"] = round(now - last_sample, 3) if last_sample else INTERVAL
+            last_sample, wait = now, INTERVAL
+
+        metrics.append(data)
+        metrics = metrics[-MAX_ENTRIES:]  # keep only latest entries
 
-    with open(JSON_FILE, "w") as f:
-        json.dump(metrics, f, indent=2)
+        with open(JSON_FILE, "w") as f:
+            json.dump(metrics, f, indent=2)
 
-    time.sleep(INTERVAL)
+        time.sleep(wait)
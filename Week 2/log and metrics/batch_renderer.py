@@ -0,0 +1,165 @@
+import matplotlib # Plotting library; the backend must be chosen before pyplot is imported.
+matplotlib.use("Agg") # Headless raster backend: no windows, safe in worker processes and cron jobs.
+
+import argparse # Module for parsing command-line arguments.
+import datetime # Module for working with dates and times.
+import os       # Module for creating output folders.
+import time     # Module for time-related functions, like delays.
+from multiprocessing import Pool # Process pool for rendering charts in parallel.
+
+import matplotlib.pyplot as plt # Matplotlib's plotting interface.
+import numpy as np # Numerical Python, for numerical operations.
+
+from log_metrics_CLI import plot_cpu_trend, plot_latency_distribution, load_data_from_json
+
+# --- Headless Batch Chart Rendering ---
+# Renders a list of chart specs to PNG/SVG files without any GUI. Specs are
+# spread over worker processes; every worker keeps one figure per chart kind
+# and clears and reuses it for each spec, instead of opening a new pyplot
+# figure per chart.
+#
+# A spec is a dict:
+#   {"kind": "cpu_trend", "output": "reports/web01_cpu.png",
+#    "data": {"timestamps": [...ISO strings...], "values": [...]}}
+#   {"kind": "latency_distribution", "output": "reports/api_latency.svg",
+#    "data": {"values": [...]}}
+#   {"kind": "dashboard", "output": "reports/web01.png", "title": "web01",
+#    "data": {"timestamps": [...], "cpu": [...], "process_status": [...]}}
+# Instead of "data", a cpu_trend spec may give "metrics_file": a JSON file
+# written by save_data_to_json() with get_comprehensive_metrics() snapshots.
+
+FIGURE_SIZES = {
+    "cpu_trend": (10, 6),
+    "latency_distribution": (8, 5),
+    "dashboard": (10, 8),
+}
+
+_FIGURES = {} # Per-worker cache: chart kind -> (figure, axes list).
+
+def _get_figure(kind: str) -> tuple[plt.Figure, list[plt.Axes]]:
+    """
+    Returns this worker's figure for a chart kind, cleared for reuse.
+    """
+    if kind not in _FIGURES:
+        fig = plt.figure(figsize=FIGURE_SIZES[kind])
+        if kind == "dashboard":
+            axes = [fig.add_subplot(2, 1, 1), fig.add_subplot(2, 1, 2)]
+        else:
+            axes = [fig.add_subplot(1, 1, 1)]
+        _FIGURES[kind] = (fig, axes)
+    fig, axes = _FIGURES[kind]
+    for ax in axes:
+        ax.clear() # Keeps the axes objects; only removes the previous chart's artists.
+    fig.suptitle("") # Blanks a previous suptitle (the text object itself is reused).
+    return fig, axes
+
+def _parse_timestamps(values: list) -> list[datetime.datetime]:
+    return [datetime.datetime.fromisoformat(v) if isinstance(v, str) else v for v in values]
+
+def _load_spec_data(spec: dict) -> dict:
+    if "metrics_file" in spec:
+        snapshots = load_data_from_json(spec["metrics_file"]) or []
+        return {
+            "timestamps": [m["timestamp"] for m in snapshots],
+            "values": [m["cpu_percent"] for m in snapshots],
+        }
+    return spec["data"]
+
+def _draw_dashboard(fig: plt.Figure, axes: list[plt.Axes], data: dict, title: str):
+    """
+    Draws CPU usage and process availability (the layout of show_dashboard in W02D10_dashboard.py).
+    """
+    timestamps = _parse_timestamps(data["timestamps"])
+    axes[0].plot(timestamps, data["cpu"], marker='o', color='orange', label="CPU Usage")
+    axes[0].set_ylabel("CPU %")
+    axes[0].legend()
+    axes[1].plot(timestamps, data["process_status"], marker='o', color='red', label="Process Status")
+    axes[1].set_xlabel("Time")
+    axes[1].set_ylabel("Availability")
+    axes[1].set_yticks([0, 1], ["Stopped", "Running"])
+    axes[1].legend()
+    for ax in axes:
+        plt.setp(ax.get_xticklabels(), rotation=45)
+    fig.suptitle(title, fontsize=14)
+    fig.tight_layout(rect=[0, 0, 1, 0.95])
+
+def render_chart(spec: dict) -> tuple[str, bool, str]:
+    """
+    Renders one chart spec to its output file (runs inside a worker).
+
+    Args:
+        spec (dict): The chart spec (see module comment).
+
+    Returns:
+        tuple[str, bool, str]: Output path, success flag and error message.
+    """
+    output = spec.get("output", "")
+    try:
+        kind = spec["kind"]
+        data = _load_spec_data(spec)
+        fig, axes = _get_figure(kind)
+        if kind == "cpu_trend":
+            plot_cpu_trend(_parse_timestamps(data["timestamps"]), data["values"], ax=axes[0])
+        elif kind == "latency_distribution":
+            plot_latency_distribution(np.asarray(data["values"]), ax=axes[0])
+        else:
+            _draw_dashboard(fig, axes, data, spec.get("title", "CPU Usage and Process Availability"))
+        if spec.get("title") and kind != "dashboard":
+            axes[0].set_title(spec["title"], fontsize=16, color='#004777')
+
+        os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+        fig.savefig(output, dpi=spec.get("dpi", 100)) # Format (PNG/SVG/PDF) follows the file extension.
+        return output, True, ""
+    except Exception as e: # One bad spec must not stop the whole batch.
+        return output, False, f"{type(e).__name__}: {e}"
+
+def render_batch(specs: list[dict], processes: int | None = None) -> list[tuple[str, bool, str]]:
+    """
+    Renders many chart specs in parallel worker processes.
+
+    Args:
+        specs (list[dict]): Chart specs to render.
+        processes (int | None): Number of workers (defaults to the CPU count).
+
+    Returns:
+        list[tuple[str, bool, str]]: (output path, success, error message) per spec.
+    """
+    if not specs:
+        return []
+    processes = min(processes or os.cpu_count() or 1, len(specs))
+    # Larger chunks keep consecutive specs in the same worker, so its cached figures are reused.
+    chunksize = max(1, len(specs) // (processes * 4))
+    with Pool(processes=processes) as pool:
+        return list(pool.imap_unordered(render_chart, specs, chunksize=chunksize))
+
+def run_report_job(spec_file: str, processes: int | None = None):
+    """
+    Loads chart specs from a JSON file and renders them, printing a summary.
+
+    Args:
+        spec_file (str): JSON file holding a list of chart specs.
+        processes (int | None): Number of worker processes.
+    """
+    specs = load_data_from_json(spec_file)
+    if not specs:
+        print("No chart specs to render.")
+        return
+    start = time.perf_counter()
+    results = render_batch(specs, processes)
+    failed = [r for r in results if not r[1]]
+    print(f"Rendered {len(results) - len(failed)}/{len(results)} charts in {time.perf_counter() - start:.1f}s")
+    for output, _, error in failed:
+        print(f"  Failed: {output}: {error}")
+
+# --- Command-line entry point (for cron / Task Scheduler jobs) ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render chart specs to PNG/SVG files without a GUI.")
+    parser.add_argument("spec_file", help="JSON file with a list of chart specs")
+    parser.add_argument("--processes", type=int, default=None, help="Number of worker processes (default: CPU count)")
+    parser.add_argument("--every", type=float, default=None, help="Re-run the job every N minutes (default: run once)")
+    args = parser.parse_args()
+
+    run_report_job(args.spec_file, args.processes)
+    while args.every: # Simple scheduler; use cron / Task Scheduler for production jobs.
+        time.sleep(args.every * 60)
+        run_report_job(args.spec_file, args.processes)
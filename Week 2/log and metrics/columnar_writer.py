@@ -0,0 +1,179 @@
+import csv      # Module for reading and writing CSV files.
+import os       # Module for checking whether output files already exist.
+
+try:
+    import pyarrow as pa # Columnar in-memory format (optional, needed for Parquet).
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+# --- Columnar metrics writer ---
+# Buffers snapshots from get_comprehensive_metrics() and writes them in
+# batches, one column at a time. Nested top_processes_cpu lists are
+# flattened into a second long-format table keyed by timestamp, so no data
+# is dropped and the main table stays flat.
+
+PROCESS_COLUMNS = ["timestamp", "rank", "pid", "name", "cpu_percent", "memory_percent"]
+
+class ColumnarMetricsWriter:
+    """
+    Appends metric snapshots to a metrics table and a processes table.
+
+    With fmt="csv" the files are <basename>_metrics.csv and
+    <basename>_processes.csv, opened in append mode so several runs (or
+    several flushes) extend the same files. With fmt="parquet" each flush
+    becomes one row group in <basename>_metrics.parquet and
+    <basename>_processes.parquet (requires pyarrow).
+    """
+    def __init__(self, basename: str = "metrics", fmt: str = "csv", batch_size: int = 500):
+        if fmt not in ("csv", "parquet"):
+            raise ValueError(f"Unsupported format: {fmt}")
+        if fmt == "parquet" and pa is None:
+            raise ImportError("Parquet output requires pyarrow (pip install pyarrow)")
+        self.basename = basename
+        self.fmt = fmt
+        self.batch_size = batch_size
+        self.metrics_path = f"{basename}_metrics.{fmt}"
+        self.processes_path = f"{basename}_processes.{fmt}"
+        self._batch = []
+        self._fieldnames = None # Scalar columns, fixed by the first snapshot.
+        self._list_columns = None # List-valued keys expanded into indexed columns (e.g. cpu_load_avg).
+        self._parquet_writers = {}
+        self._parquet_schemas = {} # Arrow schema per file, fixed by its first flush.
+        self._csv_headers = {} # Column order per CSV file, taken from its header row.
+
+    def _init_schema(self, first: dict):
+        self._fieldnames = [k for k, v in first.items() if isinstance(v, (int, float, str)) or v is None]
+        self._list_columns = {
+            k: len(v) for k, v in first.items()
+            if isinstance(v, list) and v and all(isinstance(x, (int, float)) for x in v)
+        }
+
+    def add(self, metrics: dict):
+        """
+        Buffers one snapshot and flushes when the batch is full.
+        """
+        self._batch.append(metrics)
+        if len(self._batch) >= self.batch_size:
+            self.flush()
+
+    def _metric_columns(self, batch: list[dict]) -> dict[str, list]:
+        columns = {key: [m.get(key) for m in batch] for key in self._fieldnames}
+        for key, width in self._list_columns.items():
+            values = [m.get(key) or [None] * width for m in batch]
+            for i, col in enumerate(zip(*values)): # Transposes the list column into `width` columns.
+                columns[f"{key}_{i}"] = list(col)
+        return columns
+
+    def _process_columns(self, batch: list[dict]) -> dict[str, list]:
+        columns = {name: [] for name in PROCESS_COLUMNS}
+        for m in batch:
+            procs = m.get("top_processes_cpu") or []
+            columns["timestamp"].extend([m["timestamp"]] * len(procs))
+            columns["rank"].extend(range(1, len(procs) + 1))
+            for key in ("pid", "name", "cpu_percent", "memory_percent"):
+                columns[key].extend(p[key] for p in procs)
+        return columns
+
+    def _csv_header(self, path: str, columns: dict[str, list]) -> tuple[list, bool]:
+        """
+        Column order of an existing CSV (e.g. from an earlier run), or of this batch for a new file.
+        Returns the header and whether it still has to be written.
+        """
+        if path not in self._csv_headers:
+            header, write_header = list(columns), True
+            if os.path.exists(path) and os.path.getsize(path) > 0:
+                with open(path, newline='') as csvfile:
+                    header, write_header = next(csv.reader(csvfile)), False
+            self._csv_headers[path] = header
+            extra = [c for c in columns if c not in header]
+            if extra:
+                print(f"Warning: {path} has no columns {extra}; they are not written.")
+            return header, write_header
+        return self._csv_headers[path], False
+
+    def _write_csv(self, path: str, columns: dict[str, list]):
+        header, write_header = self._csv_header(path, columns)
+        n_rows = len(next(iter(columns.values())))
+        # Rows follow the file's header, so appended rows never shift columns; missing ones stay empty.
+        ordered = [columns.get(name, [None] * n_rows) for name in header]
+        with open(path, 'a', newline='') as csvfile: # Append mode: each flush extends the file.
+            writer = csv.writer(csvfile)
+            if write_header:
+                writer.writerow(header)
+            writer.writerows(zip(*ordered)) # Rows are built from the columns, no per-row dicts.
+
+    def _write_parquet(self, path: str, columns: dict[str, list]):
+        schema = self._parquet_schemas.get(path)
+        if schema is None:
+            # Columns that are None for the whole first batch (psutil's cpu_percent /
+            # memory_percent often are) would be typed null; store them as float64.
+            schema = pa.table(columns).schema
+            for i, field in enumerate(schema):
+                if pa.types.is_null(field.type):
+                    schema = schema.set(i, field.with_type(pa.float64()))
+            self._parquet_schemas[path] = schema
+        table = pa.table(columns, schema=schema) # Later batches are cast to the first schema.
+        writer = self._parquet_writers.get(path)
+        if writer is None:
+            writer = pq.ParquetWriter(path, schema)
+            self._parquet_writers[path] = writer
+        writer.write_table(table) # One row group per flush.
+
+    def flush(self):
+        """
+        Writes the buffered snapshots to both tables.
+        """
+        if not self._batch:
+            return
+        if self._fieldnames is None:
+            self._init_schema(self._batch[0])
+
+        tables = [
+            (self.metrics_path, self._metric_columns(self._batch)),
+            (self.processes_path, self._process_columns(self._batch)),
+        ]
+        for path, columns in tables:
+            if not columns or not next(iter(columns.values())):
+                continue # Nothing to write (e.g. no process data collected).
+            if self.fmt == "csv":
+                self._write_csv(path, columns)
+            else:
+                self._write_parquet(path, columns)
+        self._batch = []
+
+    def close(self):
+        """
+        Flushes remaining snapshots and closes any open Parquet files.
+        """
+        self.flush()
+        for writer in self._parquet_writers.values():
+            writer.close()
+        self._parquet_writers = {}
+        self._parquet_schemas = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+def save_metrics_columnar(metrics_list: list[dict], basename: str = "metrics", fmt: str = "csv"):
+    """
+    Saves a list of metric dictionaries as a metrics table plus a processes table.
+
+    Args:
+        metrics_list (list[dict]): Snapshots from get_comprehensive_metrics().
+        basename (str): Prefix for the two output files.
+        fmt (str): "csv" (appendable) or "parquet" (requires pyarrow).
+    """
+    if not metrics_list:
+        print("No metrics to save.")
+        return
+
+    print(f"Saving metrics to {basename}_metrics.{fmt} and {basename}_processes.{fmt}...")
+    with ColumnarMetricsWriter(basename, fmt, batch_size=len(metrics_list)) as writer:
+        for metrics in metrics_list:
+            writer.add(metrics)
+    print(f"Metrics saved to {basename}_metrics.{fmt} and {basename}_processes.{fmt}")
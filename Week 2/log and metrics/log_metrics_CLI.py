@@ -2,12 +2,21 @@ import datetime # Module for working with dates and times.
 import random   # Module for generating random numbers and choices.
 import time     # Module for time-related functions, like delays.
 import re       # Module for regular expressions.
+import os       # Module for file paths (locating the shared common/ folder).
+import sys      # Module for the interpreter's import search path.
 import psutil   # Cross-platform library for system and process information.
 import csv      # Module for reading and writing CSV files.
 import json     # Module for working with JSON data.
 import matplotlib.pyplot as plt # Matplotlib's plotting interface.
 import seaborn as sns # High-level interface for drawing attractive statistical graphics.
 import numpy as np # Numerical Python, for numerical operations (used for dummy data).
+from metric_compression import save_compressed_metrics # Gorilla-style storage for per-device series.
+from columnar_writer import save_metrics_columnar # Batched CSV/Parquet writer that keeps process data.
+
+COMMON_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "common")  # modules shared by the course apps
+if COMMON_DIR not in sys.path:
+    sys.path.append(COMMON_DIR)
+from collector_instrumentation import ProbeRecorder, OVERHEAD_BUDGET_CPU_MS # Per-probe cost and overhead budget.
 
 # --- Day 6: Simulating Log Files ---
 
@@ -147,6 +156,10 @@ def parse_complex_log(log_line: str) -> dict:
 
 # --- Day 7 (Part 2): Generating System Metrics (Intro) ---
 
+# Records the cost of every psutil probe below. A full process scan is the only
+# optional probe; it is switched off when a cycle exceeds the CPU budget.
+PROBES = ProbeRecorder(budget_cpu_ms=OVERHEAD_BUDGET_CPU_MS, expensive={"process_scan"})
+
 def get_system_metrics() -> dict:
     """
     Collects basic system metrics using psutil.
@@ -154,10 +167,15 @@ def get_system_metrics() -> dict:
     Returns:
         dict: A dictionary containing basic CPU, memory, disk, and network metrics.
     """
-    cpu_percent = psutil.cpu_percent(interval=0.1) # Returns CPU usage percentage over 0.1 seconds.
-    mem_info = psutil.virtual_memory() # Returns system memory usage statistics.
-    disk_info = psutil.disk_usage('/') # Returns disk usage statistics for the root partition.
-    net_io = psutil.net_io_counters() # Returns network I/O statistics.
+    with PROBES.cycle():
+        with PROBES.probe("cpu_percent_blocking"):
+            cpu_percent = psutil.cpu_percent(interval=0.1) # Returns CPU usage percentage over 0.1 seconds (blocks).
+        with PROBES.probe("virtual_memory"):
+            mem_info = psutil.virtual_memory() # Returns system memory usage statistics.
+        with PROBES.probe("disk_usage_root"):
+            disk_info = psutil.disk_usage('/') # Returns disk usage statistics for the root partition.
+        with PROBES.probe("net_io"):
+            net_io = psutil.net_io_counters() # Returns network I/O statistics.
 
     metrics = {
         "timestamp": datetime.datetime.now().isoformat(), # Current timestamp in ISO format.
@@ -175,55 +193,93 @@ def get_system_metrics() -> dict:
 
 # --- Day 8: Generating System Metrics (Deep Dive) & Storing Locally ---
 
-def get_comprehensive_metrics() -> dict:
+def get_comprehensive_metrics(percpu: bool = False, perdisk: bool = False, pernic: bool = False) -> dict:
     """
     Collects a wider range of system metrics, including top processes.
 
+    Args:
+        percpu (bool): Also report CPU usage for every logical core.
+        perdisk (bool): Also report I/O counters for every physical disk.
+        pernic (bool): Also report I/O counters for every network interface.
+
     Returns:
         dict: A dictionary containing comprehensive system metrics.
+              Per-device series are large; store them with save_compressed_metrics()
+              from metric_compression.py rather than plain JSON.
+              top_processes_cpu is empty once the process scan was disabled by the overhead budget.
     """
     metrics = {}
     metrics["timestamp"] = datetime.datetime.now().isoformat()
 
-    # CPU metrics
-    metrics["cpu_percent"] = psutil.cpu_percent(interval=None) # CPU usage since last call or boot.
-    metrics["cpu_load_avg"] = [round(x, 2) for x in psutil.getloadavg()] # System load average (1, 5, 15 min).
-
-    # Memory metrics
-    mem = psutil.virtual_memory()
-    metrics["mem_total_gb"] = round(mem.total / (1024**3), 2)
-    metrics["mem_used_gb"] = round(mem.used / (1024**3), 2)
-    metrics["mem_free_gb"] = round(mem.free / (1024**3), 2)
-    metrics["mem_percent"] = mem.percent
-
-    # Disk metrics
-    disk_usage_root = psutil.disk_usage('/') # Disk usage for the root partition.
-    metrics["disk_root_total_gb"] = round(disk_usage_root.total / (1024**3), 2)
-    metrics["disk_root_used_gb"] = round(disk_usage_root.used / (1024**3), 2)
-    metrics["disk_root_percent"] = disk_usage_root.percent
-    metrics["disk_io_read_bytes"] = psutil.disk_io_counters().read_bytes # Total bytes read.
-    metrics["disk_io_write_bytes"] = psutil.disk_io_counters().write_bytes # Total bytes written.
-
-    # Network metrics
-    net_io = psutil.net_io_counters()
-    metrics["net_bytes_sent"] = net_io.bytes_sent
-    metrics["net_bytes_recv"] = net_io.bytes_recv
-    metrics["net_packets_sent"] = net_io.packets_sent # Total packets sent.
-    metrics["net_packets_recv"] = net_io.packets_recv # Total packets received.
-
-    # Processes (top 5 by CPU usage)
-    metrics["top_processes_cpu"] = []
-    # Iterates over all running processes and gets specific info.
-    for proc in sorted(psutil.process_iter(['pid', 'name', 'cpu_percent', 'memory_percent']), key=lambda p: p.info['cpu_percent'], reverse=True)[:5]:
-        metrics["top_processes_cpu"].append({
-            "pid": proc.info['pid'],
-            "name": proc.info['name'],
-            "cpu_percent": proc.info['cpu_percent'],
-            "memory_percent": round(proc.info['memory_percent'], 2)
-        })
+    with PROBES.cycle():
+        # CPU metrics
+        with PROBES.probe("cpu"):
+            metrics["cpu_percent"] = psutil.cpu_percent(interval=None) # CPU usage since last call or boot.
+            metrics["cpu_load_avg"] = [round(x, 2) for x in psutil.getloadavg()] # System load average (1, 5, 15 min).
+            if percpu:
+                metrics["cpu_percent_per_core"] = psutil.cpu_percent(interval=None, percpu=True) # One value per logical core.
+
+        # Memory metrics
+        with PROBES.probe("virtual_memory"):
+            mem = psutil.virtual_memory()
+        metrics["mem_total_gb"] = round(mem.total / (1024**3), 2)
+        metrics["mem_used_gb"] = round(mem.used / (1024**3), 2)
+        metrics["mem_free_gb"] = round(mem.free / (1024**3), 2)
+        metrics["mem_percent"] = mem.percent
+
+        # Disk metrics
+        with PROBES.probe("disk_usage_root"):
+            disk_usage_root = psutil.disk_usage('/') # Disk usage for the root partition.
+        metrics["disk_root_total_gb"] = round(disk_usage_root.total / (1024**3), 2)
+        metrics["disk_root_used_gb"] = round(disk_usage_root.used / (1024**3), 2)
+        metrics["disk_root_percent"] = disk_usage_root.percent
+        with PROBES.probe("disk_io"):
+            disk_io = psutil.disk_io_counters()
+            metrics["disk_io_read_bytes"] = disk_io.read_bytes # Total bytes read.
+            metrics["disk_io_write_bytes"] = disk_io.write_bytes # Total bytes written.
+            if perdisk:
+                metrics["disk_io_per_disk"] = { # Read/write bytes keyed by disk name (e.g. 'sda', 'PhysicalDrive0').
+                    name: {"read_bytes": io.read_bytes, "write_bytes": io.write_bytes}
+                    for name, io in psutil.disk_io_counters(perdisk=True).items()
+                }
+
+        # Network metrics
+        with PROBES.probe("net_io"):
+            net_io = psutil.net_io_counters()
+            metrics["net_bytes_sent"] = net_io.bytes_sent
+            metrics["net_bytes_recv"] = net_io.bytes_recv
+            metrics["net_packets_sent"] = net_io.packets_sent # Total packets sent.
+            metrics["net_packets_recv"] = net_io.packets_recv # Total packets received.
+            if pernic:
+                metrics["net_io_per_nic"] = { # Sent/received bytes keyed by interface name.
+                    nic: {"bytes_sent": io.bytes_sent, "bytes_recv": io.bytes_recv}
+                    for nic, io in psutil.net_io_counters(pernic=True).items()
+                }
+
+        # Processes (top 5 by CPU usage)
+        metrics["top_processes_cpu"] = []
+        if PROBES.enabled("process_scan"):
+            with PROBES.probe("process_scan"):
+                # Iterates over all running processes and gets specific info.
+                for proc in sorted(psutil.process_iter(['pid', 'name', 'cpu_percent', 'memory_percent']), key=lambda p: p.info['cpu_percent'], reverse=True)[:5]:
+                    metrics["top_processes_cpu"].append({
+                        "pid": proc.info['pid'],
+                        "name": proc.info['name'],
+                        "cpu_percent": proc.info['cpu_percent'],
+                        "memory_percent": round(proc.info['memory_percent'], 2)
+                    })
 
     return metrics
 
+def get_collector_metrics() -> dict:
+    """
+    Returns the collector's own cost as a metrics snapshot.
+
+    Returns:
+        dict: Per-probe wall time, CPU time and allocated blocks (see collector_instrumentation.py).
+    """
+    return {"timestamp": datetime.datetime.now().isoformat(), **PROBES.as_metrics()}
+
 def save_metrics_to_csv(metrics_list: list[dict], filename: str = "metrics.csv"):
     """
     Saves a list of metric dictionaries to a CSV file.
@@ -254,17 +310,21 @@ def save_metrics_to_csv(metrics_list: list[dict], filename: str = "metrics.csv")
             writer.writerow(row_to_write) # Writes a single row from a dictionary.
     print(f"Metrics saved to {filename}")
 
-def save_data_to_json(data: list | dict, filename: str = "data.json"):
+def save_data_to_json(data: list | dict, filename: str = "data.json", compact: bool = False):
     """
     Saves data (list of dicts or a single dict) to a JSON file.
 
     Args:
         data (list | dict): The data to save.
         filename (str): The name of the JSON file to create.
+        compact (bool): Write without indentation or spaces after separators (much smaller files).
     """
     print(f"Saving data to {filename}...")
     with open(filename, 'w') as jsonfile: # Opens the file in write mode.
-        json.dump(data, jsonfile, indent=4) # Serializes data to JSON and writes to file, with 4-space indentation.
+        if compact:
+            json.dump(data, jsonfile, separators=(",", ":")) # No whitespace at all.
+        else:
+            json.dump(data, jsonfile, indent=4) # Serializes data to JSON and writes to file, with 4-space indentation.
     print(f"Data saved to {filename}")
 
 def load_data_from_json(filename: str = "data.json") -> list | dict | None:
@@ -311,40 +371,54 @@ def generate_dummy_cpu_data(num_points: int = 60) -> tuple[list[datetime.datetim
         current_time += datetime.timedelta(minutes=1) # Increments time by 1 minute.
     return timestamps, cpu_values
 
-def plot_cpu_trend(timestamps: list[datetime.datetime], cpu_values: list[float]):
+def plot_cpu_trend(timestamps: list[datetime.datetime], cpu_values: list[float], ax: plt.Axes | None = None) -> plt.Figure:
     """
     Plots a simulated CPU usage trend over time using Matplotlib.
 
     Args:
         timestamps (list[datetime.datetime]): List of datetime objects for the x-axis.
         cpu_values (list[float]): List of CPU usage percentages for the y-axis.
+        ax (plt.Axes | None): Axes to draw on (e.g. a reused figure); a new figure is created if None.
+
+    Returns:
+        plt.Figure: The figure containing the plot.
     """
-    plt.figure(figsize=(10, 6)) # Creates a new figure and axes.
-    plt.plot(timestamps, cpu_values, marker='o', linestyle='-', color='#004777', markersize=4) # Plots the data.
-    plt.title('Simulated CPU Usage Trend Over Time', fontsize=16, color='#004777') # Sets plot title.
-    plt.xlabel('Time', fontsize=12, color='#004777') # Sets x-axis label.
-    plt.ylabel('CPU Usage (%)', fontsize=12, color='#004777') # Sets y-axis label.
-    plt.grid(True, linestyle='--', alpha=0.7) # Adds a grid to the plot.
-    plt.ylim(0, 100) # Sets y-axis limits.
-    plt.xticks(rotation=45, ha='right') # Rotates x-axis labels for readability.
-    plt.tight_layout() # Adjusts plot parameters for a tight layout.
+    if ax is None:
+        plt.figure(figsize=(10, 6)) # Creates a new figure and axes.
+        ax = plt.gca()
+    ax.plot(timestamps, cpu_values, marker='o', linestyle='-', color='#004777', markersize=4) # Plots the data.
+    ax.set_title('Simulated CPU Usage Trend Over Time', fontsize=16, color='#004777') # Sets plot title.
+    ax.set_xlabel('Time', fontsize=12, color='#004777') # Sets x-axis label.
+    ax.set_ylabel('CPU Usage (%)', fontsize=12, color='#004777') # Sets y-axis label.
+    ax.grid(True, linestyle='--', alpha=0.7) # Adds a grid to the plot.
+    ax.set_ylim(0, 100) # Sets y-axis limits.
+    plt.setp(ax.get_xticklabels(), rotation=45, ha='right') # Rotates x-axis labels for readability.
+    ax.figure.tight_layout() # Adjusts plot parameters for a tight layout.
     # plt.show() # Uncomment to display the plot (will block execution).
+    return ax.figure
 
-def plot_latency_distribution(data: np.ndarray):
+def plot_latency_distribution(data: np.ndarray, ax: plt.Axes | None = None) -> plt.Figure:
     """
     Plots the distribution of hypothetical API latency using Seaborn.
 
     Args:
         data (np.ndarray): Numerical data representing latency values.
+        ax (plt.Axes | None): Axes to draw on (e.g. a reused figure); a new figure is created if None.
+
+    Returns:
+        plt.Figure: The figure containing the plot.
     """
-    plt.figure(figsize=(8, 5))
-    sns.histplot(data, kde=True, color='#00AFB9', bins=30) # Creates a histogram with a Kernel Density Estimate.
-    plt.title('Distribution of API Latency', fontsize=16, color='#004777')
-    plt.xlabel('Latency (ms)', fontsize=12, color='#004777')
-    plt.ylabel('Frequency', fontsize=12, color='#004777')
-    plt.grid(True, linestyle='--', alpha=0.7)
-    plt.tight_layout()
+    if ax is None:
+        plt.figure(figsize=(8, 5))
+        ax = plt.gca()
+    sns.histplot(data, kde=True, color='#00AFB9', bins=30, ax=ax) # Creates a histogram with a Kernel Density Estimate.
+    ax.set_title('Distribution of API Latency', fontsize=16, color='#004777')
+    ax.set_xlabel('Latency (ms)', fontsize=12, color='#004777')
+    ax.set_ylabel('Frequency', fontsize=12, color='#004777')
+    ax.grid(True, linestyle='--', alpha=0.7)
+    ax.figure.tight_layout()
     # plt.show() # Uncomment to display the plot (will block execution).
+    return ax.figure
 
 # --- Main Execution Block for Demonstrations ---
 if __name__ == "__main__":
@@ -388,9 +462,22 @@ if __name__ == "__main__":
     print("\n  Saving comprehensive metrics to CSV (excluding complex types)...")
     save_metrics_to_csv(collected_comp_metrics, "comprehensive_metrics_simple.csv")
 
+    print("\n  Collector overhead so far (per probe):")
+    print(get_collector_metrics())
+
+    print("\n  Saving comprehensive metrics in columnar form (processes in a separate table)...")
+    save_metrics_columnar(collected_comp_metrics, "comprehensive_metrics", fmt="csv")
+
     print("\n  Saving comprehensive metrics to JSON...")
     save_data_to_json(collected_comp_metrics, "comprehensive_metrics.json")
     
+    print("\n  Collecting per-core, per-disk and per-NIC metrics and saving them compressed...")
+    per_device_metrics = []
+    for _ in range(3):
+        per_device_metrics.append(get_comprehensive_metrics(percpu=True, perdisk=True, pernic=True))
+        time.sleep(0.5)
+    save_compressed_metrics(per_device_metrics, "per_device_metrics_compressed.json")
+
     print("\n  Loading comprehensive metrics from JSON...")
     loaded_json_data = load_data_from_json("comprehensive_metrics.json")
     if loaded_json_data:
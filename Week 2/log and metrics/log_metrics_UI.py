@@ -3,6 +3,9 @@ import datetime # Module for working with dates and times.
 import random   # Module for generating random numbers and choices.
 import time     # Module for time-related functions, like delays.
 import re       # Module for regular expressions.
+import io       # Module for in-memory binary buffers (rendered plot images).
+import os       # Module for file modification times (cache keys).
+import threading # Module for running long tasks in background threads.
 import psutil   # Cross-platform library for system and process information.
 import csv      # Module for reading and writing CSV files.
 import json     # Module for working with JSON data.
@@ -46,14 +49,16 @@ def generate_log_message(level: str) -> str:
         return random.choice(ERROR_MESSAGES).format(service=service, error_code=error_code, disk_path=disk_path, reason=reason)
     return "Generic log message."
 
-def simulate_log_file(filename: str = "app.log", num_entries: int = 100, interval_seconds: float = 0.05):
+def simulate_log_file(filename: str = "app.log", num_entries: int = 100, interval_seconds: float = 0.05, progress=None):
     """
     Generates a simulated application log file with varying log levels and messages.
+    Runs in a background thread, so it reports through `progress(done, total, message)`
+    instead of calling Streamlit directly.
     """
     current_time = datetime.datetime.now()
-    status_placeholder = st.empty() # Placeholder for real-time updates in Streamlit.
-    status_placeholder.info(f"Generating {num_entries} log entries to {filename}...")
-    
+    if progress:
+        progress(0, num_entries, f"Generating {num_entries} log entries to {filename}...")
+
     with open(filename, "w") as f:
         for i in range(num_entries):
             level = random.choices(LOG_LEVELS, weights=[0.7, 0.2, 0.08, 0.02], k=1)[0]
@@ -66,10 +71,12 @@ def simulate_log_file(filename: str = "app.log", num_entries: int = 100, interva
             current_time += datetime.timedelta(seconds=random.uniform(interval_seconds * 0.5, interval_seconds * 1.5))
             time.sleep(0.001) 
 
-            if (i + 1) % 100 == 0:
-                status_placeholder.info(f"Generated {i + 1} entries...")
+            if (i + 1) % 100 == 0 and progress:
+                f.flush() # Lets the parser see the entries written so far.
+                progress(i + 1, num_entries, f"Generated {i + 1} entries...")
 
-    status_placeholder.success(f"Finished generating {num_entries} log entries to {filename}.")
+    if progress:
+        progress(num_entries, num_entries, f"Finished generating {num_entries} log entries to {filename}.")
 
 # --- Day 7 (Part 1): Reading and Parsing Logs ---
 def read_log_file(filepath: str) -> list[str]:
@@ -113,6 +120,17 @@ def parse_complex_log(log_line: str) -> dict:
         return match.groupdict()
     return {"raw_line": log_line.strip(), "parse_error": "No match"}
 
+@st.cache_data(show_spinner="Parsing log file...", max_entries=8)
+def load_parsed_logs(filepath: str, mtime: float, parse_type: str) -> tuple[list[str], list[dict]]:
+    """
+    Reads and parses a log file once per (path, modification time, parsing method).
+    `mtime` is only part of the cache key: regenerating the file changes it,
+    so widget interactions reuse the parsed result and a new file is re-parsed.
+    """
+    raw_logs = read_log_file(filepath)
+    parser = parse_basic_log if parse_type == "Basic (String Split)" else parse_complex_log
+    return raw_logs, [parser(log_line) for log_line in raw_logs]
+
 # --- Day 7 (Part 2): Generating System Metrics (Intro) ---
 def get_system_metrics() -> dict:
     """
@@ -178,6 +196,20 @@ def get_comprehensive_metrics() -> dict:
 
     return metrics
 
+def collect_metrics_batch(metric_type: str, count: int, interval_seconds: float, progress=None) -> list[dict]:
+    """
+    Collects `count` metric snapshots, `interval_seconds` apart (runs in a background thread).
+    """
+    collect = get_system_metrics if metric_type == "Basic Metrics" else get_comprehensive_metrics
+    batch = []
+    for i in range(count):
+        batch.append(collect())
+        if progress:
+            progress(i + 1, count, f"Collected {i + 1}/{count} snapshots")
+        if i < count - 1:
+            time.sleep(interval_seconds)
+    return batch
+
 def save_metrics_to_csv(metrics_list: list[dict], filename: str = "metrics.csv"):
     """
     Saves a list of metric dictionaries to a CSV file.
@@ -273,6 +305,100 @@ def plot_latency_distribution(data: np.ndarray) -> plt.Figure:
     plt.tight_layout()
     return fig # Returns the figure object.
 
+def figure_to_png(fig: plt.Figure) -> bytes:
+    """
+    Renders a figure to PNG bytes and closes it (cached images replace live figures).
+    """
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png")
+    plt.close(fig)
+    return buffer.getvalue()
+
+# Rendered plots are kept in the session state per (parameters, generation).
+# Reruns triggered by other widgets redisplay the stored image; the "Generate"
+# buttons bump the generation number to draw new random data. (st.cache_data
+# is shared by all sessions, so every browser tab would get the same plot.)
+def session_plot(name: str, render, num_points: int, generation: int) -> bytes:
+    """
+    Returns this session's PNG for `name`, rendering it only when the parameters or generation changed.
+    """
+    key = f"{name}_png"
+    stored = st.session_state.get(key)
+    if stored is None or stored[0] != (num_points, generation):
+        stored = ((num_points, generation), render(num_points))
+        st.session_state[key] = stored
+    return stored[1]
+
+def render_cpu_plot(num_points: int) -> bytes:
+    timestamps, cpu_values = generate_dummy_cpu_data(num_points)
+    return figure_to_png(plot_cpu_trend(timestamps, cpu_values))
+
+def render_latency_plot(num_points: int) -> bytes:
+    latency_data = np.random.normal(loc=150, scale=30, size=num_points)
+    latency_data = latency_data[latency_data > 0]
+    return figure_to_png(plot_latency_distribution(latency_data))
+
+# --- Background Jobs ---
+# Long-running steps (log generation, metric batches) run in daemon threads so
+# the page stays responsive. Threads must not call Streamlit functions; they
+# report progress on the job object and the page polls it.
+JOB_POLL_SECONDS = 0.5
+
+class BackgroundJob:
+    """
+    Runs `target(*args, progress=...)` in a daemon thread and records its progress.
+    """
+    def __init__(self, target, *args):
+        self.progress = 0.0
+        self.message = "Starting..."
+        self.result = None
+        self.error = None
+        self._thread = threading.Thread(target=self._run, args=(target, args), daemon=True)
+        self._thread.start()
+
+    def _run(self, target, args):
+        try:
+            self.result = target(*args, progress=self.update)
+        except Exception as e:
+            self.error = e
+
+    def update(self, done: int, total: int, message: str = ""):
+        self.progress = done / total if total else 1.0
+        self.message = message
+
+    @property
+    def running(self) -> bool:
+        return self._thread.is_alive()
+
+@st.cache_resource
+def get_log_jobs() -> dict:
+    """
+    Log generation jobs by file name. Shared by all sessions, since they write to the same files.
+    """
+    return {}
+
+def show_job_progress(job: BackgroundJob | None, label: str):
+    """
+    Shows a job's progress bar, re-polling only this element while the job runs.
+    When the job finishes, the whole page reruns once to pick up the result.
+    """
+    if job is None:
+        return
+    polling = job.running
+
+    @st.fragment(run_every=JOB_POLL_SECONDS if polling else None)
+    def job_status():
+        if job.running:
+            st.progress(job.progress, text=f"{label}: {job.message}")
+        elif polling:
+            st.rerun() # Finished since the page was drawn.
+        elif job.error:
+            st.error(f"{label} failed: {job.error}")
+        else:
+            st.success(job.message)
+
+    job_status()
+
 # --- Streamlit Application Layout ---
 
 st.set_page_config(layout="wide", page_title="AIOps Week 2 Playground")
@@ -287,34 +413,44 @@ log_filename = st.text_input("Log File Name:", "app.log", key="log_file_name_inp
 num_log_entries = st.number_input("Number of Log Entries:", min_value=10, max_value=10000, value=500, step=100, key="num_log_entries_input")
 log_interval = st.slider("Average Interval Between Entries (seconds):", min_value=0.001, max_value=0.1, value=0.01, step=0.001, format="%.3f", key="log_interval_slider")
 
+log_jobs = get_log_jobs()
 if st.button("Generate Logs", key="generate_logs_button"):
-    simulate_log_file(log_filename, num_log_entries, log_interval)
+    if log_filename in log_jobs and log_jobs[log_filename].running:
+        st.warning(f"{log_filename} is already being generated.")
+    else:
+        log_jobs[log_filename] = BackgroundJob(simulate_log_file, log_filename, num_log_entries, log_interval)
+show_job_progress(log_jobs.get(log_filename), "Log generation")
 
 # --- Day 7 (Part 1): Reading and Parsing Logs ---
 st.header("2. Reading & Parsing Logs (Day 7.1)")
 st.write("Read and parse log entries from a file.")
 read_log_filepath = st.text_input("File to Read:", "app.log", key="read_log_filepath_input")
+parse_type = st.radio("Choose Parsing Method:", ("Basic (String Split)", "Complex (Regex)"), key="parse_method_radio")
 
 if st.button("Read Logs", key="read_logs_button"):
-    raw_logs = read_log_file(read_log_filepath)
-    if raw_logs:
-        st.subheader("Raw Log Entries (First 10)")
-        for i, log_line in enumerate(raw_logs[:10]):
-            st.code(log_line)
-        
-        st.subheader("Parse Log Entries")
-        parse_type = st.radio("Choose Parsing Method:", ("Basic (String Split)", "Complex (Regex)"), key="parse_method_radio")
-        
-        parsed_results = []
-        for log_line in raw_logs:
-            if parse_type == "Basic (String Split)":
-                parsed_results.append(parse_basic_log(log_line))
-            else:
-                parsed_results.append(parse_complex_log(log_line))
-        
+    st.session_state.log_file_to_read = read_log_filepath # Keeps showing the file on later reruns.
+
+if st.session_state.get("log_file_to_read"):
+    log_path = st.session_state.log_file_to_read
+    try:
+        log_mtime = os.path.getmtime(log_path)
+    except OSError:
+        st.error(f"Error: File not found at {log_path}")
+        log_mtime = None
+
+    if log_mtime is not None:
+        if log_path in log_jobs and log_jobs[log_path].running:
+            st.info(f"{log_path} is still being generated; showing the entries written so far.")
+        raw_logs, parsed_results = load_parsed_logs(log_path, log_mtime, parse_type)
+        st.session_state.parsed_results = parsed_results
+        if raw_logs:
+            st.subheader("Raw Log Entries (First 10)")
+            for log_line in raw_logs[:10]:
+                st.code(log_line)
+
         if parsed_results:
-            st.subheader("Parsed Log Data (First 10)")
-            st.dataframe(pd.DataFrame(parsed_results).head(10)) # Display as DataFrame for better viewing
+            st.subheader(f"Parsed Log Data (First 10 of {len(parsed_results)})")
+            st.dataframe(pd.DataFrame(parsed_results[:10])) # Display as DataFrame for better viewing
             st.json(parsed_results[0]) # Show full JSON of first entry
         else:
             st.info("No logs parsed or file was empty.")
@@ -334,15 +470,24 @@ with col1:
             st.session_state.current_metrics = get_system_metrics()
         else:
             st.session_state.current_metrics = get_comprehensive_metrics()
-        st.json(st.session_state.current_metrics)
-    
     if 'current_metrics' in st.session_state and st.session_state.current_metrics:
         st.subheader("Current Metrics Snapshot")
         st.json(st.session_state.current_metrics)
 
+    st.subheader("Collect Metrics Batch")
+    batch_size = st.number_input("Snapshots in Batch:", min_value=2, max_value=600, value=10, step=1, key="batch_size_input")
+    batch_interval = st.number_input("Seconds Between Snapshots:", min_value=0.1, max_value=60.0, value=1.0, step=0.5, key="batch_interval_input")
+    metrics_job = st.session_state.get("metrics_job")
+    if st.button("Collect Metrics Batch", key="collect_batch_button", disabled=bool(metrics_job and metrics_job.running)):
+        metrics_job = BackgroundJob(collect_metrics_batch, metric_type, batch_size, batch_interval)
+        st.session_state.metrics_job = metrics_job
+    show_job_progress(metrics_job, "Metrics batch")
+    if metrics_job and not metrics_job.running and metrics_job.result:
+        st.dataframe(pd.DataFrame(metrics_job.result).drop(columns=["top_processes_cpu"], errors="ignore"))
+
 with col2:
     st.subheader("Save Collected Data")
-    save_data_type = st.radio("Data to Save:", ("Current Metrics Snapshot", "Parsed Logs (if available)"), key="save_data_type_radio")
+    save_data_type = st.radio("Data to Save:", ("Current Metrics Snapshot", "Collected Metrics Batch", "Parsed Logs (if available)"), key="save_data_type_radio")
     save_format = st.radio("Save Format:", ("CSV", "JSON"), key="save_format_radio")
     save_filename = st.text_input("Save File Name:", "output.json", key="save_filename_input")
 
@@ -350,8 +495,10 @@ with col2:
         data_to_save = None
         if save_data_type == "Current Metrics Snapshot" and 'current_metrics' in st.session_state:
             data_to_save = [st.session_state.current_metrics] # Wrap in list for consistency
-        elif save_data_type == "Parsed Logs (if available)" and 'parsed_results' in locals() and parsed_results:
-            data_to_save = parsed_results
+        elif save_data_type == "Collected Metrics Batch" and metrics_job and not metrics_job.running:
+            data_to_save = metrics_job.result
+        elif save_data_type == "Parsed Logs (if available)":
+            data_to_save = st.session_state.get("parsed_results")
         
         if data_to_save:
             if save_format == "CSV":
@@ -371,18 +518,17 @@ with col3:
     st.subheader("CPU Usage Trend")
     cpu_num_points = st.number_input("Number of CPU Data Points:", min_value=10, max_value=200, value=60, step=10, key="cpu_num_points_input")
     if st.button("Generate CPU Plot", key="generate_cpu_plot_button"):
-        timestamps, cpu_values = generate_dummy_cpu_data(cpu_num_points)
-        fig_cpu = plot_cpu_trend(timestamps, cpu_values)
-        st.pyplot(fig_cpu) # Display the Matplotlib figure.
+        st.session_state.cpu_plot_generation = st.session_state.get("cpu_plot_generation", 0) + 1
+    if "cpu_plot_generation" in st.session_state:
+        st.image(session_plot("cpu_plot", render_cpu_plot, cpu_num_points, st.session_state.cpu_plot_generation)) # Stored PNG of the figure.
 
 with col4:
     st.subheader("API Latency Distribution")
     latency_num_points = st.number_input("Number of Latency Data Points:", min_value=100, max_value=1000, value=500, step=100, key="latency_num_points_input")
     if st.button("Generate Latency Plot", key="generate_latency_plot_button"):
-        latency_data = np.random.normal(loc=150, scale=30, size=latency_num_points)
-        latency_data = latency_data[latency_data > 0]
-        fig_latency = plot_latency_distribution(latency_data)
-        st.pyplot(fig_latency) # Display the Matplotlib figure.
+        st.session_state.latency_plot_generation = st.session_state.get("latency_plot_generation", 0) + 1
+    if "latency_plot_generation" in st.session_state:
+        st.image(session_plot("latency_plot", render_latency_plot, latency_num_points, st.session_state.latency_plot_generation)) # Stored PNG of the figure.
 
 st.markdown("---")
 st.markdown("### Python Regex Tester (from Day 5)")
@@ -0,0 +1,277 @@
+import base64 # Module for encoding binary blobs as text (so they fit in JSON).
+import datetime # Module for working with dates and times.
+import json     # Module for working with JSON data.
+import struct   # Module for converting floats to their raw 64-bit representation.
+
+# --- Gorilla-style compression for metric time series ---
+# Timestamps are stored as delta-of-delta and values as XOR against the
+# previous value (Pelkonen et al., "Gorilla: A Fast, Scalable, In-Memory
+# Time Series Database"). Regularly sampled metrics that change slowly
+# compress to a few bits per point, which keeps per-core/per-disk/per-NIC
+# history small enough to store.
+
+# Delta-of-delta buckets: (prefix bits, prefix length, value bits).
+# A delta-of-delta of 0 is a single '0' bit.
+DOD_BUCKETS = [
+    (0b10, 2, 7),
+    (0b110, 3, 9),
+    (0b1110, 4, 12),
+    (0b1111, 4, 64),
+]
+
+class BitWriter:
+    """
+    Appends values bit by bit into a bytearray.
+    """
+    def __init__(self):
+        self.buffer = bytearray()
+        self._acc = 0 # Pending bits not yet flushed to the buffer.
+        self._nbits = 0
+
+    def write(self, value: int, nbits: int):
+        self._acc = (self._acc << nbits) | (value & ((1 << nbits) - 1))
+        self._nbits += nbits
+        while self._nbits >= 8: # Flushes every complete byte.
+            self._nbits -= 8
+            self.buffer.append((self._acc >> self._nbits) & 0xFF)
+        self._acc &= (1 << self._nbits) - 1
+
+    def to_bytes(self) -> bytes:
+        if self._nbits: # Pads the last partial byte with zeros.
+            return bytes(self.buffer) + bytes([(self._acc << (8 - self._nbits)) & 0xFF])
+        return bytes(self.buffer)
+
+class BitReader:
+    """
+    Reads values bit by bit from a bytes object written by BitWriter.
+    """
+    def __init__(self, data: bytes):
+        self.data = data
+        self._pos = 0 # Next byte to load.
+        self._acc = 0
+        self._nbits = 0
+
+    def read(self, nbits: int) -> int:
+        while self._nbits < nbits:
+            self._acc = (self._acc << 8) | self.data[self._pos]
+            self._pos += 1
+            self._nbits += 8
+        self._nbits -= nbits
+        value = self._acc >> self._nbits
+        self._acc &= (1 << self._nbits) - 1
+        return value
+
+def _float_to_bits(value: float) -> int:
+    return struct.unpack('>Q', struct.pack('>d', value))[0]
+
+def _bits_to_float(bits: int) -> float:
+    return struct.unpack('>d', struct.pack('>Q', bits))[0]
+
+def _write_timestamps(writer: BitWriter, timestamps: list[int]):
+    """
+    Encodes integer timestamps (e.g. epoch milliseconds) as delta-of-delta.
+    """
+    writer.write(timestamps[0], 64)
+    prev_ts, prev_delta = timestamps[0], 0
+    for ts in timestamps[1:]:
+        delta = ts - prev_ts
+        dod = delta - prev_delta
+        if dod == 0:
+            writer.write(0, 1)
+        else:
+            for prefix, prefix_len, value_bits in DOD_BUCKETS:
+                limit = 1 << (value_bits - 1)
+                if -limit <= dod < limit: # Picks the smallest bucket that fits (two's complement).
+                    writer.write(prefix, prefix_len)
+                    writer.write(dod, value_bits)
+                    break
+        prev_ts, prev_delta = ts, delta
+
+def _read_timestamps(reader: BitReader, count: int) -> list[int]:
+    timestamps = [reader.read(64)]
+    prev_delta = 0
+    for _ in range(count - 1):
+        if reader.read(1) == 0:
+            dod = 0
+        else:
+            prefix_len = 1
+            while prefix_len < 4 and reader.read(1) == 1: # Counts leading '1' bits of the prefix.
+                prefix_len += 1
+            value_bits = DOD_BUCKETS[prefix_len - 1][2]
+            dod = reader.read(value_bits)
+            if dod >= 1 << (value_bits - 1): # Restores the sign.
+                dod -= 1 << value_bits
+        prev_delta += dod
+        timestamps.append(timestamps[-1] + prev_delta)
+    return timestamps
+
+def _write_values(writer: BitWriter, values: list[float]):
+    """
+    Encodes float values as XOR against the previous value.
+    """
+    prev = _float_to_bits(values[0])
+    writer.write(prev, 64)
+    prev_leading, prev_trailing = 65, 65 # No previous window yet.
+    for value in values[1:]:
+        bits = _float_to_bits(value)
+        xor = bits ^ prev
+        if xor == 0:
+            writer.write(0, 1) # Same value as before.
+        else:
+            leading = min(64 - xor.bit_length(), 31) # Stored in 5 bits.
+            trailing = (xor & -xor).bit_length() - 1
+            writer.write(1, 1)
+            if leading >= prev_leading and trailing >= prev_trailing:
+                # Meaningful bits fit inside the previous window: reuse it.
+                writer.write(0, 1)
+                writer.write(xor >> prev_trailing, 64 - prev_leading - prev_trailing)
+            else:
+                meaningful = 64 - leading - trailing
+                writer.write(1, 1)
+                writer.write(leading, 5)
+                writer.write(meaningful & 0x3F, 6) # 64 is stored as 0.
+                writer.write(xor >> trailing, meaningful)
+                prev_leading, prev_trailing = leading, trailing
+        prev = bits
+
+def _read_values(reader: BitReader, count: int) -> list[float]:
+    prev = reader.read(64)
+    values = [_bits_to_float(prev)]
+    leading, trailing = 0, 0
+    for _ in range(count - 1):
+        if reader.read(1) == 1:
+            if reader.read(1) == 1:
+                leading = reader.read(5)
+                meaningful = reader.read(6) or 64
+                trailing = 64 - leading - meaningful
+            prev ^= reader.read(64 - leading - trailing) << trailing
+        values.append(_bits_to_float(prev))
+    return values
+
+def compress_series(timestamps: list[int], values: list[float]) -> bytes:
+    """
+    Compresses one time series with delta-of-delta timestamps and XOR values.
+
+    Args:
+        timestamps (list[int]): Integer timestamps in ascending order (e.g. epoch ms).
+        values (list[float]): Values aligned with the timestamps.
+
+    Returns:
+        bytes: The compressed series.
+    """
+    if len(timestamps) != len(values):
+        raise ValueError("timestamps and values must have the same length")
+    writer = BitWriter()
+    writer.write(len(values), 32) # Header: number of points.
+    if values:
+        _write_timestamps(writer, timestamps)
+        _write_values(writer, [float(v) for v in values])
+    return writer.to_bytes()
+
+def decompress_series(data: bytes) -> tuple[list[int], list[float]]:
+    """
+    Decompresses a series produced by compress_series.
+
+    Args:
+        data (bytes): The compressed series.
+
+    Returns:
+        tuple[list[int], list[float]]: Timestamps and values.
+    """
+    reader = BitReader(data)
+    count = reader.read(32)
+    if count == 0:
+        return [], []
+    timestamps = _read_timestamps(reader, count)
+    values = _read_values(reader, count)
+    return timestamps, values
+
+# --- Per-core / per-disk / per-NIC series storage ---
+
+def flatten_metric_series(metrics: dict) -> dict[str, float]:
+    """
+    Flattens one metrics snapshot into named numeric series.
+
+    Scalars keep their key, lists get an index suffix (cpu_percent_per_core.3)
+    and nested dicts are joined with dots (disk_io_per_disk.sda.read_bytes).
+    Non-numeric entries such as top_processes_cpu are skipped.
+
+    Args:
+        metrics (dict): A snapshot from get_comprehensive_metrics().
+
+    Returns:
+        dict[str, float]: Series name to value.
+    """
+    flat = {}
+    def _walk(prefix, value):
+        if isinstance(value, bool):
+            flat[prefix] = float(value)
+        elif isinstance(value, (int, float)):
+            flat[prefix] = float(value)
+        elif isinstance(value, dict):
+            for k, v in value.items():
+                _walk(f"{prefix}.{k}", v)
+        elif isinstance(value, list) and all(isinstance(v, (int, float)) for v in value):
+            for i, v in enumerate(value):
+                _walk(f"{prefix}.{i}", v)
+    for key, value in metrics.items():
+        if key != "timestamp":
+            _walk(key, value)
+    return flat
+
+def save_compressed_metrics(metrics_list: list[dict], filename: str = "metrics_compressed.json"):
+    """
+    Saves a list of metric snapshots as Gorilla-compressed series in a JSON file.
+
+    Each series is stored as a base64 blob keyed by its flattened name, so a
+    64-core host costs a few bytes per core per sample instead of a full JSON
+    number with its key.
+
+    Args:
+        metrics_list (list[dict]): Snapshots from get_comprehensive_metrics().
+        filename (str): The name of the JSON file to create.
+    """
+    if not metrics_list:
+        print("No metrics to save.")
+        return
+
+    series = {} # Series name -> (timestamps, values)
+    for metrics in metrics_list:
+        ts_ms = int(datetime.datetime.fromisoformat(metrics["timestamp"]).timestamp() * 1000)
+        for name, value in flatten_metric_series(metrics).items():
+            timestamps, values = series.setdefault(name, ([], []))
+            timestamps.append(ts_ms)
+            values.append(value)
+
+    payload = {
+        "encoding": "gorilla-v1",
+        "series": {
+            name: base64.b64encode(compress_series(ts, vals)).decode("ascii")
+            for name, (ts, vals) in series.items()
+        }
+    }
+    print(f"Saving {len(series)} compressed series to {filename}...")
+    with open(filename, 'w') as jsonfile:
+        json.dump(payload, jsonfile, separators=(",", ":"))
+    print(f"Compressed metrics saved to {filename}")
+
+def load_compressed_metrics(filename: str = "metrics_compressed.json") -> dict[str, tuple[list[int], list[float]]] | None:
+    """
+    Loads series saved by save_compressed_metrics.
+
+    Args:
+        filename (str): The name of the JSON file to load.
+
+    Returns:
+        dict | None: Series name to (timestamps in ms, values), or None if an error occurs.
+    """
+    try:
+        with open(filename, 'r') as jsonfile:
+            payload = json.load(jsonfile)
+    except (FileNotFoundError, json.JSONDecodeError) as e:
+        print(f"Error loading compressed metrics from {filename}: {e}")
+        return None
+    return {
+        name: decompress_series(base64.b64decode(blob))
+        for name, blob in payload["series"].items()
+    }
@@ -0,0 +1,220 @@
+"""
+anomaly_ensemble.py
+
+IsolationForest + OneClassSVM + LocalOutlierFactor (novelty=True) as one
+anomaly detector.
+
+  - Every batch is scaled once and the same array goes to all members,
+    which score it concurrently on a thread pool (the heavy parts of
+    scikit-learn's scoring run in native code).
+  - Raw scores live on different scales, so each member's decision_function
+    is turned into a robust z-score (median / MAD of a held-out calibration
+    split). The ensemble score is their mean, shifted so that 0 is the
+    `contamination` quantile of the calibration data: negative = anomaly,
+    the same convention as decision_function.
+  - After fitting, each member is timed on a micro-batch of `probe_rows`
+    rows. The budget per member defaults to the latency of the base member
+    (IsolationForest, always kept) times LATENCY_FACTOR: members run
+    concurrently, so the ensemble then costs about as much wall time as the
+    forest alone instead of three times as much. Members over budget whose
+    cost grows with the training set (OneClassSVM: support vectors, LOF:
+    neighbour search) are refitted on half as many rows until they fit; if
+    they still do not at `min_train_rows`, they are dropped.
+
+    ensemble = AnomalyEnsemble(contamination=0.1).fit(X)
+    decision, is_anomaly = ensemble(X_new)
+    ensemble.latency_report()   # per-member rows, fit time, latency, status
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from sklearn.ensemble import IsolationForest
+from sklearn.neighbors import LocalOutlierFactor
+from sklearn.svm import OneClassSVM
+
+MEMBERS = ("IsolationForest", "OneClassSVM", "LOF")
+MAX_TRAIN_ROWS = {"IsolationForest": None, "OneClassSVM": 10_000, "LOF": 50_000}
+SUBSAMPLED = ("OneClassSVM", "LOF")  # members whose scoring cost grows with the training rows
+BASE_MEMBER = "IsolationForest"  # never dropped; sets the default latency budget
+LATENCY_FACTOR = 1.0     # default budget per member: BASE_MEMBER latency x this
+PROBE_ROWS = 256         # MAX_BATCH_ROWS of anomaly_predict_api.py
+MIN_TRAIN_ROWS = 500
+MAD_SCALE = 1.4826       # makes the MAD comparable to a standard deviation
+
+
+def make_member(name, contamination, random_state):
+    """The three detectors as configured in anomaly_train_model.py (LOF in novelty mode)."""
+    if name == "IsolationForest":
+        return IsolationForest(contamination=contamination, random_state=random_state)
+    if name == "OneClassSVM":
+        return OneClassSVM(kernel="rbf", nu=contamination, gamma="scale")
+    if name == "LOF":
+        return LocalOutlierFactor(n_neighbors=20, contamination=contamination, novelty=True)
+    raise ValueError(f"Unknown member {name!r}; choose from {MEMBERS}")
+
+
+class AnomalyEnsemble:
+    """
+    Score-normalized ensemble of IsolationForest, OneClassSVM and LOF.
+
+    Args:
+        members (tuple[str]): Names from MEMBERS.
+        contamination (float): Expected share of anomalies; sets the ensemble threshold.
+        latency_budget_ms (float | None): Max scoring time per member for probe_rows
+            rows (None: BASE_MEMBER's latency x LATENCY_FACTOR).
+        probe_rows (int): Batch size used to measure member latency.
+        min_train_rows (int): Smallest training subsample before a slow member is dropped.
+        calibration_fraction (float): Share of rows held out for score normalization.
+        random_state (int): Seed for the members and the row samples.
+    """
+
+    def __init__(self, members=MEMBERS, contamination=0.1, latency_budget_ms=None,
+                 probe_rows=PROBE_ROWS, min_train_rows=MIN_TRAIN_ROWS, calibration_fraction=0.2,
+                 random_state=42):
+        self.members = tuple(members)
+        self.contamination = contamination
+        self.latency_budget_ms = latency_budget_ms
+        self.probe_rows = probe_rows
+        self.min_train_rows = min_train_rows
+        self.calibration_fraction = calibration_fraction
+        self.random_state = random_state
+        self._pool = None
+
+    # The thread pool cannot be pickled; it is recreated on first use after loading.
+    def __getstate__(self):
+        return {k: v for k, v in self.__dict__.items() if k != "_pool"}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state, _pool=None)
+
+    @property
+    def pool(self):
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=len(self.members), thread_name_prefix="ensemble")
+        return self._pool
+
+    def preprocess(self, X):
+        """StandardScaler transform with the statistics of the training data."""
+        return (np.asarray(X, dtype=np.float64) - self.mean_) / self.scale_
+
+    def _fit_member(self, name, X, rows):
+        if rows is not None and rows < len(X):
+            X = X[np.random.default_rng(self.random_state).choice(len(X), rows, replace=False)]
+        start = time.perf_counter()
+        model = make_member(name, self.contamination, self.random_state).fit(X)
+        return model, len(X), time.perf_counter() - start
+
+    def _time_member(self, name, probe, repeats=3):
+        """Best-of-`repeats` scoring time of one member on the probe batch, in ms."""
+        best = np.inf
+        for _ in range(repeats):
+            start = time.perf_counter()
+            self.models_[name].decision_function(probe)
+            best = min(best, time.perf_counter() - start)
+        return best * 1000
+
+    def fit(self, X):
+        """
+        Fits all members concurrently, enforces the latency budget and
+        calibrates the score normalization.
+
+        Returns:
+            AnomalyEnsemble: self, for chaining.
+        """
+        X = np.asarray(X, dtype=np.float64)
+        self.mean_ = X.mean(axis=0)
+        self.scale_ = X.std(axis=0)
+        self.scale_[self.scale_ == 0] = 1.0
+        X = self.preprocess(X)
+
+        rng = np.random.default_rng(self.random_state)
+        order = rng.permutation(len(X))
+        n_cal = max(int(len(X) * self.calibration_fraction), 1)
+        calibration, train = X[order[:n_cal]], X[order[n_cal:]]
+
+        self.models_, self.train_rows_, self.fit_seconds_, self.status_ = {}, {}, {}, {}
+        futures = {name: self.pool.submit(self._fit_member, name, train, MAX_TRAIN_ROWS.get(name))
+                   for name in self.members}
+        for name, future in futures.items():
+            self.models_[name], self.train_rows_[name], self.fit_seconds_[name] = future.result()
+            self.status_[name] = "ok" if self.train_rows_[name] == len(train) else "subsampled"
+
+        self._enforce_latency_budget(train, calibration)
+
+        # Robust z-score per member, then the ensemble threshold on the calibration split.
+        self.norm_ = {}
+        for name, model in self.models_.items():
+            scores = model.decision_function(calibration)
+            median = np.median(scores)
+            spread = np.median(np.abs(scores - median)) * MAD_SCALE or scores.std() or 1.0
+            self.norm_[name] = (median, spread)
+        self.threshold_ = 0.0  # _combine subtracts it
+        self.threshold_ = np.quantile(self._combine(calibration)[0], self.contamination)
+        return self
+
+    def _enforce_latency_budget(self, train, calibration):
+        probe = np.resize(calibration, (self.probe_rows, calibration.shape[1]))
+        self.latency_ms_ = {name: self._time_member(name, probe) for name in self.models_}
+        keep = BASE_MEMBER if BASE_MEMBER in self.models_ else min(self.models_, key=self.latency_ms_.get)
+        self.budget_ms_ = self.latency_budget_ms
+        if self.budget_ms_ is None:
+            self.budget_ms_ = self.latency_ms_[keep] * LATENCY_FACTOR
+        for name in list(self.models_):
+            rows = self.train_rows_[name]
+            while (self.latency_ms_[name] > self.budget_ms_ and name in SUBSAMPLED
+                   and rows // 2 >= self.min_train_rows):
+                rows //= 2
+                self.models_[name], self.train_rows_[name], self.fit_seconds_[name] = \
+                    self._fit_member(name, train, rows)
+                self.status_[name] = "subsampled"
+                self.latency_ms_[name] = self._time_member(name, probe)
+            if self.latency_ms_[name] > self.budget_ms_ and name != keep:
+                del self.models_[name]
+                self.status_[name] = f"dropped ({self.latency_ms_[name]:.1f} ms > {self.budget_ms_:.1f} ms)"
+
+    def _score_member(self, name, X):
+        start = time.perf_counter()
+        median, spread = self.norm_[name]
+        z = (self.models_[name].decision_function(X) - median) / spread
+        return z, (time.perf_counter() - start) * 1000
+
+    def _combine(self, X):
+        """Mean normalized score of all members on a preprocessed batch, plus per-member latency."""
+        if len(self.models_) == 1:
+            results = {name: self._score_member(name, X) for name in self.models_}
+        else:
+            futures = {name: self.pool.submit(self._score_member, name, X) for name in self.models_}
+            results = {name: f.result() for name, f in futures.items()}
+        combined = np.mean([z for z, _ in results.values()], axis=0) - self.threshold_
+        return combined, {name: ms for name, (_, ms) in results.items()}
+
+    def score(self, X):
+        """
+        Scores a batch of raw feature rows.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray, dict]: Ensemble decision (negative =
+                anomaly), boolean anomaly flags and scoring ms per member.
+        """
+        decision, latency = self._combine(self.preprocess(X))
+        self.last_latency_ms_ = latency
+        return decision, decision < 0, latency
+
+    def __call__(self, X):
+        """(decision, is_anomaly) like the single-model scorers of anomaly_predict_api.py."""
+        return self.score(X)[:2]
+
+    def latency_report(self):
+        """Per-member training rows, fit time, calibrated and last latency, and status."""
+        last = getattr(self, "last_latency_ms_", {})
+        return {
+            name: {
+                "train_rows": self.train_rows_[name],
+                "fit_s": round(self.fit_seconds_[name], 3),
+                f"latency_ms_{self.probe_rows}_rows": round(self.latency_ms_[name], 3),
+                "last_ms": round(last[name], 3) if name in last else None,
+                "status": self.status_[name],
+            }
+            for name in self.members
+        }
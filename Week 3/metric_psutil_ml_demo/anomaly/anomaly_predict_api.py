@@ -1,33 +1,195 @@
 from fastapi import FastAPI
 from pydantic import BaseModel
+import asyncio
+import os
+import sys
 import joblib
 import numpy as np
 import uvicorn
 
-# Load model and scaler
-model = joblib.load("anomaly_model.pkl")
-scaler = joblib.load("scaler.pkl")
+DEMO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # modules shared by anomaly/ and clustering/
+if DEMO_DIR not in sys.path:
+    sys.path.append(DEMO_DIR)
+from model_registry import ModelRegistry, ModelWatcher
+from feature_pipeline import PIPELINE_FILE, FeaturePipeline, SeriesStreams
+
+# Micro-batching: concurrent requests are collected for up to MAX_WAIT_MS or
+# MAX_BATCH_ROWS rows and scored together in one matrix call.
+MAX_BATCH_ROWS = 256
+MAX_WAIT_MS = 2
+
+REGISTRY_DIR = "registry"  # versions published by anomaly_train_model.py
+FUSED_MODEL = "anomaly_inference.npz"
+ENSEMBLE_MODEL = "anomaly_ensemble.pkl"
+USE_ENSEMBLE = False  # IsolationForest + OneClassSVM + LOF instead of the forest alone
+FEATURES = ["cpu", "ram", "net_sent", "net_recv"]
+
+def load_detector(directory: str, manifest: dict | None):
+    """
+    Builds score_rows(X, series) -> (decision, is_anomaly) from a registry version directory
+    (or, with manifest None, from the unversioned files in the working directory).
+
+    series[i] names the metric stream (host) row X[i] comes from. If the model
+    was trained on engineered features (feature_pipeline.json), each row is
+    the next row of its host's stream, so rolling windows continue across
+    batches per host and never mix hosts.
+    """
+    if manifest is not None and manifest["features"] != FEATURES:
+        raise ValueError(f"model expects features {manifest['features']}, API sends {FEATURES}")
+
+    streams = None
+    pipeline_path = os.path.join(directory, PIPELINE_FILE)
+    if os.path.exists(pipeline_path):
+        pipeline = FeaturePipeline.load(pipeline_path)
+        if pipeline.features != FEATURES:
+            raise ValueError(f"feature pipeline expects {pipeline.features}, API sends {FEATURES}")
+        streams = SeriesStreams(pipeline)  # a new version starts new stream states
+    score = _load_scorer(directory)
+
+    def score_rows(X: np.ndarray, series: list[str]) -> tuple[np.ndarray, np.ndarray]:
+        return score(X if streams is None else streams.update(series, X))
+    if hasattr(score, "latency_report"):  # keep the ensemble's report visible to GET /model
+        score_rows.latency_report = score.latency_report
+    return score_rows
+
+def _load_scorer(directory: str):
+    """score_rows(X) of the ensemble, the fused forest or the pickled forest, over the model's features."""
+    ensemble_path = os.path.join(directory, ENSEMBLE_MODEL)
+    if USE_ENSEMBLE and os.path.exists(ensemble_path):
+        # Scores the members concurrently and returns (decision, is_anomaly) itself.
+        return joblib.load(ensemble_path)
+
+    fused_path = os.path.join(directory, FUSED_MODEL)
+    if os.path.exists(fused_path):
+        # Flattened forest with the scaler folded into its thresholds,
+        # served with NumPy only (sklearn is never imported).
+        forest = dict(np.load(fused_path, allow_pickle=False))
+
+        def score_rows(X: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+            """
+            Walks all trees for all rows at once, one tree level per step.
+            Leaves point to themselves, so max_depth steps reach every leaf; a leaf
+            holds its depth plus the expected path length of its remaining samples.
+            """
+            nodes = np.broadcast_to(forest["roots"], (len(X), len(forest["roots"])))
+            rows = np.arange(len(X))[:, None]
+            for _ in range(int(forest["max_depth"])):
+                go_left = X[rows, forest["feature"][nodes]] <= forest["threshold"][nodes]
+                nodes = np.where(go_left, forest["left"][nodes], forest["right"][nodes])
+            path_length = forest["value"][nodes].mean(axis=1)
+            decision = -(2.0 ** (-path_length / forest["denominator"])) - forest["offset"]
+            return decision, decision < 0
+        return score_rows
+
+    # Load model and scaler
+    model = joblib.load(os.path.join(directory, "anomaly_model.pkl"))
+    scaler = joblib.load(os.path.join(directory, "scaler.pkl"))
+
+    def score_rows(X: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Scores a batch in one forest traversal.
+        decision_function is score_samples - offset_, and predict() is -1 exactly
+        where it is negative, so both outputs come from a single score_samples call.
+        """
+        X_scaled = (X - scaler.mean_) / scaler.scale_  # StandardScaler without per-call validation
+        decision = model.score_samples(X_scaled) - model.offset_
+        return decision, decision < 0
+    return score_rows
+
+# Serves the promoted registry version and hot-swaps it when anomaly_train_model.py promotes a new one.
+detector = ModelWatcher(ModelRegistry(REGISTRY_DIR), "anomaly", load_detector, fallback_dir=".").start()
+
+def score_rows(X: np.ndarray, series: list[str]) -> tuple[np.ndarray, np.ndarray]:
+    # Each batch uses the model that is current when it is scored.
+    return detector.model(X, series)
+
+class MicroBatcher:
+    """
+    Coalesces concurrent requests into batches and fans the results back out.
+    A batch is flushed when it reaches max_rows or max_wait_ms after its first row;
+    scoring runs in a worker thread so the event loop keeps accepting requests.
+    Batches are scored one at a time in the order they were flushed, since a
+    stateful score_fn (per-host rolling-window features) needs each host's rows
+    in time order.
+    """
+    def __init__(self, score_fn, max_rows: int = MAX_BATCH_ROWS, max_wait_ms: float = MAX_WAIT_MS):
+        self.score_fn = score_fn
+        self.max_rows = max_rows
+        self.max_wait = max_wait_ms / 1000
+        self._rows = []
+        self._series = []
+        self._futures = []
+        self._timer = None
+        self._tasks = set()  # strong references to running batches
+        self._last = None  # most recently flushed batch; the next one waits for it
+
+    async def submit(self, row: list[float], series: str) -> tuple[float, bool]:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._rows.append(row)
+        self._series.append(series)
+        self._futures.append(future)
+        if len(self._rows) >= self.max_rows:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._rows:
+            return
+        rows, series, futures = self._rows, self._series, self._futures
+        self._rows, self._series, self._futures = [], [], []
+        task = asyncio.get_running_loop().create_task(self._score(rows, series, futures, self._last))
+        self._last = task
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _score(self, rows, series, futures, previous):
+        if previous is not None:
+            await asyncio.wait([previous])  # never raises; _score handles its own errors
+        try:
+            scores, anomalies = await asyncio.to_thread(self.score_fn, np.array(rows, dtype=np.float64), series)
+        except Exception as e:
+            for future in futures:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for future, score, anomaly in zip(futures, scores.tolist(), anomalies.tolist()):
+            if not future.done():  # the client may have disconnected
+                future.set_result((score, anomaly))
+
+batcher = MicroBatcher(score_rows)
 
 app = FastAPI(title="System Metrics Anomaly Detection API")
 
 class MetricsInput(BaseModel):
+    host: str = "default"  # metric stream the row belongs to; rolling features are kept per host
     cpu: float
     ram: float
     net_sent: float
     net_recv: float
 
 @app.post("/detect")
-def detect_anomaly(data: MetricsInput):
-    X_new = np.array([[data.cpu, data.ram, data.net_sent, data.net_recv]])
-    X_scaled = scaler.transform(X_new)
-
-    pred = model.predict(X_scaled)  # -1 = anomaly, 1 = normal
-    score = model.decision_function(X_scaled)[0]  # lower = more anomalous
+async def detect_anomaly(data: MetricsInput):
+    # Waits for the batch this row joins; score < 0 = anomaly (lower = more anomalous)
+    score, anomaly = await batcher.submit([data.cpu, data.ram, data.net_sent, data.net_recv], data.host)
 
     return {
-        "anomaly": bool(pred[0] == -1),
-        "score": float(score)
+        "anomaly": anomaly,
+        "score": score
     }
 
+@app.get("/model")
+def model_info():
+    """Version and manifest of the model being served (plus per-member latency for the ensemble)."""
+    info = {"version": detector.version, "manifest": detector.manifest}
+    if hasattr(detector.model, "latency_report"):
+        info["ensemble"] = detector.model.latency_report()
+    return info
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
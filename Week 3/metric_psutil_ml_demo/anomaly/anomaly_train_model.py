@@ -8,78 +8,200 @@ from sklearn.preprocessing import StandardScaler
 from sklearn.ensemble import IsolationForest
 from sklearn.svm import OneClassSVM
 from sklearn.neighbors import LocalOutlierFactor
+import os
+import shutil
+import sys
+
+DEMO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # modules shared by anomaly/ and clustering/
+if DEMO_DIR not in sys.path:
+    sys.path.append(DEMO_DIR)
+from model_registry import ModelRegistry
+from anomaly_ensemble import AnomalyEnsemble
+from feature_pipeline import PIPELINE_FILE, FeaturePipeline
 
 JSON_FILE = "system_metrics.json"
+REGISTRY_DIR = "registry"  # watched by anomaly_predict_api.py
+FEATURES = ["cpu", "ram", "net_sent", "net_recv"]
+CONTAMINATION = 0.1
+USE_FEATURE_PIPELINE = True  # counter rates + rolling mean/std/slope instead of raw values
 
-# Load JSON Data
-with open(JSON_FILE, "r") as f:
-    data = json.load(f)
+# -------------------------------------------------
+# Export Fused NumPy Inference Artifact
+# -------------------------------------------------
+def average_path_length(n_samples):
+    """Expected path length of an unsuccessful BST search, c(n), as used by IsolationForest."""
+    n = np.asarray(n_samples, dtype=np.float64)
+    length = np.zeros_like(n)
+    length[n == 2] = 1.0
+    big = n > 2
+    length[big] = 2.0 * (np.log(n[big] - 1.0) + np.euler_gamma) - 2.0 * (n[big] - 1.0) / n[big]
+    return length
 
-df = pd.DataFrame(data)
-X = df[["cpu", "ram", "net_sent", "net_recv"]]
+def export_forest_inference(forest, scaler, features=FEATURES, path="anomaly_inference.npz"):
+    """
+    Flattens the IsolationForest into NumPy arrays with the scaler folded in.
 
-# Standardize features
-scaler = StandardScaler()
-X_scaled = scaler.fit_transform(X)
+    All trees share one node table. Split thresholds are moved to raw units
+    ((x - mean) / scale <= t  is  x <= t * scale + mean), features are mapped
+    to input columns, and every leaf stores depth + c(leaf samples), so scoring
+    is a few array lookups per level. Leaves point to themselves, so all rows
+    can step max_depth times in lockstep.
+    """
+    node_features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+    offset, max_depth = 0, 0
+    for tree, tree_features in zip(forest.estimators_, forest.estimators_features_):
+        t = tree.tree_
+        nodes = np.arange(t.node_count)
+        leaf = t.children_left == -1
 
-# Define models
-models = {
-    "IsolationForest": IsolationForest(contamination=0.1, random_state=42),
-    "OneClassSVM": OneClassSVM(kernel="rbf", nu=0.1, gamma="scale"),
-    "LOF": LocalOutlierFactor(n_neighbors=20, contamination=0.1)
-}
+        depth = np.zeros(t.node_count)
+        for node in nodes[~leaf]:  # children always come after their parent
+            depth[t.children_left[node]] = depth[t.children_right[node]] = depth[node] + 1
+        max_depth = max(max_depth, int(depth.max()))
 
-results = {}
+        feature = np.where(leaf, 0, np.asarray(tree_features)[np.maximum(t.feature, 0)])
+        node_features.append(feature)
+        thresholds.append(np.where(leaf, np.inf, t.threshold * scaler.scale_[feature] + scaler.mean_[feature]))
+        lefts.append(np.where(leaf, nodes, t.children_left) + offset)
+        rights.append(np.where(leaf, nodes, t.children_right) + offset)
+        values.append(np.where(leaf, depth + average_path_length(t.n_node_samples), 0.0))
+        roots.append(offset)
+        offset += t.node_count
 
-# Train & Predict anomalies
-for name, model in models.items():
-    if name == "LOF":  # LOF has no separate fit/predict
-        preds = model.fit_predict(X_scaled)
-    else:
-        model.fit(X_scaled)
-        preds = model.predict(X_scaled)
+    np.savez(
+        path,
+        feature=np.concatenate(node_features).astype(np.int32),
+        threshold=np.concatenate(thresholds),
+        left=np.concatenate(lefts).astype(np.int32),
+        right=np.concatenate(rights).astype(np.int32),
+        value=np.concatenate(values),
+        roots=np.array(roots, dtype=np.int32),
+        max_depth=max_depth,
+        denominator=average_path_length([forest.max_samples_])[0],
+        offset=forest.offset_,
+        features=np.array(features, dtype=str),
+    )
+    print(f"✅ Fused Isolation Forest inference artifact saved as {path}")
 
-    preds = np.where(preds == -1, 1, 0)  # 1 = anomaly, 0 = normal
-    results[name] = {"model": model, "preds": preds}
-    print(f"{name} → Detected {sum(preds)} anomalies out of {len(preds)}")
+def main():
+    # Load JSON Data
+    with open(JSON_FILE, "r") as f:
+        data = json.load(f)
 
-# Pick Isolation Forest as final model
-final_model = results["IsolationForest"]["model"]
-df["anomaly"] = results["IsolationForest"]["preds"]
+    df = pd.DataFrame(data)
+    X = df[FEATURES]
 
-# Save model & scaler
-joblib.dump(final_model, "anomaly_model.pkl")
-joblib.dump(scaler, "scaler.pkl")
-print("✅ Saved Isolation Forest Model as anomaly_model.pkl")
+    # Feature Engineering (optional); saved with the model, anomaly_predict_api.py computes it online
+    artifacts = ["anomaly_model.pkl", "scaler.pkl", "anomaly_inference.npz", "anomaly_ensemble.pkl"]
+    if USE_FEATURE_PIPELINE:
+        pipeline = FeaturePipeline(FEATURES)
+        X = pd.DataFrame(pipeline.transform(X), columns=pipeline.feature_names_)
+        pipeline.save(PIPELINE_FILE)
+        artifacts.append(PIPELINE_FILE)
+        print(f"Engineered {len(pipeline.feature_names_)} features from {FEATURES}")
+    elif os.path.exists(PIPELINE_FILE):
+        os.remove(PIPELINE_FILE)  # the unversioned model no longer uses it
 
-# -------------------------------------------------
-# 1️⃣ Scatter Plot (CPU vs RAM) with anomalies
-# -------------------------------------------------
-plt.figure(figsize=(7, 5))
-sns.scatterplot(
-    x=df["timestamp"], y=df["ram"], hue=df["anomaly"], palette={0: "green", 1: "red"}, s=60
-)
-plt.title("Anomalies (CPU vs RAM)")
-plt.xlabel("CPU Usage (%)")
-plt.ylabel("RAM Usage (%)")
-plt.legend(title="Anomaly", labels=["Normal", "Anomaly"])
-plt.show()
+    # Standardize features
+    scaler = StandardScaler()
+    X_scaled = scaler.fit_transform(X)
 
-# -------------------------------------------------
-# 2️⃣ Subplot for All Metrics (Color-coded by anomaly)
-# -------------------------------------------------
-metrics = ["cpu", "ram", "net_sent", "net_recv"]
-fig, axes = plt.subplots(2, 2, figsize=(12, 8))
-axes = axes.flatten()
+    # Define models
+    models = {
+        "IsolationForest": IsolationForest(contamination=CONTAMINATION, random_state=42),
+        "OneClassSVM": OneClassSVM(kernel="rbf", nu=CONTAMINATION, gamma="scale"),
+        "LOF": LocalOutlierFactor(n_neighbors=20, contamination=CONTAMINATION)
+    }
+
+    results = {}
+
+    # Train & Predict anomalies
+    for name, model in models.items():
+        if name == "LOF":  # LOF has no separate fit/predict
+            preds = model.fit_predict(X_scaled)
+        else:
+            model.fit(X_scaled)
+            preds = model.predict(X_scaled)
+
+        preds = np.where(preds == -1, 1, 0)  # 1 = anomaly, 0 = normal
+        results[name] = {"model": model, "preds": preds}
+        print(f"{name} → Detected {sum(preds)} anomalies out of {len(preds)}")
+
+    # Pick Isolation Forest as final model
+    final_model = results["IsolationForest"]["model"]
+    df["anomaly"] = results["IsolationForest"]["preds"]
+
+    # Save model & scaler
+    joblib.dump(final_model, "anomaly_model.pkl")
+    joblib.dump(scaler, "scaler.pkl")
+    print("✅ Saved Isolation Forest Model as anomaly_model.pkl")
+
+    export_forest_inference(final_model, scaler, list(X.columns))
+
+    # -------------------------------------------------
+    # Ensemble of All Three Models (opt-in: USE_ENSEMBLE in anomaly_predict_api.py)
+    # -------------------------------------------------
+    # Members score in parallel; slow members are subsampled or dropped so the
+    # ensemble stays within the latency of the forest alone (see anomaly_ensemble.py).
+    ensemble = AnomalyEnsemble(contamination=CONTAMINATION).fit(X)
+    ensemble_flags = ensemble(X)[1]
+    print(f"Ensemble → Detected {ensemble_flags.sum()} anomalies out of {len(X)} "
+          f"(agrees with IsolationForest on {(ensemble_flags == results['IsolationForest']['preds']).mean():.1%})")
+    for name, report in ensemble.latency_report().items():
+        print(f"  {name}: {report}")
+    joblib.dump(ensemble, "anomaly_ensemble.pkl")
+    print("✅ Saved ensemble as anomaly_ensemble.pkl")
+
+    # -------------------------------------------------
+    # Publish to the Model Registry
+    # -------------------------------------------------
+    # anomaly_predict_api.py hot-reloads the promoted version, so retraining needs no restart.
+    training_stats = {
+        "n_samples": len(X),
+        "feature_mean": dict(zip(X.columns, scaler.mean_.tolist())),
+        "feature_std": dict(zip(X.columns, scaler.scale_.tolist())),
+        "anomalies_detected": {name: int(r["preds"].sum()) for name, r in results.items()},
+        "contamination": final_model.contamination,
+        "ensemble": ensemble.latency_report(),
+    }
+    registry = ModelRegistry(REGISTRY_DIR)
+    with registry.publish("anomaly", FEATURES, training_stats, model="IsolationForest",
+                          model_features=list(X.columns)) as version_dir:
+        for artifact in artifacts:
+            shutil.copy2(artifact, version_dir)
+
+    # -------------------------------------------------
+    # 1️⃣ Scatter Plot (CPU vs RAM) with anomalies
+    # -------------------------------------------------
+    plt.figure(figsize=(7, 5))
+    sns.scatterplot(
+        x=df["timestamp"], y=df["ram"], hue=df["anomaly"], palette={0: "green", 1: "red"}, s=60
+    )
+    plt.title("Anomalies (CPU vs RAM)")
+    plt.xlabel("CPU Usage (%)")
+    plt.ylabel("RAM Usage (%)")
+    plt.legend(title="Anomaly", labels=["Normal", "Anomaly"])
+    plt.show()
+
+    # -------------------------------------------------
+    # 2️⃣ Subplot for All Metrics (Color-coded by anomaly)
+    # -------------------------------------------------
+    metrics = FEATURES
+    fig, axes = plt.subplots(2, 2, figsize=(12, 8))
+    axes = axes.flatten()
+
+    colors = df["anomaly"].map({0: "green", 1: "red"})
 
-colors = df["anomaly"].map({0: "green", 1: "red"})
+    for i, metric in enumerate(metrics):
+        axes[i].scatter(range(len(df)), df[metric], c=colors, s=40)
+        axes[i].set_title(metric)
+        axes[i].set_xlabel("Index")
+        axes[i].set_ylabel(metric)
 
-for i, metric in enumerate(metrics):
-    axes[i].scatter(range(len(df)), df[metric], c=colors, s=40)
-    axes[i].set_title(metric)
-    axes[i].set_xlabel("Index")
-    axes[i].set_ylabel(metric)
+    plt.suptitle("Metrics with Anomalies Highlighted", fontsize=16)
+    plt.tight_layout(rect=[0, 0, 1, 0.96])
+    plt.show()
 
-plt.suptitle("Metrics with Anomalies Highlighted", fontsize=16)
-plt.tight_layout(rect=[0, 0, 1, 0.96])
-plt.show()
+# retrain_scheduler.py imports the helpers above, so training only runs when executed as a script.
+if __name__ == "__main__":
+    main()
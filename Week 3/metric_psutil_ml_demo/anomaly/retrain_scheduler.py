@@ -0,0 +1,487 @@
+"""
+retrain_scheduler.py
+
+Periodic retraining of the anomaly model on a sliding window of recent
+metrics, promoted through the model registry only when it beats the live
+model.
+
+  - New metric rows are parsed once, when they arrive, and appended to a
+    memory-mapped ring buffer (metric_window.npy, at most `window_rows`
+    rows). A retrain reads the window straight from the memmap instead of
+    re-parsing the JSON history.
+  - Each round holds out the most recent `holdout_fraction` of the window,
+    trains a candidate IsolationForest on the rest, and scores candidate and
+    live model on the same holdout: the recent rows (label 0), some of them
+    replaced in place by synthetic anomalies (label 1), so the series stays
+    in time order for rolling-window features. Precision at each model's own
+    threshold is where drift shows first: a stale model flags normal new
+    rows.
+  - The candidate is published and promoted only if its PROMOTE_METRIC beats
+    the live model's by at least `min_gain`; anomaly_predict_api.py then
+    hot-reloads it. Losing candidates are logged and discarded.
+  - Published versions record the window rows they were trained on. A live
+    model is only compared if it was trained on rows of this window before
+    the holdout; a model that may have seen the holdout (the unversioned
+    files, anomaly_train_model.py on the full history) would be favoured, so
+    it is not compared and the candidate is promoted as if there were none.
+
+Sources are the collector's system_metrics.json (a JSON array of the latest
+entries, rewritten on every sample) or a JSON lines history (read from the
+last byte offset).
+
+    python retrain_scheduler.py system_metrics.json --every 300
+    process = start_background(["system_metrics.json"], every_seconds=300)   # from another program
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+import joblib
+import numpy as np
+from sklearn.ensemble import IsolationForest
+from sklearn.metrics import f1_score, precision_score, recall_score, roc_auc_score
+from sklearn.preprocessing import StandardScaler
+
+DEMO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # modules shared by anomaly/ and clustering/
+if DEMO_DIR not in sys.path:
+    sys.path.append(DEMO_DIR)
+from anomaly_ensemble import AnomalyEnsemble
+from anomaly_train_model import (CONTAMINATION, FEATURES, REGISTRY_DIR, USE_FEATURE_PIPELINE,
+                                 export_forest_inference)
+from feature_pipeline import PIPELINE_FILE, FeaturePipeline
+from model_registry import ModelRegistry
+
+WINDOW_FILE = "metric_window.npy"
+WINDOW_ROWS = 50_000        # sliding window size
+MIN_WINDOW_ROWS = 200       # no retraining below this
+EVERY_SECONDS = 300
+HOLDOUT_FRACTION = 0.2      # most recent share of the window, never trained on
+PROMOTE_METRIC = "f1"       # "f1", "precision", "recall" or "auc"
+MIN_GAIN = 0.01
+INJECT_SIGMAS = (3.0, 6.0)  # injected anomalies are pushed this many robust std devs out
+PERCENT_FEATURES = ("cpu", "ram")  # clipped to 0-100 when injecting
+
+
+def _atomic_dump_json(obj, path):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(obj, f, indent=2)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+class MetricWindow:
+    """
+    Ring buffer of the latest metric rows in a memory-mapped .npy file.
+
+    The buffer and the read position of every source survive restarts; the
+    state file is replaced atomically after the rows are flushed, so a crash
+    can at worst re-append one batch. Rows are numbered by arrival
+    (rows_written) within a window, which is identified by window_id.
+
+    Args:
+        path (str): The .npy file (state is kept next to it, as <path>.state.json).
+        capacity (int): Rows kept; older rows are overwritten.
+        features (list[str]): Columns, in model input order.
+    """
+
+    def __init__(self, path=WINDOW_FILE, capacity=WINDOW_ROWS, features=FEATURES):
+        self.path = path
+        self.state_path = path + ".state.json"
+        self.features = list(features)
+        shape = (capacity, len(self.features))
+        state = None
+        if os.path.exists(path) and os.path.exists(self.state_path):
+            with open(self.state_path, encoding="utf-8") as f:
+                state = json.load(f)
+            self.buffer = np.load(path, mmap_mode="r+")
+            if self.buffer.shape != shape or state["features"] != self.features:
+                print(f"[window] {path} has another shape or features; starting a new window")
+                state = None
+        if state is None:
+            self.buffer = np.lib.format.open_memmap(path, mode="w+", dtype=np.float64, shape=shape)
+            state = {"features": self.features, "rows_written": 0, "sources": {}}
+        state.setdefault("window_id", uuid.uuid4().hex)  # row numbers are only comparable within one window
+        self.state = state
+
+    @property
+    def capacity(self):
+        return len(self.buffer)
+
+    def __len__(self):
+        return min(self.state["rows_written"], self.capacity)
+
+    def append(self, X):
+        """Appends rows, overwriting the oldest ones once the buffer is full."""
+        X = np.asarray(X, dtype=np.float64)[-self.capacity:]
+        X = X[np.isfinite(X).all(axis=1)]
+        start = self.state["rows_written"] % self.capacity
+        first = min(len(X), self.capacity - start)
+        self.buffer[start:start + first] = X[:first]
+        self.buffer[:len(X) - first] = X[first:]
+        self.buffer.flush()
+        self.state["rows_written"] += len(X)
+
+    def rows(self):
+        """The window in arrival order (a copy, safe to train on while new rows arrive)."""
+        if self.state["rows_written"] <= self.capacity:
+            return np.array(self.buffer[:self.state["rows_written"]])
+        start = self.state["rows_written"] % self.capacity
+        return np.concatenate([self.buffer[start:], self.buffer[:start]])
+
+    def ingest(self, source):
+        """
+        Appends the rows added to `source` since the last call.
+
+        Returns:
+            int: Number of new rows.
+        """
+        key = os.path.abspath(source)
+        if source.endswith((".jsonl", ".ndjson")):
+            records, position = self._read_jsonl(source, self.state["sources"].get(key, 0))
+        else:
+            records, position = self._read_json_array(source, self.state["sources"].get(key))
+        if records:
+            self.append([[record[f] for f in self.features] for record in records])
+        self.state["sources"][key] = position
+        _atomic_dump_json(self.state, self.state_path)
+        return len(records)
+
+    @staticmethod
+    def _read_jsonl(path, offset):
+        records = []
+        with open(path, "rb") as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):  # still being written
+                    break
+                offset += len(line)
+                if line.strip():
+                    records.append(json.loads(line))
+        return records, offset
+
+    @staticmethod
+    def _read_json_array(path, last_record):
+        """
+        The collector rewrites the whole file with its latest entries, so the
+        new rows are the ones after the last record seen (all of them if it
+        has scrolled out).
+        """
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+        except json.JSONDecodeError:  # caught mid-rewrite; read again next round
+            return [], last_record
+        if not data:
+            return [], last_record
+        new = data
+        if last_record is not None:
+            for i in range(len(data) - 1, -1, -1):
+                if data[i] == last_record:
+                    new = data[i + 1:]
+                    break
+        return new, data[-1]
+
+
+def inject_anomalies(X, n, rng, sigmas=INJECT_SIGMAS, features=FEATURES):
+    """
+    Copies n random rows of X and pushes one or two features of each away
+    from the median by sigmas[0]-sigmas[1] robust standard deviations.
+    """
+    median = np.median(X, axis=0)
+    spread = np.median(np.abs(X - median), axis=0) * 1.4826
+    spread = np.where(spread > 0, spread, X.std(axis=0) + 1e-9)
+    rows = X[rng.integers(len(X), size=n)].copy()
+    for row in rows:
+        cols = rng.choice(X.shape[1], size=rng.integers(1, 3), replace=False)
+        direction = np.where(row[cols] >= median[cols], 1.0, -1.0)
+        row[cols] = median[cols] + direction * rng.uniform(*sigmas, size=len(cols)) * spread[cols]
+    for f in PERCENT_FEATURES:
+        if f in features:
+            i = list(features).index(f)
+            rows[:, i] = np.clip(rows[:, i], 0, 100)
+    return rows
+
+
+def evaluate(decision_fn, X, y):
+    """
+    Holdout metrics of a model given as decision_fn(X) -> decision (negative =
+    anomaly); X is the raw series that ends with the len(y) labelled rows,
+    plus whatever context rows before them the model's features need.
+    """
+    decision = decision_fn(X)[-len(y):]
+    flags = decision < 0
+    return {
+        "auc": float(roc_auc_score(y, -decision)),
+        "precision": float(precision_score(y, flags, zero_division=0)),
+        "recall": float(recall_score(y, flags, zero_division=0)),
+        "f1": float(f1_score(y, flags, zero_division=0)),
+    }
+
+
+def _forest_decision(model, scaler, pipeline=None):
+    def decision(X):
+        if pipeline is not None:
+            X = pipeline.transform(X)
+        return model.decision_function((X - scaler.mean_) / scaler.scale_)
+    return decision
+
+
+def load_live(registry, fallback_dir="."):
+    """
+    Decision function, version and manifest of the model anomaly_predict_api.py
+    serves: the promoted registry version, else the unversioned files in
+    fallback_dir; None if there is neither.
+    """
+    version = registry.current("anomaly")
+    if version is not None:
+        directory, manifest = registry.path("anomaly", version), registry.manifest("anomaly", version)
+    elif os.path.exists(os.path.join(fallback_dir, "anomaly_model.pkl")):
+        directory, manifest = fallback_dir, None
+    else:
+        return None
+    model = joblib.load(os.path.join(directory, "anomaly_model.pkl"))
+    scaler = joblib.load(os.path.join(directory, "scaler.pkl"))
+    pipeline_path = os.path.join(directory, PIPELINE_FILE)
+    pipeline = FeaturePipeline.load(pipeline_path) if os.path.exists(pipeline_path) else None
+    return {"decision": _forest_decision(model, scaler, pipeline),
+            "context_rows": pipeline.context_rows if pipeline is not None else 0,
+            "version": version or "unversioned",
+            "manifest": manifest}
+
+
+class RetrainScheduler:
+    """
+    Retrains on the sliding window every `every_seconds` and promotes winners.
+
+    Args:
+        sources (list[str]): Metric files to ingest (.json array or .jsonl).
+        window (MetricWindow | None): The memmap window (default: WINDOW_FILE).
+        registry_dir (str): Model registry shared with anomaly_predict_api.py.
+        every_seconds (float): Time between rounds.
+        min_rows (int): Window rows needed before the first round.
+        holdout_fraction (float): Most recent share of the window used for the comparison.
+        metric (str): Holdout metric that decides promotion.
+        min_gain (float): Improvement over the live model needed to promote.
+        contamination (float): IsolationForest contamination and share of injected holdout rows.
+        seed (int): Seed for the model and the injected anomalies.
+    """
+
+    def __init__(self, sources, window=None, registry_dir=REGISTRY_DIR, every_seconds=EVERY_SECONDS,
+                 min_rows=MIN_WINDOW_ROWS, holdout_fraction=HOLDOUT_FRACTION, metric=PROMOTE_METRIC,
+                 min_gain=MIN_GAIN, contamination=CONTAMINATION, seed=42):
+        self.sources = list(sources)
+        self.window = window if window is not None else MetricWindow()
+        self.registry = ModelRegistry(registry_dir)
+        self.every_seconds = every_seconds
+        self.min_rows = min_rows
+        self.holdout_fraction = holdout_fraction
+        self.metric = metric
+        self.min_gain = min_gain
+        self.contamination = contamination
+        self.pipeline = FeaturePipeline(FEATURES) if USE_FEATURE_PIPELINE else None
+        self.rng = np.random.default_rng(seed)
+        self.seed = seed
+        self._trained_at = None  # rows_written at the last round
+
+    def run_once(self):
+        """
+        Ingests new rows and runs one retrain/compare/promote round.
+
+        Returns:
+            dict | None: The round's report (None if skipped).
+        """
+        new_rows = 0
+        for source in self.sources:
+            try:
+                new_rows += self.window.ingest(source)
+            except FileNotFoundError:
+                print(f"[retrain] {source} not found yet")
+        rows_written = self.window.state["rows_written"]
+        if len(self.window) < self.min_rows:
+            print(f"[retrain] {len(self.window)} rows in the window, waiting for {self.min_rows}")
+            return None
+        if rows_written == self._trained_at:
+            print("[retrain] no new rows since the last round")
+            return None
+        self._trained_at = rows_written
+
+        start = time.perf_counter()
+        X = self.window.rows()
+        n_holdout = max(int(len(X) * self.holdout_fraction), 1)
+        trained_rows = {"window": self.window.state["window_id"],  # [start, end) in arrival order
+                        "start": rows_written - len(X), "end": rows_written - n_holdout}
+        n_injected = max(int(n_holdout * self.contamination), 1)
+        injected_at = self.rng.choice(n_holdout, n_injected, replace=False)
+        series = self._inject(X, n_holdout, injected_at)
+        y_holdout = np.zeros(n_holdout)
+        y_holdout[injected_at] = 1
+
+        train = X[:-n_holdout]
+        if self.pipeline is not None:
+            train = self.pipeline.transform(train)
+        scaler = StandardScaler().fit(train)
+        model = IsolationForest(contamination=self.contamination, random_state=self.seed)
+        model.fit(scaler.transform(train))
+        # Only the holdout is scored, plus the raw rows its rolling windows reach back to.
+        context = self.pipeline.context_rows if self.pipeline is not None else 0
+        candidate = evaluate(_forest_decision(model, scaler, self.pipeline),
+                             series[-(n_holdout + context):], y_holdout)
+
+        live = load_live(self.registry)
+        excluded = self._live_overlap(live, trained_rows["end"]) if live else None
+        if excluded:
+            print(f"[retrain] not comparing with live model {live['version']}: {excluded}")
+        compared = live is not None and excluded is None
+        live_metrics = (evaluate(live["decision"], series[-(n_holdout + live["context_rows"]):], y_holdout)
+                        if compared else None)
+        gain = candidate[self.metric] - live_metrics[self.metric] if compared else None
+        promote = not compared or gain >= self.min_gain
+
+        report = {
+            "window_rows": len(X), "train_rows": len(train), "new_rows": new_rows,
+            "holdout": {"rows": n_holdout, "injected_anomalies": n_injected},
+            "candidate": candidate, "live": live_metrics,
+            "live_version": live["version"] if live else None, "live_excluded": excluded,
+            "metric": self.metric, "gain": gain, "promoted": promote,
+            "seconds": round(time.perf_counter() - start, 3),
+        }
+        verdict = "promoting" if promote else "keeping live model"
+        print(f"[retrain] {len(train):,} rows: candidate {self.metric}={candidate[self.metric]:.3f}, "
+              f"live={live_metrics[self.metric] if compared else float('nan'):.3f} -> {verdict}")
+        if promote:
+            self._publish(model, scaler, train, trained_rows, report, live)
+        return report
+
+    def _live_overlap(self, live, holdout_start):
+        """
+        Why the live model cannot be compared on a holdout starting at row
+        holdout_start of the window (None if it can): it must have been
+        trained on rows of this window that all came before the holdout.
+        """
+        trained = ((live["manifest"] or {}).get("training_stats") or {}).get("trained_rows")
+        if trained is None:
+            return "its training rows are unknown and may include the holdout"
+        if trained["window"] != self.window.state["window_id"]:
+            return "it was trained on another window"
+        if trained["end"] > holdout_start:
+            return "it was trained on holdout rows"
+        return None
+
+    def _inject(self, X, n_holdout, injected_at):
+        """
+        The window with holdout rows `injected_at` replaced by synthetic anomalies.
+
+        With the feature pipeline, counter columns are perturbed as per-sample
+        steps and rebuilt with a cumulative sum. Overwriting the raw counter
+        would make the next row's step negative, which the pipeline reads as a
+        counter reset, so normal rows after each anomaly would get huge rates.
+        """
+        series = X.copy()
+        holdout = X[-n_holdout:].copy()
+        counters = [FEATURES.index(c) for c in self.pipeline.counters] if self.pipeline is not None else []
+        if counters:
+            holdout[:, counters] = np.diff(X[-n_holdout - 1:, counters], axis=0)
+        holdout[injected_at] = inject_anomalies(holdout, len(injected_at), self.rng)
+        if counters:
+            steps = holdout[:, counters]
+            steps[injected_at] = np.maximum(steps[injected_at], 0)  # a negative step would read as a reset
+            holdout[:, counters] = X[-n_holdout - 1, counters] + np.cumsum(steps, axis=0)
+        series[-n_holdout:] = holdout
+        return series
+
+    def _publish(self, model, scaler, train, trained_rows, report, live):
+        model_features = self.pipeline.feature_names_ if self.pipeline is not None else FEATURES
+        training_stats = {
+            "n_samples": len(train),
+            "feature_mean": dict(zip(model_features, scaler.mean_.tolist())),
+            "feature_std": dict(zip(model_features, scaler.scale_.tolist())),
+            "contamination": self.contamination,
+            "trained_rows": trained_rows,
+            "retrain": report,
+        }
+        # Keep the ensemble in sync if the live version ships one (USE_ENSEMBLE in the API).
+        with_ensemble = live is not None and "anomaly_ensemble.pkl" in (live["manifest"] or {}).get("files", [])
+        if with_ensemble:
+            ensemble = AnomalyEnsemble(contamination=self.contamination, random_state=self.seed).fit(train)
+            training_stats["ensemble"] = ensemble.latency_report()
+        with self.registry.publish("anomaly", FEATURES, training_stats, model="IsolationForest",
+                                   training_mode="scheduled", model_features=list(model_features)) as version_dir:
+            joblib.dump(model, os.path.join(version_dir, "anomaly_model.pkl"))
+            joblib.dump(scaler, os.path.join(version_dir, "scaler.pkl"))
+            export_forest_inference(model, scaler, model_features, os.path.join(version_dir, "anomaly_inference.npz"))
+            if self.pipeline is not None:
+                self.pipeline.save(os.path.join(version_dir, PIPELINE_FILE))
+            if with_ensemble:
+                joblib.dump(ensemble, os.path.join(version_dir, "anomaly_ensemble.pkl"))
+        self.registry.prune("anomaly")
+
+    def run_forever(self, stop_event=None):
+        """Runs rounds every `every_seconds` until stop_event is set (or forever)."""
+        stop_event = stop_event or multiprocessing.Event()
+        while not stop_event.is_set():
+            try:
+                self.run_once()
+            except Exception as e:  # a failed round must not stop the schedule
+                print(f"[retrain] round failed: {e!r}")
+            stop_event.wait(self.every_seconds)
+
+
+def _run_scheduler(sources, stop_event, kwargs):
+    window = MetricWindow(**kwargs.pop("window_kwargs", {}))
+    RetrainScheduler(sources, window=window, **kwargs).run_forever(stop_event)
+
+
+def start_background(sources, **kwargs):
+    """
+    Starts a RetrainScheduler in a daemon process, so training never competes
+    with the API for the GIL.
+
+    Args:
+        sources (list[str]): Metric files to ingest.
+        **kwargs: RetrainScheduler arguments; window_kwargs is passed to MetricWindow.
+
+    Returns:
+        tuple[multiprocessing.Process, multiprocessing.Event]: The process and
+            an event that stops it after the current round.
+    """
+    stop_event = multiprocessing.Event()
+    process = multiprocessing.Process(target=_run_scheduler, args=(list(sources), stop_event, kwargs),
+                                      name="anomaly-retrain", daemon=True)
+    process.start()
+    return process, stop_event
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Retrain the anomaly model on a sliding window of recent metrics.")
+    parser.add_argument("sources", nargs="*", default=["system_metrics.json"],
+                        help="Metric files (.json array from the collector, or .jsonl)")
+    parser.add_argument("--every", type=float, default=EVERY_SECONDS, help="Seconds between rounds")
+    parser.add_argument("--window-rows", type=int, default=WINDOW_ROWS, help="Sliding window size")
+    parser.add_argument("--window-file", default=WINDOW_FILE, help="Memory-mapped window cache")
+    parser.add_argument("--min-rows", type=int, default=MIN_WINDOW_ROWS, help="Rows needed before retraining")
+    parser.add_argument("--metric", default=PROMOTE_METRIC, choices=["f1", "precision", "recall", "auc"],
+                        help="Holdout metric that decides promotion")
+    parser.add_argument("--min-gain", type=float, default=MIN_GAIN, help="Improvement needed to promote")
+    parser.add_argument("--once", action="store_true", help="Run a single round and exit")
+    args = parser.parse_args()
+
+    scheduler = RetrainScheduler(args.sources, window=MetricWindow(args.window_file, args.window_rows),
+                                 every_seconds=args.every, min_rows=args.min_rows,
+                                 metric=args.metric, min_gain=args.min_gain)
+    if args.once:
+        scheduler.run_once()
+    else:
+        try:
+            scheduler.run_forever()
+        except KeyboardInterrupt:
+            print("Stopping...")
@@ -0,0 +1,161 @@
+"""
+model_selection.py
+
+Parallel model selection for the clustering candidates in train_model.py.
+
+Candidates (estimator class + parameters) are fitted in a process pool, one
+candidate per task. The scaled data is sent to each worker once, through the
+pool initializer, instead of once per task. For large inputs:
+
+  - silhouette_score is O(n^2) in time and memory, so it is computed on a
+    random sample of `silhouette_sample` rows.
+  - Every candidate is first screened on a random subsample of `screen_rows`
+    rows. Candidates that find a single cluster, or whose screening
+    silhouette is more than `margin` below the best, are dropped before the
+    expensive full-data fit (early stopping).
+  - Candidates with quadratic memory (Agglomerative, DBSCAN) can set
+    max_rows; they are then fitted on a random sample of that many rows.
+
+Every fit is logged with its fit time, scoring time and peak traced memory
+of each (the silhouette's distance chunks are capped by SCORE_MEMORY_MB).
+
+    candidates = [Candidate("KMeans(k=3)", KMeans, {"n_clusters": 3, "n_init": 10})]
+    results = select_models(candidates, X_scaled, workers=4)
+"""
+import os
+import time
+import tracemalloc
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from sklearn import config_context
+from sklearn.metrics import davies_bouldin_score, silhouette_score
+
+SILHOUETTE_SAMPLE = 10_000  # rows used for silhouette_score on large inputs
+SCREEN_ROWS = 5_000         # rows per candidate in the screening round
+MARGIN = 0.15               # silhouette gap to the best that counts as clearly inferior
+SCORE_MEMORY_MB = 128       # sklearn working_memory for the pairwise distance chunks of scoring
+
+# max_rows: fit on a random sample of at most this many rows (None: all rows).
+# keep: never drop this candidate in screening (e.g. a model that is exported anyway).
+Candidate = namedtuple("Candidate", "name estimator params max_rows keep", defaults=(None, False))
+
+_X = None  # data of the current worker process, set by _init_worker
+
+
+def _init_worker(X):
+    global _X
+    _X = X
+
+
+def _evaluate(candidate, rows, stage, silhouette_sample, seed):
+    """Fits and scores one candidate on _X[rows] (all rows if rows is None)."""
+    X = _X if rows is None else _X[rows]
+    tracemalloc.start()
+    start = time.perf_counter()
+    model = candidate.estimator(**candidate.params)
+    labels = model.fit_predict(X)
+    fit_seconds = time.perf_counter() - start
+    fit_peak_mb = tracemalloc.get_traced_memory()[1] / 1024**2
+
+    tracemalloc.reset_peak()
+    start = time.perf_counter()
+    n_clusters = len(set(labels))
+    if n_clusters > 1:
+        sample = silhouette_sample if len(X) > silhouette_sample else None
+        with config_context(working_memory=SCORE_MEMORY_MB):
+            sil = silhouette_score(X, labels, sample_size=sample, random_state=seed)
+        db = davies_bouldin_score(X, labels)
+    else:
+        sil, db = -1, 999  # Poor scores if only 1 cluster
+    score_seconds = time.perf_counter() - start
+    score_peak_mb = tracemalloc.get_traced_memory()[1] / 1024**2
+    tracemalloc.stop()
+
+    return {
+        "model": candidate.name, "stage": stage, "object": model, "labels": labels, "rows": rows,
+        "n_rows": len(X), "clusters": n_clusters, "silhouette": float(sil), "davies_bouldin": float(db),
+        "inertia": float(getattr(model, "inertia_", np.nan)),
+        "fit_seconds": fit_seconds, "score_seconds": score_seconds,
+        "fit_peak_mb": fit_peak_mb, "score_peak_mb": score_peak_mb,
+    }
+
+
+def _log(r):
+    print(f"  {r['stage']:<6} {r['model']:<16} rows={r['n_rows']:>9,} "
+          f"fit={r['fit_seconds']:7.2f}s/{r['fit_peak_mb']:7.1f} MiB "
+          f"score={r['score_seconds']:6.2f}s/{r['score_peak_mb']:6.1f} MiB "
+          f"clusters={r['clusters']:<3} silhouette={r['silhouette']:.3f} db={r['davies_bouldin']:.3f}")
+
+
+def _run_round(pool, X, tasks, stage, silhouette_sample, seed):
+    """Evaluates (candidate, rows) tasks in the pool, or inline without one; logs each result."""
+    if pool is None:
+        _init_worker(X)
+        results = [_evaluate(c, rows, stage, silhouette_sample, seed) for c, rows in tasks]
+    else:
+        futures = [pool.submit(_evaluate, c, rows, stage, silhouette_sample, seed) for c, rows in tasks]
+        results = [f.result() for f in futures]
+    for r in results:
+        _log(r)
+    return results
+
+
+def select_models(candidates, X, workers=None, screen_rows=SCREEN_ROWS, margin=MARGIN,
+                  silhouette_sample=SILHOUETTE_SAMPLE, seed=42):
+    """
+    Fits and scores all candidates, dropping clearly inferior ones early.
+
+    Args:
+        candidates (list[Candidate]): Configurations to evaluate; names must be unique.
+        X (np.ndarray): Scaled training data.
+        workers (int | None): Worker processes (None: one per CPU, 1: no pool).
+        screen_rows (int | None): Rows per candidate in the screening round; the
+            round is skipped when X has fewer than twice as many rows (None: never screen).
+        margin (float): Candidates more than this below the best screening silhouette are dropped.
+        silhouette_sample (int): Rows used for silhouette_score on large inputs.
+        seed (int): Seed for the row samples.
+
+    Returns:
+        dict: Candidate name -> result dict ("object", "labels", "silhouette",
+            "davies_bouldin", "inertia", timings and peak memory, ...). "rows" holds
+            the row indices a sampled fit used (None: all rows). "screen" holds the
+            candidate's screening result (None: no screening round). Dropped
+            candidates keep their screening result with "dropped" set to the reason.
+    """
+    rng = np.random.default_rng(seed)
+    n = len(X)
+    workers = min(workers or os.cpu_count() or 1, len(candidates))
+
+    def sample(size):
+        return None if size is None or size >= n else np.sort(rng.choice(n, size, replace=False))
+
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(X,)) if workers > 1 else None
+    try:
+        results, survivors, screens = {}, list(candidates), {}
+        if screen_rows and n >= 2 * screen_rows:
+            print(f"Screening {len(candidates)} candidates on {screen_rows:,} of {n:,} rows ({workers} workers)...")
+            rows = sample(screen_rows)
+            screened = _run_round(pool, X, [(c, rows) for c in candidates], "screen", silhouette_sample, seed)
+            best = max(r["silhouette"] for r in screened)
+            survivors = []
+            for c, r in zip(candidates, screened):
+                screens[c.name] = r
+                reason = ("single cluster" if r["clusters"] < 2
+                          else f"silhouette {r['silhouette']:.3f} < best {best:.3f} - {margin}"
+                          if r["silhouette"] < best - margin else None)
+                if reason and not c.keep:
+                    print(f"  dropped {c.name}: {reason}")
+                    results[c.name] = {**r, "dropped": reason, "screen": r}
+                else:
+                    survivors.append(c)
+
+        print(f"Fitting {len(survivors)} candidates on {n:,} rows ({workers} workers)...")
+        tasks = [(c, sample(c.max_rows)) for c in survivors]
+        for r in _run_round(pool, X, tasks, "full", silhouette_sample, seed):
+            results[r["model"]] = {**r, "dropped": None, "screen": screens.get(r["model"])}
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return {c.name: results[c.name] for c in candidates}
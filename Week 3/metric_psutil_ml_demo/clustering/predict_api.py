@@ -1,15 +1,113 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Request, Response
+import io
+import json
+import os
+import sys
 import joblib
+import numpy as np
 from pydantic import BaseModel
 import uvicorn
 
-# Load trained model and scaler
-model = joblib.load("kmeans_model.pkl")
-scaler = joblib.load("scaler.pkl")
+DEMO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # modules shared by anomaly/ and clustering/
+if DEMO_DIR not in sys.path:
+    sys.path.append(DEMO_DIR)
+from model_registry import ModelRegistry, ModelWatcher
+from feature_pipeline import PIPELINE_FILE, FeaturePipeline, SeriesStreams
+
+try:
+    import pyarrow as pa  # Optional: Arrow IPC stream input for /predict/batch
+except ImportError:
+    pa = None
+
+FEATURES = ["cpu", "ram", "disk", "net_sent", "net_recv"]
+NPY_TYPE = "application/x-npy"
+ARROW_TYPE = "application/vnd.apache.arrow.stream"
+
+REGISTRY_DIR = "registry"  # versions published by train_model.py
+FUSED_MODEL = "cluster_inference.npz"
+LEGACY_FUSED_MODEL = "kmeans_inference.npz"  # unlabelled KMeans export of older versions
+CLUSTER_NAMES = ["Idle", "Moderate Load", "High Load"]  # same rule as train_model.name_clusters
+
+def nearest_centroid(weight_matrix, bias, cluster_ids, cluster_names):
+    """
+    assign_clusters(X) -> (cluster ids, meanings) over a scaler-folded centroid table:
+    one matrix product, an argmin and two array lookups, whatever model produced the centroids.
+    """
+    def assign_clusters(X: np.ndarray):
+        nearest = np.argmin(bias - 2.0 * (X @ weight_matrix), axis=1)
+        return cluster_ids[nearest], None if cluster_names is None else cluster_names[nearest]
+    return assign_clusters
+
+def load_clusterer(directory: str, manifest: dict | None):
+    """
+    Builds assign_clusters(X) from a registry version directory
+    (or, with manifest None, from the unversioned files in the working directory).
+
+    If the model was trained on engineered features (feature_pipeline.json),
+    assign_clusters(X, series) treats row X[i] as the next row of the metric
+    stream (host) series[i], so rolling windows continue across /predict calls
+    per host; with series None, X is a series of its own (/predict/batch).
+    """
+    if manifest is not None and manifest["features"] != FEATURES:
+        raise ValueError(f"model expects features {manifest['features']}, API sends {FEATURES}")
+
+    pipeline_path = os.path.join(directory, PIPELINE_FILE)
+    if not os.path.exists(pipeline_path):
+        assign = _load_centroids(directory, FEATURES)
+        return lambda X, series=None: assign(X)
+
+    pipeline = FeaturePipeline.load(pipeline_path)
+    if pipeline.features != FEATURES:
+        raise ValueError(f"feature pipeline expects {pipeline.features}, API sends {FEATURES}")
+    assign = _load_centroids(directory, pipeline.feature_names_)
+    streams = SeriesStreams(pipeline)  # a new version starts new stream states
+
+    def assign_clusters(X: np.ndarray, series: list[str] | None = None):
+        return assign(pipeline.transform(X) if series is None else streams.update(series, X))
+    return assign_clusters
+
+def _load_centroids(directory: str, model_features: list[str]):
+    """Nearest-centroid assign(X) over model_features, from the fused artifact or the pickles."""
+    for fused_name in (FUSED_MODEL, LEGACY_FUSED_MODEL):
+        fused_path = os.path.join(directory, fused_name)
+        if os.path.exists(fused_path):
+            # Scaler folded into the centroids, served with NumPy only (sklearn is never imported).
+            fused = np.load(fused_path, allow_pickle=False)
+            bias = fused["bias"]
+            cluster_ids = fused["cluster_ids"] if "cluster_ids" in fused.files else np.arange(len(bias))
+            cluster_names = fused["cluster_names"] if "cluster_names" in fused.files else None
+            return nearest_centroid(fused["weight_matrix"], bias, cluster_ids, cluster_names)
+
+    # Load trained model and scaler, and build the same centroid table from them
+    model = joblib.load(os.path.join(directory, "best_cluster_model.pkl"))
+    scaler = joblib.load(os.path.join(directory, "scaler.pkl"))
+    if hasattr(model, "cluster_centers_"):  # KMeans: nearest centroid is exactly predict()
+        cluster_ids, centers = np.arange(len(model.cluster_centers_)), model.cluster_centers_
+    elif hasattr(model, "components_"):  # DBSCAN: mean of each cluster's core samples
+        core_labels = model.labels_[model.core_sample_indices_]
+        cluster_ids = np.unique(core_labels[core_labels >= 0])
+        centers = np.array([model.components_[core_labels == i].mean(axis=0) for i in cluster_ids])
+    else:
+        raise ValueError(f"{type(model).__name__} keeps no centroids; run train_model.py to export {FUSED_MODEL}")
+    if not len(cluster_ids):
+        raise ValueError(f"{type(model).__name__} found no clusters; run train_model.py to export {FUSED_MODEL}")
+
+    centers = scaler.mean_ + scaler.scale_ * centers  # raw units
+    weights = 1.0 / scaler.scale_ ** 2
+    cpu, ram = centers[:, model_features.index("cpu")], centers[:, model_features.index("ram")]
+    cluster_names = np.empty(len(centers), dtype=object)
+    for rank, i in enumerate(np.lexsort((ram, cpu))):
+        cluster_names[i] = CLUSTER_NAMES[min(rank, len(CLUSTER_NAMES) - 1)]
+    return nearest_centroid((centers * weights).T, (weights * centers ** 2).sum(axis=1),
+                            cluster_ids, cluster_names.astype(str))
+
+# Serves the promoted registry version and hot-swaps it when train_model.py promotes a new one.
+clusterer = ModelWatcher(ModelRegistry(REGISTRY_DIR), "clustering", load_clusterer, fallback_dir=".").start()
 
 app = FastAPI(title="System Metrics Clustering API")
 
 class InputData(BaseModel):
+    host: str = "default"  # metric stream the row belongs to; rolling features are kept per host
     cpu: float
     ram: float
     disk: float
@@ -18,51 +116,63 @@ class InputData(BaseModel):
 
 @app.post("/predict")
 def predict_cluster(data: InputData):
-    X = [[data.cpu, data.ram, data.disk, data.net_sent, data.net_recv]]
-    X_scaled = scaler.transform(X)
-    cluster = int(model.predict(X_scaled)[0])
-    return {"assigned_cluster": cluster}
+    X = np.array([[data.cpu, data.ram, data.disk, data.net_sent, data.net_recv]])
+    clusters, meanings = clusterer.model(X, [data.host])
+    return {"assigned_cluster": int(clusters[0]), "meaning": None if meanings is None else str(meanings[0])}
+
+def parse_batch(body: bytes, content_type: str) -> np.ndarray:
+    """Decodes a batch request body into an (n_rows, 5) float array in FEATURES order."""
+    try:
+        if content_type.startswith(NPY_TYPE) or content_type.startswith("application/octet-stream"):
+            # NumPy .npy: a 2-D array with one row per sample, columns in FEATURES order
+            X = np.load(io.BytesIO(body), allow_pickle=False)
+        elif content_type.startswith(ARROW_TYPE):
+            if pa is None:
+                raise HTTPException(status_code=415, detail="Arrow input needs pyarrow installed on the server")
+            table = pa.ipc.open_stream(body).read_all()
+            X = np.column_stack([table.column(f).to_numpy() for f in FEATURES])
+        else:
+            # JSON columnar: {"cpu": [...], "ram": [...], "disk": [...], "net_sent": [...], "net_recv": [...]}
+            columns = json.loads(body)
+            X = np.column_stack([np.asarray(columns[f], dtype=np.float64) for f in FEATURES])
+    except HTTPException:
+        raise
+    except (KeyError, ValueError, TypeError) as e:
+        raise HTTPException(status_code=422, detail=f"Invalid batch: {e}")
+    except Exception as e:  # malformed .npy / Arrow payloads
+        raise HTTPException(status_code=400, detail=f"Could not decode batch: {e}")
+
+    X = np.asarray(X, dtype=np.float64)
+    if X.ndim != 2 or X.shape[1] != len(FEATURES):
+        raise HTTPException(status_code=422, detail=f"Expected shape (n, {len(FEATURES)}), got {X.shape}")
+    return X
+
+@app.post("/predict/batch")
+async def predict_batch(request: Request):
+    """
+    Scores many samples in one vectorized call.
+    Accepts JSON columnar arrays, a .npy array (application/x-npy) or an
+    Arrow IPC stream; answers JSON, or .npy when the Accept header asks for it.
+    """
+    X = parse_batch(await request.body(), request.headers.get("content-type", "application/json"))
+    if len(X) == 0:
+        clusters, meanings = np.empty(0, dtype=np.int32), np.empty(0, dtype=str)
+    else:
+        clusters, meanings = clusterer.model(X)  # a batch is a series of its own
+        clusters = clusters.astype(np.int32)
+
+    if NPY_TYPE in request.headers.get("accept", ""):
+        buffer = io.BytesIO()
+        np.save(buffer, clusters, allow_pickle=False)
+        return Response(content=buffer.getvalue(), media_type=NPY_TYPE)
+    return {"assigned_clusters": clusters.tolist(),
+            "meanings": None if meanings is None else meanings.tolist(),
+            "count": len(clusters)}
+
+@app.get("/model")
+def model_info():
+    """Version and manifest of the model being served."""
+    return {"version": clusterer.version, "manifest": clusterer.manifest}
 
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
-
-## with defined cluster name 
-# from fastapi import FastAPI
-# import joblib
-# from pydantic import BaseModel
-# import uvicorn
-# import numpy as np
-
-# # Load saved model, scaler, and cluster labels
-# model = joblib.load("best_cluster_model.pkl")
-# scaler = joblib.load("scaler.pkl")
-# cluster_labels = joblib.load("cluster_labels.pkl")
-
-# app = FastAPI(title="System Metrics Clustering API")
-
-# class InputData(BaseModel):
-#     cpu: float
-#     ram: float
-#     disk: float
-#     net_sent: float
-#     net_recv: float
-
-# @app.post("/predict")
-# def predict_cluster(data: InputData):
-#     X_new = np.array([[data.cpu, data.ram, data.disk, data.net_sent, data.net_recv]])
-#     X_scaled = scaler.transform(X_new)
-
-#     # Some clustering models (like Agglomerative) do not support predict()
-#     if hasattr(model, "predict"):
-#         cluster = int(model.predict(X_scaled)[0])
-#     else:
-#         # Workaround for models without predict(): fit to existing + new input
-#         combined = np.vstack([scaler.transform(X_new)])  # only new input
-#         cluster = int(model.fit_predict(combined)[0])
-
-#     meaning = cluster_labels.get(cluster, "Unknown")
-
-#     return {"cluster": cluster, "meaning": meaning}
-
-# if __name__ == "__main__":
-#     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,305 @@
+"""
+streaming_train.py
+
+Streaming training mode for the clustering model: reads metric history in
+chunks and updates a StandardScaler (partial_fit) and a MiniBatchKMeans
+(partial_fit) chunk by chunk, so memory stays flat however long the history.
+
+Input formats (by file extension):
+
+  - .jsonl / .ndjson   one JSON object per line; resumed by byte offset, and
+                       followed as new lines are appended (--follow)
+  - .csv               read with pandas in chunks; resumed by row count
+  - .parquet           read by record batches (needs pyarrow)
+  - .json              a JSON array such as system_metrics.json; this is
+                       loaded whole, so convert long histories to JSON lines
+
+With USE_FEATURE_PIPELINE (train_model.py) the model is trained on the
+same counter rates and rolling features as train_model.py; each file is its
+own series, and its last raw rows carry the rolling windows across chunks.
+
+State (scaler, centroids, read position and feature tail of every file) is
+checkpointed atomically every --checkpoint-every chunks; a restarted run continues from
+the checkpoint instead of starting over. With --publish the model is exported
+(fused NumPy artifact + pickles) to the model registry, which predict_api.py
+hot-reloads.
+
+    python streaming_train.py history.jsonl --publish
+    python streaming_train.py history.jsonl --follow --publish-every 60   # keeps learning
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.preprocessing import StandardScaler
+
+DEMO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # modules shared by anomaly/ and clustering/
+if DEMO_DIR not in sys.path:
+    sys.path.append(DEMO_DIR)
+from model_registry import ModelRegistry
+from feature_pipeline import PIPELINE_FILE, FeaturePipeline
+from train_model import REGISTRY_DIR, USE_FEATURE_PIPELINE, export_cluster_inference, name_clusters, optimal_k
+
+try:
+    import pyarrow.parquet as pq  # Optional: Parquet input
+except ImportError:
+    pq = None
+
+FEATURES = ["cpu", "ram", "disk", "net_sent", "net_recv"]
+CHUNK_ROWS = 10_000
+CHECKPOINT = "streaming_checkpoint.joblib"
+
+
+# --- Chunked readers: yield (DataFrame, position after the chunk) ---
+def _read_jsonl(path, chunk_rows, position):
+    with open(path, "rb") as f:
+        f.seek(position)
+        while True:
+            rows = []
+            while len(rows) < chunk_rows:
+                line = f.readline()
+                if not line.endswith(b"\n"):  # end of file, or a line still being written
+                    f.seek(-len(line), os.SEEK_CUR)
+                    break
+                if line.strip():
+                    rows.append(json.loads(line))
+            if not rows:
+                return
+            yield pd.DataFrame.from_records(rows), f.tell()
+
+
+def _read_csv(path, chunk_rows, position):
+    reader = pd.read_csv(path, usecols=FEATURES, chunksize=chunk_rows,
+                         skiprows=range(1, position + 1) if position else None)
+    for chunk in reader:
+        position += len(chunk)
+        yield chunk, position
+
+
+def _read_parquet(path, chunk_rows, position):
+    if pq is None:
+        raise ImportError("Parquet input needs pyarrow installed")
+    seen = 0
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows, columns=FEATURES):
+        start, seen = seen, seen + batch.num_rows
+        if seen <= position:
+            continue
+        yield batch.slice(max(position - start, 0)).to_pandas(), seen
+
+
+def _read_json_array(path, chunk_rows, position):
+    print(f"[warn] {path} is a JSON array and is loaded whole; use JSON lines for long histories")
+    with open(path, "r") as f:
+        data = json.load(f)
+    for start in range(position, len(data), chunk_rows):
+        yield pd.DataFrame.from_records(data[start:start + chunk_rows]), min(start + chunk_rows, len(data))
+
+
+READERS = {".jsonl": _read_jsonl, ".ndjson": _read_jsonl, ".csv": _read_csv,
+           ".parquet": _read_parquet, ".json": _read_json_array}
+
+
+def read_chunks(path, chunk_rows=CHUNK_ROWS, position=0):
+    """
+    Reads a metric history file in chunks.
+
+    Args:
+        path (str): .jsonl / .ndjson, .csv, .parquet or .json file.
+        chunk_rows (int): Rows per chunk.
+        position (int): Where to resume (byte offset for JSON lines, row count otherwise).
+
+    Yields:
+        tuple[pd.DataFrame, int]: The chunk and the position after it.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in READERS:
+        raise ValueError(f"Unsupported history format {ext!r}; use one of {sorted(READERS)}")
+    yield from READERS[ext](path, chunk_rows, position)
+
+
+class StreamingClusterer:
+    """
+    StandardScaler + MiniBatchKMeans trained incrementally.
+
+    The scaler keeps changing while data streams in, so before every scaler
+    update the centroids are converted to raw units and back afterwards:
+    clusters stay where they are in metric space instead of drifting with
+    the scaling.
+
+    Args:
+        n_clusters (int): Number of clusters.
+        batch_size (int): MiniBatchKMeans mini-batch size.
+        random_state (int): Seed for reproducible centroids.
+        use_pipeline (bool): Train on FeaturePipeline features instead of raw values.
+    """
+
+    def __init__(self, n_clusters=optimal_k, batch_size=1024, random_state=42, use_pipeline=USE_FEATURE_PIPELINE):
+        self.features = list(FEATURES)
+        self.pipeline = FeaturePipeline(self.features) if use_pipeline else None
+        self.model_features = self.pipeline.feature_names_ if self.pipeline is not None else self.features
+        self.scaler = StandardScaler()
+        self.kmeans = MiniBatchKMeans(n_clusters=n_clusters, batch_size=batch_size,
+                                      random_state=random_state, n_init=3)
+        self.positions = {}  # absolute file path -> read position
+        self.tails = {}  # absolute file path -> last raw rows, the context of its next chunk's features
+        self.rows_seen = 0
+        self._pending = np.empty((0, len(self.model_features)))  # rows held back until k are available
+
+    @property
+    def fitted(self):
+        return hasattr(self.kmeans, "cluster_centers_")
+
+    def partial_fit(self, df, source=None):
+        """Updates the scaler and the centroids with one chunk of metrics (the next rows of `source`)."""
+        X = df[self.features].to_numpy(dtype=np.float64)
+        X = X[np.isfinite(X).all(axis=1)]
+        if self.pipeline is not None and len(X):
+            tail = self.tails.get(source)
+            self.tails[source] = (X if tail is None else np.vstack([tail, X]))[-self.pipeline.context_rows:]
+            X = self.pipeline.transform(X, tail=tail)
+        if not self.fitted:
+            # The first MiniBatchKMeans call needs at least n_clusters rows.
+            X = np.vstack([self._pending, X])
+            if len(X) < self.kmeans.n_clusters:
+                self._pending = X
+                return self
+            self._pending = X[:0]
+        if not len(X):
+            return self
+
+        if self.fitted:
+            raw_centers = self.scaler.inverse_transform(self.kmeans.cluster_centers_)
+        self.scaler.partial_fit(X)
+        if self.fitted:
+            self.kmeans.cluster_centers_ = self.scaler.transform(raw_centers)
+        self.kmeans.partial_fit(self.scaler.transform(X))
+        self.rows_seen += len(X)
+        return self
+
+    def train_file(self, path, chunk_rows=CHUNK_ROWS, on_chunk=None):
+        """
+        Trains on a history file from its last read position.
+
+        Args:
+            path (str): History file.
+            chunk_rows (int): Rows per chunk.
+            on_chunk (callable | None): Called after every chunk (e.g. checkpointing).
+
+        Returns:
+            int: Number of chunks read.
+        """
+        key = os.path.abspath(path)
+        chunks = 0
+        for chunk, position in read_chunks(path, chunk_rows, self.positions.get(key, 0)):
+            self.partial_fit(chunk, key)
+            self.positions[key] = position
+            chunks += 1
+            if on_chunk:
+                on_chunk()
+        return chunks
+
+    def save_checkpoint(self, path=CHECKPOINT):
+        """Writes the state to a temporary file and swaps it in with os.replace."""
+        state = {"scaler": self.scaler, "kmeans": self.kmeans, "positions": self.positions,
+                 "rows_seen": self.rows_seen, "pending": self._pending, "tails": self.tails,
+                 "pipeline": self.pipeline.config() if self.pipeline is not None else None}
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix=".ckpt-")
+        os.close(fd)
+        try:
+            joblib.dump(state, tmp)
+            os.replace(tmp, path)
+        except BaseException:
+            os.remove(tmp)
+            raise
+
+    @classmethod
+    def load_checkpoint(cls, path=CHECKPOINT):
+        """Restores a model saved by save_checkpoint()."""
+        state = joblib.load(path)
+        pipeline = state.get("pipeline")  # checkpoints without one were trained on raw values
+        model = cls(n_clusters=state["kmeans"].n_clusters, use_pipeline=False)
+        if pipeline is not None:
+            model.pipeline = FeaturePipeline(**pipeline)
+            model.model_features = model.pipeline.feature_names_
+        model.scaler, model.kmeans = state["scaler"], state["kmeans"]
+        model.positions, model.rows_seen, model._pending = state["positions"], state["rows_seen"], state["pending"]
+        model.tails = state.get("tails", {})
+        return model
+
+    def publish(self, registry_dir=REGISTRY_DIR):
+        """Exports the model as a new promoted version of "clustering" in the registry."""
+        training_stats = {
+            "n_samples": self.rows_seen,
+            "feature_mean": dict(zip(self.model_features, self.scaler.mean_.tolist())),
+            "feature_std": dict(zip(self.model_features, self.scaler.scale_.tolist())),
+            "sources": self.positions,
+        }
+        centers = self.kmeans.cluster_centers_
+        cluster_labels = dict(enumerate(name_clusters(self.scaler.inverse_transform(centers), self.model_features)))
+        registry = ModelRegistry(registry_dir)
+        with registry.publish("clustering", self.features, training_stats, best_model="MiniBatchKMeans",
+                              training_mode="streaming", cluster_labels=cluster_labels,
+                              model_features=list(self.model_features)) as version_dir:
+            joblib.dump(self.scaler, os.path.join(version_dir, "scaler.pkl"))
+            joblib.dump(self.kmeans, os.path.join(version_dir, "best_cluster_model.pkl"))
+            export_cluster_inference(np.arange(len(centers)), centers, self.scaler, self.model_features,
+                                     os.path.join(version_dir, "cluster_inference.npz"), model_name="MiniBatchKMeans")
+            if self.pipeline is not None:
+                self.pipeline.save(os.path.join(version_dir, PIPELINE_FILE))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the clustering model on metric history in chunks.")
+    parser.add_argument("sources", nargs="+", help="History files (.jsonl, .csv, .parquet, .json)")
+    parser.add_argument("--clusters", type=int, default=optimal_k, help="Number of clusters (new runs only)")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS, help="Rows per chunk")
+    parser.add_argument("--checkpoint", default=CHECKPOINT, help="Checkpoint file (resumed if it exists)")
+    parser.add_argument("--checkpoint-every", type=int, default=10, help="Chunks between checkpoints")
+    parser.add_argument("--fresh", action="store_true", help="Ignore an existing checkpoint")
+    parser.add_argument("--follow", action="store_true", help="Keep reading data appended to the sources")
+    parser.add_argument("--poll", type=float, default=5.0, help="Seconds between checks for new data (--follow)")
+    parser.add_argument("--publish", action="store_true", help="Publish to the model registry when done")
+    parser.add_argument("--publish-every", type=int, default=0,
+                        help="Also publish every N chunks (0: only at the end); implies --publish")
+    args = parser.parse_args()
+
+    if os.path.exists(args.checkpoint) and not args.fresh:
+        model = StreamingClusterer.load_checkpoint(args.checkpoint)
+        print(f"Resumed from {args.checkpoint}: {model.rows_seen:,} rows seen")
+    else:
+        model = StreamingClusterer(n_clusters=args.clusters)
+
+    chunks = 0
+    def on_chunk():
+        global chunks
+        chunks += 1
+        if chunks % args.checkpoint_every == 0:
+            model.save_checkpoint(args.checkpoint)
+        if args.publish_every and chunks % args.publish_every == 0 and model.fitted:
+            model.publish()
+
+    start = time.perf_counter()
+    try:
+        while True:
+            new_chunks = sum(model.train_file(src, args.chunk_rows, on_chunk) for src in args.sources)
+            if new_chunks:
+                elapsed = time.perf_counter() - start
+                print(f"{model.rows_seen:,} rows in {chunks} chunks ({model.rows_seen / elapsed:,.0f} rows/s)")
+            if not args.follow:
+                break
+            time.sleep(args.poll)
+    except KeyboardInterrupt:
+        print("Stopping...")
+    finally:
+        model.save_checkpoint(args.checkpoint)
+        print(f"Checkpoint saved to {args.checkpoint}")
+
+    if model.fitted and (args.publish or args.publish_every):
+        model.publish()
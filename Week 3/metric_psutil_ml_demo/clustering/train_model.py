@@ -1,131 +1,226 @@
 import json
+import os
 import pandas as pd
 import matplotlib.pyplot as plt
 from sklearn.cluster import KMeans, AgglomerativeClustering, DBSCAN
 from sklearn.preprocessing import StandardScaler
-from sklearn.metrics import silhouette_score, davies_bouldin_score
 from sklearn.decomposition import PCA
 import joblib
 import numpy as np
+import shutil
+import sys
 
-JSON_FILE = "system_metrics.json"
-
-# Load data
-with open(JSON_FILE, "r") as f:
-    data = json.load(f)
-
-df = pd.DataFrame(data)
-X = df[["cpu", "ram", "disk", "net_sent", "net_recv"]]
+DEMO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # modules shared by anomaly/ and clustering/
+if DEMO_DIR not in sys.path:
+    sys.path.append(DEMO_DIR)
+from model_registry import ModelRegistry
+from model_selection import Candidate, select_models
+from feature_pipeline import PIPELINE_FILE, FeaturePipeline
 
-# -------------------------------
-# Standardization
-# -------------------------------
-scaler = StandardScaler()
-X_scaled = scaler.fit_transform(X)
+JSON_FILE = "system_metrics.json"
+REGISTRY_DIR = "registry"  # watched by predict_api.py
+WORKERS = os.cpu_count()   # processes for model selection
+MAX_QUADRATIC_ROWS = 10_000  # Agglomerative / DBSCAN need O(n^2) memory; fit them on a sample
+USE_FEATURE_PIPELINE = True  # counter rates + rolling mean/std/slope instead of raw values
 
-# -------------------------------
-# Elbow Method for KMeans
-# -------------------------------
-inertias = []
 K_range = range(2, 8)
-
-for k in K_range:
-    km = KMeans(n_clusters=k, random_state=42, n_init=10)
-    km.fit(X_scaled)
-    inertias.append(km.inertia_)
-
-plt.figure(figsize=(6, 4))
-plt.plot(K_range, inertias, marker="o")
-plt.title("Elbow Method for Optimal k (KMeans)")
-plt.xlabel("Number of Clusters (k)")
-plt.ylabel("Inertia (WCSS)")
-plt.show()
-
 optimal_k = 3  # You can pick based on the elbow curve
 
-# -------------------------------
-# Try Multiple Models
-# -------------------------------
-models = {
-    "KMeans": KMeans(n_clusters=optimal_k, random_state=42, n_init=10),
-    "Agglomerative": AgglomerativeClustering(n_clusters=optimal_k),
-    "DBSCAN": DBSCAN(eps=1.5, min_samples=3),
-}
-
-results = []
-
-for name, model in models.items():
-    labels = model.fit_predict(X_scaled)
-
-    if len(set(labels)) > 1:
-        sil = silhouette_score(X_scaled, labels)
-        db = davies_bouldin_score(X_scaled, labels)
-    else:
-        sil, db = -1, 999  # Poor scores if only 1 cluster
-
-    results.append(
-        {"model": name, "object": model, "labels": labels, "silhouette": sil, "davies_bouldin": db}
-    )
-
-# -------------------------------
-# Pick Best Model (High Silhouette, Low DB)
-# -------------------------------
-best_model = sorted(results, key=lambda x: (-x["silhouette"], x["davies_bouldin"]))[0]
-
-print("\n🔹 Model Comparison:")
-for r in results:
-    print(f"{r['model']}: clusters={len(set(r['labels']))}, silhouette={r['silhouette']:.3f}, db={r['davies_bouldin']:.3f}")
-
-print(f"\n✅ Best Model Selected: {best_model['model']}")
-
-# # Compute cluster meaning based on avg CPU & RAM
-# cluster_stats = pd.DataFrame({"cluster": best_model["labels"]})
-# cluster_stats["cpu"] = X["cpu"]
-# cluster_stats["ram"] = X["ram"]
-
-# cluster_means = cluster_stats.groupby("cluster")[["cpu", "ram"]].mean()
-
-# cluster_labels = {}
-# sorted_clusters = cluster_means.sort_values(["cpu", "ram"], ascending=True).index.tolist()
-
-# for i, cluster in enumerate(sorted_clusters):
-#     if i == 0:
-#         cluster_labels[int(cluster)] = "Idle"
-#     elif i == 1:
-#         cluster_labels[int(cluster)] = "Moderate Load"
-#     else:
-#         cluster_labels[int(cluster)] = "High Load"
-
-# print("\nCluster Labels Mapping:", cluster_labels)
-
-# # Save model, scaler, and cluster labels
-# joblib.dump(scaler, "scaler.pkl")
-# joblib.dump(best_model["object"], "best_cluster_model.pkl")
-# joblib.dump(cluster_labels, "cluster_labels.pkl")
-
-# print("✅ Model, Scaler, and Cluster Labels saved!")
-
-
+CLUSTER_NAMES = ["Idle", "Moderate Load", "High Load"]  # by ascending mean CPU, then RAM
 
 # -------------------------------
-# Save Best Model + Scaler
+# Cluster Centroids + Meaning
 # -------------------------------
-joblib.dump(scaler, "scaler.pkl")
-joblib.dump(best_model["object"], "best_cluster_model.pkl")
-print("Model saved as best_cluster_model.pkl and scaler.pkl")
+def cluster_centroids(model, X_scaled, labels):
+    """
+    Centroid table of a fitted clustering model, in scaled units.
+
+    KMeans keeps its own centroids, so nearest-centroid assignment is exactly
+    its predict(). Models without centroids or predict() (Agglomerative,
+    DBSCAN) get the mean of each cluster's rows, with DBSCAN noise (-1) left
+    out; nearest-centroid then approximates them in constant time per row.
+    """
+    if hasattr(model, "cluster_centers_"):
+        return np.arange(len(model.cluster_centers_)), model.cluster_centers_
+    cluster_ids = np.unique(labels[labels >= 0])
+    return cluster_ids, np.array([X_scaled[labels == i].mean(axis=0) for i in cluster_ids])
+
+def name_clusters(centers, features):
+    """Idle / Moderate Load / High Load by ascending centroid CPU, then RAM (extra clusters are High Load)."""
+    features = list(features)
+    cpu, ram = centers[:, features.index("cpu")], centers[:, features.index("ram")]
+    names = [""] * len(centers)
+    for rank, i in enumerate(np.lexsort((ram, cpu))):
+        names[i] = CLUSTER_NAMES[min(rank, len(CLUSTER_NAMES) - 1)]
+    return names
 
 # -------------------------------
-# PCA for Visualization
+# Export Fused NumPy Inference Artifact
 # -------------------------------
-pca = PCA(n_components=2)
-X_pca = pca.fit_transform(X_scaled)
-df_pca = pd.DataFrame(X_pca, columns=["PC1", "PC2"])
-df_pca["cluster"] = best_model["labels"]
-
-plt.figure(figsize=(7, 5))
-plt.scatter(df_pca["PC1"], df_pca["PC2"], c=df_pca["cluster"], cmap="viridis", s=60)
-plt.xlabel("PC1")
-plt.ylabel("PC2")
-plt.title(f"Cluster Visualization (PCA 2D) - {best_model['model']}")
-plt.colorbar(label="Cluster")
-plt.show()
+def export_cluster_inference(cluster_ids, centers, scaler, features, path="cluster_inference.npz", model_name=""):
+    """
+    Folds the scaler into a centroid table and saves a labelled, NumPy-only artifact.
+
+    Distance in scaled space, sum(((x - mean) / scale - c) ** 2), equals
+    sum(w * (x - C) ** 2) with raw-unit centroids C = mean + scale * c and
+    weights w = 1 / scale ** 2. Dropping the per-row term sum(w * x ** 2),
+    which is the same for every centroid, leaves one matrix product:
+        cluster = cluster_ids[argmin(bias - 2 * X @ weight_matrix)]
+
+    Returns:
+        dict: Cluster id -> meaning ("Idle", "Moderate Load", "High Load").
+    """
+    centers = scaler.mean_ + scaler.scale_ * centers
+    weights = 1.0 / scaler.scale_ ** 2
+    cluster_names = name_clusters(centers, features)
+    np.savez(
+        path,
+        weight_matrix=(centers * weights).T,
+        bias=(weights * centers ** 2).sum(axis=1),
+        features=np.array(features, dtype=str),
+        cluster_ids=np.asarray(cluster_ids, dtype=np.int64),
+        cluster_names=np.array(cluster_names, dtype=str),
+        centers=centers,
+        model=np.array(model_name, dtype=str),
+    )
+    print(f"Labelled centroid inference artifact saved as {path}")
+    return {int(i): name for i, name in zip(cluster_ids, cluster_names)}
+
+def main():
+    # Load data
+    with open(JSON_FILE, "r") as f:
+        data = json.load(f)
+
+    df = pd.DataFrame(data)
+    X = df[["cpu", "ram", "disk", "net_sent", "net_recv"]]
+    input_features = list(X.columns)
+
+    # -------------------------------
+    # Feature Engineering (optional)
+    # -------------------------------
+    # Saved with the model; predict_api.py computes the same features online.
+    artifacts = ["scaler.pkl", "best_cluster_model.pkl", "cluster_inference.npz"]
+    if USE_FEATURE_PIPELINE:
+        pipeline = FeaturePipeline(input_features)
+        X = pd.DataFrame(pipeline.transform(X), columns=pipeline.feature_names_)
+        pipeline.save(PIPELINE_FILE)
+        artifacts.append(PIPELINE_FILE)
+        print(f"Engineered {len(pipeline.feature_names_)} features from {input_features}")
+    elif os.path.exists(PIPELINE_FILE):
+        os.remove(PIPELINE_FILE)  # the unversioned model no longer uses it
+
+    # -------------------------------
+    # Standardization
+    # -------------------------------
+    scaler = StandardScaler()
+    X_scaled = scaler.fit_transform(X)
+
+    # -------------------------------
+    # Candidate Models (fitted in parallel)
+    # -------------------------------
+    # The elbow sweep and the model comparison share one process pool; on large
+    # data every candidate is screened on a sample first and clearly inferior
+    # ones are dropped before the full fit (see model_selection.py).
+    kmeans_name = f"KMeans(k={optimal_k})"
+    candidates = [
+        # The elbow compares every k on the same rows, so no k is screened out by silhouette.
+        Candidate(f"KMeans(k={k})", KMeans, {"n_clusters": k, "random_state": 42, "n_init": 10}, keep=True)
+        for k in K_range
+    ]
+    candidates += [
+        Candidate("Agglomerative", AgglomerativeClustering, {"n_clusters": optimal_k}, max_rows=MAX_QUADRATIC_ROWS),
+        Candidate("DBSCAN", DBSCAN, {"eps": 1.5, "min_samples": 3}, max_rows=MAX_QUADRATIC_ROWS),
+    ]
+    selection = select_models(candidates, X_scaled, workers=WORKERS)
+
+    # -------------------------------
+    # Elbow Method for KMeans
+    # -------------------------------
+    sweep = [selection[f"KMeans(k={k})"] for k in K_range]
+    inertias = [r["inertia"] / r["n_rows"] for r in sweep]
+
+    plt.figure(figsize=(6, 4))
+    plt.plot(K_range, inertias, marker="o")
+    plt.title("Elbow Method for Optimal k (KMeans)")
+    plt.xlabel("Number of Clusters (k)")
+    plt.ylabel("Inertia per sample (WCSS / n)")
+    plt.show()
+
+    # -------------------------------
+    # Pick Best Model (High Silhouette, Low DB)
+    # -------------------------------
+    results = [selection[name] for name in (kmeans_name, "Agglomerative", "DBSCAN")
+               if not selection[name]["dropped"]]
+    best_model = sorted(results, key=lambda x: (-x["silhouette"], x["davies_bouldin"]))[0]
+
+    print("\n🔹 Model Comparison:")
+    for r in results:
+        print(f"{r['model']}: clusters={r['clusters']}, silhouette={r['silhouette']:.3f}, db={r['davies_bouldin']:.3f}")
+
+    print(f"\n✅ Best Model Selected: {best_model['model']}")
+
+    # -------------------------------
+    # Save Best Model + Scaler
+    # -------------------------------
+    joblib.dump(scaler, "scaler.pkl")
+    joblib.dump(best_model["object"], "best_cluster_model.pkl")
+    print("Model saved as best_cluster_model.pkl and scaler.pkl")
+
+    # -------------------------------
+    # Labelled Centroid Table (served by predict_api.py)
+    # -------------------------------
+    # Any selected model is served by nearest centroid, so models without
+    # predict() (Agglomerative, DBSCAN) no longer need a refit per request.
+    serving = best_model
+    X_best = X_scaled if best_model["rows"] is None else X_scaled[best_model["rows"]]
+    cluster_ids, centers = cluster_centroids(best_model["object"], X_best, best_model["labels"])
+    if not len(cluster_ids):  # e.g. DBSCAN marked every row as noise
+        serving = selection[kmeans_name]
+        cluster_ids, centers = cluster_centroids(serving["object"], None, None)
+    cluster_labels = export_cluster_inference(cluster_ids, centers, scaler, X.columns, model_name=serving["model"])
+    print("\nCluster Labels Mapping:", cluster_labels)
+
+    # -------------------------------
+    # PCA for Visualization
+    # -------------------------------
+    pca = PCA(n_components=2)
+    X_pca = pca.fit_transform(X_scaled)
+    if best_model["rows"] is not None:  # fitted on a sample: plot the rows it labelled
+        X_pca = X_pca[best_model["rows"]]
+    df_pca = pd.DataFrame(X_pca, columns=["PC1", "PC2"])
+    df_pca["cluster"] = best_model["labels"]
+
+    plt.figure(figsize=(7, 5))
+    plt.scatter(df_pca["PC1"], df_pca["PC2"], c=df_pca["cluster"], cmap="viridis", s=60)
+    plt.xlabel("PC1")
+    plt.ylabel("PC2")
+    plt.title(f"Cluster Visualization (PCA 2D) - {best_model['model']}")
+    plt.colorbar(label="Cluster")
+    plt.show()
+
+    # -------------------------------
+    # Publish to the Model Registry
+    # -------------------------------
+    # predict_api.py hot-reloads the promoted version, so retraining needs no restart.
+    training_stats = {
+        "n_samples": len(X),
+        "feature_mean": dict(zip(X.columns, scaler.mean_.tolist())),
+        "feature_std": dict(zip(X.columns, scaler.scale_.tolist())),
+        "models": [
+            {"model": r["model"], "stage": r["stage"], "rows": r["n_rows"], "clusters": r["clusters"],
+             "silhouette": r["silhouette"], "davies_bouldin": r["davies_bouldin"],
+             "screen_silhouette": r["screen"]["silhouette"] if r["screen"] else None,
+             "fit_seconds": round(r["fit_seconds"], 3), "fit_peak_mb": round(r["fit_peak_mb"], 1),
+             "dropped": r["dropped"]}
+            for r in selection.values()
+        ],
+    }
+    registry = ModelRegistry(REGISTRY_DIR)
+    with registry.publish("clustering", input_features, training_stats, best_model=serving["model"],
+                          cluster_labels=cluster_labels, model_features=list(X.columns)) as version_dir:
+        for artifact in artifacts:
+            shutil.copy2(artifact, version_dir)
+
+# Worker processes import this module, so training only runs when executed as a script.
+if __name__ == "__main__":
+    main()
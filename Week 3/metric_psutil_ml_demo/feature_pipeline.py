@@ -0,0 +1,203 @@
+"""
+feature_pipeline.py
+
+Rolling-window features for the metric models, computed the same way for
+bulk training and for online serving.
+
+  - Counters (net_sent / net_recv are cumulative MB since boot) become
+    per-sample rates, "net_sent_rate". A negative step means the counter was
+    reset (reboot), and the rate is then the counter value itself. The first
+    row of a series has rate 0.
+  - For every window size w, each rolled column gets a rolling mean, standard
+    deviation and least-squares slope (per sample) over the last w rows,
+    "cpu_mean_6". The first w-1 rows of a series use the rows available.
+
+Everything is vectorized with sliding_window_view. transform() runs over
+blocks of BLOCK_ROWS rows, and each block gets the last max(windows) raw rows
+before it as context (the "tail"). Online serving is the same call:
+OnlineFeatures keeps the tail of the stream between batches and passes it to
+transform(). A row therefore gets identical features whether it was scored
+live or recomputed in bulk for training. SeriesStreams keeps one such state
+per series id (host), so rows from different machines are never mixed.
+
+    pipeline = FeaturePipeline(["cpu", "ram", "net_sent", "net_recv"], windows=(6, 30))
+    F = pipeline.transform(X)            # training: (n, len(pipeline.feature_names_))
+    pipeline.save("feature_pipeline.json")
+
+    stream = FeaturePipeline.load("feature_pipeline.json").stream()
+    F_new = stream.update(X_new)         # serving: rows in arrival order
+
+    streams = SeriesStreams(pipeline)
+    F_new = streams.update(["web-1", "db-1", "web-1"], X_new)  # serving: rows of several hosts
+"""
+import json
+import threading
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+PIPELINE_FILE = "feature_pipeline.json"  # saved next to the model artifacts
+COUNTERS = ("net_sent", "net_recv")
+WINDOWS = (6, 30)   # rows; 30 s and 2.5 min at the collector's 5 s interval
+STATS = ("mean", "std", "slope")
+BLOCK_ROWS = 16_384  # bounds the (rows, columns, window) temporaries
+MAX_SERIES = 10_000  # stream states kept by SeriesStreams; the least recently seen is dropped
+
+
+class FeaturePipeline:
+    """
+    Counter rates plus rolling mean / std / slope features.
+
+    Args:
+        features (list[str]): Raw input columns, in input order.
+        counters (tuple[str]): Inputs that are cumulative counters (turned into rates).
+        rolled (list[str] | None): Columns after the rate step that get rolling
+            features (None: all of them).
+        windows (tuple[int]): Rolling window sizes in rows.
+    """
+
+    def __init__(self, features, counters=COUNTERS, rolled=None, windows=WINDOWS):
+        self.features = list(features)
+        self.counters = [c for c in counters if c in self.features]
+        self.windows = sorted(int(w) for w in windows)
+        if not self.windows or self.windows[0] < 2:
+            raise ValueError(f"Rolling windows must be at least 2 rows, got {windows}")
+        self.base_names_ = [f"{f}_rate" if f in self.counters else f for f in self.features]
+        self.rolled = list(self.base_names_ if rolled is None else rolled)
+        unknown = set(self.rolled) - set(self.base_names_)
+        if unknown:
+            raise ValueError(f"Cannot roll {sorted(unknown)}; choose from {self.base_names_}")
+        self._counter_idx = [self.features.index(c) for c in self.counters]
+        self._rolled_idx = [self.base_names_.index(c) for c in self.rolled]
+        self.feature_names_ = self.base_names_ + [
+            f"{col}_{stat}_{w}" for w in self.windows for stat in STATS for col in self.rolled
+        ]
+
+    @property
+    def context_rows(self):
+        """Raw rows of history a new row's features depend on, besides itself."""
+        return self.windows[-1]
+
+    def config(self):
+        return {"features": self.features, "counters": self.counters,
+                "rolled": self.rolled, "windows": self.windows}
+
+    def save(self, path=PIPELINE_FILE):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.config(), f, indent=2)
+
+    @classmethod
+    def load(cls, path=PIPELINE_FILE):
+        with open(path, encoding="utf-8") as f:
+            return cls(**json.load(f))
+
+    def stream(self):
+        """A fresh OnlineFeatures state for serving."""
+        return OnlineFeatures(self)
+
+    def transform(self, X, tail=None):
+        """
+        Features for consecutive raw rows.
+
+        Args:
+            X (array-like): (n, len(features)) raw rows in time order.
+            tail (np.ndarray | None): Up to context_rows raw rows that came
+                directly before X (None: X starts the series).
+
+        Returns:
+            np.ndarray: (n, len(feature_names_)) features.
+        """
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim != 2 or X.shape[1] != len(self.features):
+            raise ValueError(f"Expected shape (n, {len(self.features)}), got {X.shape}")
+        tail = X[:0] if tail is None else np.asarray(tail, dtype=np.float64)[-self.context_rows:]
+        out = np.empty((len(X), len(self.feature_names_)))
+        for start in range(0, len(X), BLOCK_ROWS):
+            block = X[start:start + BLOCK_ROWS]
+            out[start:start + len(block)] = self._compute(np.vstack([tail, block]))[len(tail):]
+            tail = np.vstack([tail, block])[-self.context_rows:]
+        return out
+
+    def _compute(self, B):
+        """Features for every row of B, treating B's first row as the start of the series."""
+        base = B.copy()
+        if self._counter_idx:
+            counters = B[:, self._counter_idx]
+            steps = np.diff(counters, axis=0, prepend=counters[:1])
+            base[:, self._counter_idx] = np.where(steps < 0, counters, steps)
+
+        Y = base[:, self._rolled_idx]
+        columns = [base]
+        for w in self.windows:
+            # (rows, columns, w) windows; the first w-1 rows are padded with NaN.
+            padded = np.concatenate([np.full((w - 1, Y.shape[1]), np.nan), Y])
+            window = sliding_window_view(padded, w, axis=0)
+            valid = ~np.isnan(window)
+            count = valid.sum(axis=-1)
+            mean = np.where(valid, window, 0.0).sum(axis=-1) / count
+            dev = np.where(valid, window - mean[..., None], 0.0)
+            std = np.sqrt((dev ** 2).sum(axis=-1) / count)
+            t = np.arange(w, dtype=np.float64)
+            t_dev = np.where(valid, t - (valid * t).sum(axis=-1, keepdims=True) / count[..., None], 0.0)
+            t_var = (t_dev ** 2).sum(axis=-1)
+            slope = np.divide((t_dev * dev).sum(axis=-1), t_var, out=np.zeros_like(mean), where=t_var > 0)
+            columns += [mean, std, slope]
+        return np.hstack(columns)
+
+
+class OnlineFeatures:
+    """
+    Incremental FeaturePipeline state for one metric stream: a ring of the
+    last context_rows raw rows. update() is thread-safe; rows must arrive in
+    time order.
+    """
+
+    def __init__(self, pipeline):
+        self.pipeline = pipeline
+        self.tail = np.empty((0, len(pipeline.features)))
+        self._lock = threading.Lock()
+
+    def update(self, X):
+        """Features for the next rows of the stream."""
+        X = np.asarray(X, dtype=np.float64)
+        with self._lock:
+            features = self.pipeline.transform(X, tail=self.tail)
+            self.tail = np.vstack([self.tail, X])[-self.pipeline.context_rows:]
+        return features
+
+
+class SeriesStreams:
+    """
+    One OnlineFeatures state per series id (e.g. the host a row came from), so
+    counter rates and rolling windows never mix rows of different series.
+    States are created on first use; beyond max_series the least recently
+    updated series is forgotten and starts over like a new series.
+    """
+
+    def __init__(self, pipeline, max_series=MAX_SERIES):
+        self.pipeline = pipeline
+        self.max_series = max_series
+        self._streams = {}  # insertion order: least recently updated first
+        self._lock = threading.Lock()
+
+    def _stream(self, series_id):
+        with self._lock:
+            stream = self._streams.pop(series_id, None) or self.pipeline.stream()
+            self._streams[series_id] = stream
+            if len(self._streams) > self.max_series:
+                del self._streams[next(iter(self._streams))]
+            return stream
+
+    def update(self, series, X):
+        """
+        Features for rows of one or more series, in input row order.
+        series[i] names the series of X[i]; each series' rows continue its stream
+        in the order they appear.
+        """
+        X = np.asarray(X, dtype=np.float64)
+        out = np.empty((len(X), len(self.pipeline.feature_names_)))
+        ids, inverse = np.unique(np.asarray(series, dtype=object), return_inverse=True)
+        for i, series_id in enumerate(ids):
+            rows = np.flatnonzero(inverse == i)
+            out[rows] = self._stream(series_id).update(X[rows])
+        return out
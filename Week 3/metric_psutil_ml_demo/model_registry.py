@@ -0,0 +1,256 @@
+"""
+model_registry.py
+
+Small local model registry with versioned artifacts and hot reload.
+
+Layout (one directory per model name):
+
+    registry/
+      clustering/
+        v0001/  scaler.pkl  cluster_inference.npz  manifest.json
+        v0002/  ...
+        CURRENT            <- name of the live version, e.g. "v0002"
+
+  - publish() writes a new version into a staging directory and renames it
+    into place only when it is complete, so readers never see half-written
+    files. manifest.json holds the feature order, training stats and a
+    SHA-256 content hash over all artifact files.
+  - promote() switches CURRENT with os.replace, which is atomic: a reader
+    sees either the old or the new version, never a mix.
+  - ModelWatcher polls CURRENT from a background thread, loads and verifies
+    a newly promoted version, then swaps the served model in one reference
+    assignment. Requests in flight keep the model they started with, so
+    retraining needs no restart and drops no requests.
+
+    registry = ModelRegistry("registry")
+    with registry.publish("clustering", features, {"n_samples": 500}) as version_dir:
+        joblib.dump(scaler, os.path.join(version_dir, "scaler.pkl"))
+
+    watcher = ModelWatcher(registry, "clustering", load_fn).start()
+    watcher.model(...)   # always the current version
+"""
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+MANIFEST = "manifest.json"
+CURRENT = "CURRENT"
+VERSION_PATTERN = re.compile(r"^v(\d{4,})$")
+
+
+def content_hash(directory):
+    """SHA-256 over the names and bytes of all artifact files (manifest excluded)."""
+    digest = hashlib.sha256()
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        if name == MANIFEST or not os.path.isfile(path):
+            continue
+        digest.update(name.encode("utf-8") + b"\0")
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def _atomic_write(path, text):
+    """Writes text to path via a temporary file and os.replace."""
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+class ModelRegistry:
+    """
+    Versioned model artifacts on the local filesystem.
+
+    Args:
+        root (str): Registry directory (created on first publish).
+    """
+
+    def __init__(self, root="registry"):
+        self.root = root
+
+    def _model_dir(self, name):
+        return os.path.join(self.root, name)
+
+    def versions(self, name):
+        """Published versions of a model, oldest first."""
+        directory = self._model_dir(name)
+        if not os.path.isdir(directory):
+            return []
+        return sorted((v for v in os.listdir(directory) if VERSION_PATTERN.match(v)),
+                      key=lambda v: int(v[1:]))
+
+    def current(self, name):
+        """The promoted version of a model, or None if nothing is promoted yet."""
+        try:
+            with open(os.path.join(self._model_dir(name), CURRENT), encoding="utf-8") as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def path(self, name, version=None):
+        """Directory of a version (default: the current one)."""
+        version = version or self.current(name)
+        if version is None:
+            raise FileNotFoundError(f"No promoted version of {name!r} in {self.root}")
+        return os.path.join(self._model_dir(name), version)
+
+    def manifest(self, name, version=None):
+        """The manifest of a version (default: the current one)."""
+        with open(os.path.join(self.path(name, version), MANIFEST), encoding="utf-8") as f:
+            return json.load(f)
+
+    def verify(self, name, version=None):
+        """True if the artifact files still match the hash in the manifest."""
+        return content_hash(self.path(name, version)) == self.manifest(name, version)["content_hash"]
+
+    @contextmanager
+    def publish(self, name, features, training_stats=None, promote=True, **metadata):
+        """
+        Publishes a new version; yields a staging directory to write the artifacts into.
+
+        Args:
+            name (str): Model name, e.g. "clustering".
+            features (list[str]): Input feature order expected by the model.
+            training_stats (dict | None): JSON-serializable stats of the training run.
+            promote (bool): Make the new version current right away.
+            **metadata: Extra JSON-serializable manifest fields.
+
+        The version becomes visible only after the with-block succeeds;
+        on an exception the staging directory is removed.
+        """
+        model_dir = self._model_dir(name)
+        os.makedirs(model_dir, exist_ok=True)
+        staging = tempfile.mkdtemp(dir=model_dir, prefix=".staging-")
+        try:
+            yield staging
+            manifest = {
+                "name": name,
+                "features": list(features),
+                "training_stats": training_stats or {},
+                "created_at": datetime.now().isoformat(timespec="seconds"),
+                "files": sorted(f for f in os.listdir(staging) if f != MANIFEST),
+                "content_hash": content_hash(staging),
+                **metadata,
+            }
+            # Numbering is racy between concurrent publishers, so retry on a taken name.
+            while True:
+                existing = self.versions(name)
+                version = f"v{(int(existing[-1][1:]) + 1) if existing else 1:04d}"
+                manifest["version"] = version
+                with open(os.path.join(staging, MANIFEST), "w", encoding="utf-8") as f:
+                    json.dump(manifest, f, indent=2)
+                try:
+                    os.rename(staging, os.path.join(model_dir, version))
+                    break
+                except OSError:
+                    if not os.path.exists(os.path.join(model_dir, version)):
+                        raise
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        print(f"Published {name} {version} ({manifest['content_hash'][:12]})")
+        if promote:
+            self.promote(name, version)
+
+    def promote(self, name, version):
+        """Atomically makes `version` the current version of `name`."""
+        if not os.path.isfile(os.path.join(self._model_dir(name), version, MANIFEST)):
+            raise FileNotFoundError(f"{name} {version} is not a published version")
+        _atomic_write(os.path.join(self._model_dir(name), CURRENT), version + "\n")
+        print(f"Promoted {name} {version}")
+
+    def prune(self, name, keep=5):
+        """Deletes old versions, keeping the newest `keep` and the current one."""
+        current = self.current(name)
+        for version in self.versions(name)[:-keep]:
+            if version != current:
+                shutil.rmtree(os.path.join(self._model_dir(name), version), ignore_errors=True)
+
+
+class ModelWatcher:
+    """
+    Serves the current version of a registry model and hot-swaps it on promotion.
+
+    Args:
+        registry (ModelRegistry): The registry to watch.
+        name (str): Model name.
+        loader (callable): loader(directory, manifest) -> model object; manifest
+            is None for the fallback directory.
+        poll_seconds (float): How often CURRENT is checked.
+        fallback_dir (str | None): Directory with unversioned artifacts, used
+            while the registry has no promoted version.
+    """
+
+    def __init__(self, registry, name, loader, poll_seconds=2.0, fallback_dir=None):
+        self.registry = registry
+        self.name = name
+        self.loader = loader
+        self.poll_seconds = poll_seconds
+        self.fallback_dir = fallback_dir
+        self.model = None
+        self.version = None
+        self.manifest = None
+        self._rejected = None  # last version that failed to load (versions are immutable)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _load(self, version):
+        manifest = self.registry.manifest(self.name, version)
+        directory = self.registry.path(self.name, version)
+        if content_hash(directory) != manifest["content_hash"]:
+            raise ValueError(f"{self.name} {version}: content hash does not match the manifest")
+        model = self.loader(directory, manifest)
+        # One reference assignment each: readers see the old or the new model, never None.
+        self.model, self.manifest, self.version = model, manifest, version
+        print(f"Serving {self.name} {version}")
+
+    def refresh(self):
+        """Loads the current version if it changed; returns True on a swap."""
+        version = self.registry.current(self.name)
+        if version is None or version in (self.version, self._rejected):
+            return False
+        try:
+            self._load(version)
+        except Exception:
+            self._rejected = version
+            raise
+        return True
+
+    def start(self):
+        """Loads the model once (raising on failure) and starts the polling thread."""
+        if not self.refresh():
+            if self.fallback_dir is None:
+                raise FileNotFoundError(f"No promoted version of {self.name!r} in {self.registry.root}")
+            self.model = self.loader(self.fallback_dir, None)
+            print(f"Serving {self.name} from {os.path.abspath(self.fallback_dir)} (registry is empty)")
+        self._thread = threading.Thread(target=self._poll, name=f"{self.name}-watcher", daemon=True)
+        self._thread.start()
+        return self
+
+    def _poll(self):
+        while not self._stop.wait(self.poll_seconds):
+            try:
+                self.refresh()
+            except Exception as e:  # a bad version must not take down the live one
+                print(f"Keeping {self.name} {self.version}: could not load new version ({e})")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
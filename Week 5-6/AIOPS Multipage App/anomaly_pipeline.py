@@ -0,0 +1,182 @@
+"""
+anomaly_pipeline.py
+
+Reusable IsolationForest scoring pipeline: fit once, persist, then score new
+data in vectorized batches.
+
+  - The model file stores a hash of the feature schema (column names, order
+    and the model's effective parameters, e.g. n_estimators after a refit).
+    Loading with a different schema fails instead of silently scoring the
+    wrong columns.
+  - Scoring runs in batches spread over n_jobs threads (tree traversal in
+    scikit-learn releases the GIL), so large frames never need one huge
+    temporary array.
+  - refit() uses warm_start: it adds trees trained on new data and keeps the
+    existing ones, instead of training a new forest from scratch.
+
+    pipeline = load_or_fit("models/cpu_iforest.joblib", ["Value"], training_df)
+    scored = pipeline.score(df)          # adds Anomaly_Score and Anomaly columns
+"""
+import hashlib
+import json
+import os
+from datetime import datetime
+
+import joblib
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.ensemble import IsolationForest
+
+BATCH_SIZE = 50_000  # rows per scoring batch
+
+
+def schema_hash(features, params):
+    """Hash of the feature list (names and order) and the model parameters."""
+    payload = json.dumps({"features": list(features), "params": params}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+class AnomalyPipeline:
+    """
+    IsolationForest over a fixed list of feature columns.
+
+    Args:
+        features (list[str]): Columns used as model input, in this order.
+        contamination (float): Expected share of anomalies in the training data.
+        n_estimators (int): Number of trees in the first fit.
+        n_jobs (int): Parallel jobs for fitting and batch scoring (-1: all cores).
+        random_state (int): Seed for reproducible forests.
+    """
+
+    def __init__(self, features, contamination=0.05, n_estimators=100, n_jobs=-1, random_state=42):
+        self.features = list(features)
+        self.params = {"contamination": contamination, "n_estimators": n_estimators,
+                       "random_state": random_state}
+        self.n_jobs = n_jobs
+        self.model = None
+        self.trained_at = None
+
+    @property
+    def schema_hash(self):
+        return schema_hash(self.features, self.params)
+
+    @staticmethod
+    def effective_params(model, params):
+        """The values of `params`' keys as the fitted model actually has them."""
+        model_params = model.get_params()
+        return {key: model_params[key] for key in params}
+
+    def _matrix(self, df):
+        missing = [f for f in self.features if f not in df.columns]
+        if missing:
+            raise ValueError(f"Missing feature columns: {missing}")
+        return df[self.features].to_numpy(dtype=np.float64)
+
+    def fit(self, df):
+        """
+        Trains a new forest on df[features].
+
+        Returns:
+            AnomalyPipeline: self, for chaining.
+        """
+        self.model = IsolationForest(warm_start=True, n_jobs=self.n_jobs, **self.params)
+        self.model.fit(self._matrix(df))
+        self.trained_at = datetime.now().isoformat()
+        return self
+
+    def refit(self, df, extra_estimators=50):
+        """
+        Warm-start re-fit: adds `extra_estimators` trees trained on df and keeps
+        the existing trees. The anomaly threshold is re-estimated on df.
+        """
+        if self.model is None:
+            return self.fit(df)
+        self.model.n_estimators += extra_estimators
+        self.model.fit(self._matrix(df))
+        self.params = self.effective_params(self.model, self.params)  # the hash covers the new tree count
+        self.trained_at = datetime.now().isoformat()
+        return self
+
+    def score_array(self, X, batch_size=BATCH_SIZE):
+        """
+        Anomaly scores of a feature matrix (negative = anomaly), scored in batches.
+
+        Args:
+            X (np.ndarray): Rows x features, columns in self.features order.
+            batch_size (int): Rows per batch.
+
+        Returns:
+            np.ndarray: decision_function score per row.
+        """
+        if self.model is None:
+            raise RuntimeError("Pipeline is not fitted; call fit() or load().")
+        batches = [X[i:i + batch_size] for i in range(0, len(X), batch_size)]
+        if len(batches) <= 1:
+            return self.model.decision_function(X)
+        # One batch per task; threads suffice because tree traversal releases the GIL.
+        scores = Parallel(n_jobs=self.n_jobs, prefer="threads")(
+            delayed(self.model.decision_function)(batch) for batch in batches)
+        return np.concatenate(scores)
+
+    def score(self, df, batch_size=BATCH_SIZE):
+        """
+        Returns a copy of df with Anomaly_Score and Anomaly (True for outliers) columns.
+        """
+        scores = self.score_array(self._matrix(df), batch_size)
+        # decision_function < 0 is exactly what predict() reports as -1.
+        return df.assign(Anomaly_Score=scores, Anomaly=scores < 0)
+
+    def save(self, path):
+        """Persists the model together with its feature schema and hash."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        joblib.dump({
+            "model": self.model,
+            "features": self.features,
+            "params": self.params,
+            "schema_hash": self.schema_hash,
+            "trained_at": self.trained_at,
+        }, path)
+
+    @classmethod
+    def load(cls, path, features=None, n_jobs=-1):
+        """
+        Loads a saved pipeline.
+
+        Args:
+            path (str): File written by save().
+            features (list[str] | None): Expected features; raises ValueError if
+                the saved schema differs.
+            n_jobs (int): Parallel jobs for scoring.
+
+        Returns:
+            AnomalyPipeline: The loaded pipeline.
+        """
+        saved = joblib.load(path)
+        params = cls.effective_params(saved["model"], saved["params"])
+        if schema_hash(saved["features"], params) != saved["schema_hash"]:
+            raise ValueError(f"{path}: stored schema hash does not match its contents")
+        if features is not None and list(features) != saved["features"]:
+            raise ValueError(f"{path}: model was trained on {saved['features']}, expected {list(features)}")
+        pipeline = cls(saved["features"], n_jobs=n_jobs, **params)
+        pipeline.model = saved["model"]
+        pipeline.model.n_jobs = n_jobs
+        pipeline.trained_at = saved["trained_at"]
+        return pipeline
+
+
+def load_or_fit(path, features, training_data, **params):
+    """
+    Loads the pipeline at `path` if it matches `features` and `params`,
+    otherwise fits it on training_data (a DataFrame, or a function returning one) and saves it.
+    """
+    expected = AnomalyPipeline(features, **params)
+    if os.path.exists(path):
+        try:
+            pipeline = AnomalyPipeline.load(path, features, expected.n_jobs)
+            if pipeline.schema_hash == expected.schema_hash:
+                return pipeline
+        except Exception as e:  # stale, corrupt or unpicklable (e.g. other sklearn version): retrain below
+            print(f"Refitting {path}: {e!r}")
+    df = training_data() if callable(training_data) else training_data
+    expected.fit(df).save(path)
+    return expected
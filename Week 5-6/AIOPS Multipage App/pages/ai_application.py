@@ -4,7 +4,16 @@ import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
-from sklearn.ensemble import IsolationForest
+import os
+import sys
+from anomaly_pipeline import load_or_fit
+
+COMMON_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "common")  # modules shared by the course apps
+if COMMON_DIR not in sys.path:
+    sys.path.append(COMMON_DIR)
+from downsample import downsample_frame
+
+MODEL_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "models", "ai_application_iforest.joblib")
 
 st.set_page_config(
     page_title="AI Application in AIOps",
@@ -69,17 +78,19 @@ def generate_complex_metric_data(num_points=200, anomaly_type='spike'):
     return df, anomalies_indices
 
 # --- Anomaly Detection with IsolationForest ---
-def detect_anomalies_ml(df, column):
-    # Train IsolationForest model
+@st.cache_resource(show_spinner="Loading the anomaly model...")
+def get_anomaly_pipeline():
+    # Trained once on a long stretch of normal behaviour (no injected anomalies) and saved;
+    # every interaction and session reuses it instead of retraining.
     # contamination: The proportion of outliers in the dataset.
     # A small value (e.g., 0.01-0.05) is often a good starting point for general anomaly detection.
-    model = IsolationForest(contamination=0.05, random_state=42)
-    model.fit(df[[column]])
+    return load_or_fit(MODEL_PATH, ["Value"],
+                       lambda: generate_complex_metric_data(5000, anomaly_type=None)[0],
+                       contamination=0.01, n_jobs=-1)
 
-    # Predict anomalies (-1 for outliers, 1 for inliers)
-    df['Anomaly_Score'] = model.decision_function(df[[column]])
-    df['Anomaly'] = model.predict(df[[column]]) == -1
-    return df
+def detect_anomalies_ml(df):
+    # Adds Anomaly_Score (negative for outliers) and Anomaly columns
+    return get_anomaly_pipeline().score(df)
 
 # User controls for simulation
 num_points = st.slider("Number of data points:", 100, 500, 200, 50)
@@ -90,12 +101,13 @@ anomaly_choice = st.selectbox(
 
 if st.button("Run ML Anomaly Detection"):
     df_data, true_anomalies_indices = generate_complex_metric_data(num_points, anomaly_choice)
-    df_results = detect_anomalies_ml(df_data, 'Value')
+    df_results = detect_anomalies_ml(df_data)
 
     st.subheader("Results:")
 
     fig, ax = plt.subplots(figsize=(14, 7))
-    sns.lineplot(x='Timestamp', y='Value', data=df_results, ax=ax, label='Metric Value', color='blue')
+    df_plot = downsample_frame(df_results, 'Value', x_col='Timestamp')  # LTTB to the chart width
+    sns.lineplot(x='Timestamp', y='Value', data=df_plot, ax=ax, label='Metric Value', color='blue')
 
     # Highlight detected anomalies
     detected_anomalies = df_results[df_results['Anomaly']]
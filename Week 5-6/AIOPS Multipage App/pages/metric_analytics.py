@@ -4,6 +4,8 @@ import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
+import time
+from robust_zscore import detect_anomalies_robust
 
 st.set_page_config(
     page_title="Metric Analytics Demo",
@@ -50,13 +52,14 @@ def generate_metric_data(num_points=100, anomaly_start=70, anomaly_duration=5, a
 def detect_anomalies_zscore(df, column, threshold=2.5):
     mean = df[column].mean()
     std = df[column].std()
-    df['Z_Score'] = (df[column] - mean) / std
-    df['Anomaly'] = np.abs(df['Z_Score']) > threshold
-    return df
+    z_score = (df[column] - mean) / std
+    return df.assign(Z_Score=z_score, Anomaly=np.abs(z_score) > threshold)
 
 num_data_points = st.slider("Number of data points to simulate:", 50, 200, 100)
 anomaly_position = st.slider("Position of anomaly (approx. % of data):", 10, 90, 70)
 anomaly_strength = st.slider("Anomaly strength (magnitude):", 0.1, 1.0, 0.5)
+detection_method = st.selectbox("Detection method:", ("Z-score (mean/std)", "Robust Z-score (median/MAD)"),
+                                help="The robust score uses median and MAD, which the anomaly itself cannot inflate.")
 
 df_metrics, anomaly_start_idx, anomaly_end_idx = generate_metric_data(
     num_points=num_data_points,
@@ -65,7 +68,11 @@ df_metrics, anomaly_start_idx, anomaly_end_idx = generate_metric_data(
     anomaly_magnitude=anomaly_strength
 )
 
-df_metrics_anomalies = detect_anomalies_zscore(df_metrics, 'CPU_Usage')
+if detection_method == "Robust Z-score (median/MAD)":
+    z_scores, is_anomaly = detect_anomalies_robust(df_metrics['CPU_Usage'].to_numpy())
+    df_metrics_anomalies = df_metrics.assign(Z_Score=z_scores, Anomaly=is_anomaly)
+else:
+    df_metrics_anomalies = detect_anomalies_zscore(df_metrics, 'CPU_Usage')
 
 if st.button("Generate & Analyze Metrics"):
     st.subheader("Simulated CPU Usage with Anomaly Detection:")
@@ -97,5 +104,34 @@ if st.button("Generate & Analyze Metrics"):
     In our course, you'll delve deeper into various anomaly detection algorithms and their practical applications.
     """)
 
+st.subheader("Fleet View: Scoring Many Hosts at Once")
+st.markdown("""
+With thousands of hosts, every host's CPU series becomes one row of a 2-D array (hosts x time).
+Robust z-scores for all hosts are then computed in a single vectorized NumPy call instead of one DataFrame operation per host.
+""")
+num_hosts = st.slider("Number of hosts:", 100, 10000, 1000, step=100)
+
+if st.button("Score Fleet"):
+    fleet = np.random.normal(loc=50, scale=5, size=(num_hosts, num_data_points))
+    faulty_hosts = np.random.choice(num_hosts, max(num_hosts // 100, 1), replace=False) # 1% of hosts spike
+    fleet[faulty_hosts, -5:] += np.random.uniform(20, 40, size=(len(faulty_hosts), 5))
+
+    start = time.perf_counter()
+    z_scores, is_anomaly = detect_anomalies_robust(fleet)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    anomalies_per_host = is_anomaly.sum(axis=1)
+    col_a, col_b, col_c = st.columns(3)
+    col_a.metric("Points scored", f"{fleet.size:,}")
+    col_b.metric("Scoring time", f"{elapsed_ms:.1f} ms")
+    col_c.metric("Hosts with anomalies", int((anomalies_per_host > 0).sum()))
+
+    top_hosts = np.argsort(-np.abs(z_scores).max(axis=1))[:10]
+    st.dataframe(pd.DataFrame({
+        "Host": [f"host-{i:05d}" for i in top_hosts],
+        "Max |Robust Z|": np.abs(z_scores[top_hosts]).max(axis=1).round(2),
+        "Anomalous Points": anomalies_per_host[top_hosts],
+    }), hide_index=True)
+
 st.markdown("---")
 st.markdown("© 2025 AIOps Demo. All rights reserved.")
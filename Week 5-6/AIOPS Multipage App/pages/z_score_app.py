@@ -1,10 +1,18 @@
 # aio_demo_app.py
 
+import os
+import sys
 import streamlit as st
 import pandas as pd
 import numpy as np
 import plotly.graph_objects as go
-from datetime import datetime, timedelta
+
+COMMON_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "common")  # modules shared by the course apps
+if COMMON_DIR not in sys.path:
+    sys.path.append(COMMON_DIR)
+from downsample import downsample_frame
+from rolling_stats import RollingStatsEngine
+from synthetic_metrics import SCENARIOS, generate_metric_frame
 
 st.set_page_config(layout="wide", page_icon="📊", page_title="AIOps Anomaly Detection Demo")
 
@@ -21,49 +29,25 @@ st.write(
 )
 
 # --- Data Generation Function ---
-def generate_synthetic_data(num_points=200):
-    # np.random.seed(42) # for reproducibility
-    base_cpu = np.random.normal(loc=40, scale=5, size=num_points)
-    
-    # Introduce some "normal" fluctuations
-    cpu_data = base_cpu + np.sin(np.linspace(0, 10, num_points)) * 5
-
-    # Introduce anomalies (spikes)
-    anomaly_indices = np.random.choice(num_points, 5, replace=False)
-    for idx in anomaly_indices:
-        cpu_data[idx] += np.random.uniform(20, 40) # Add significant spike
-
-    # Ensure no negative values
-    cpu_data = np.maximum(cpu_data, 0)
-    
-    timestamps = [datetime.now() - timedelta(minutes=(num_points - 1 - i) * 5) for i in range(num_points)]
-    
-    df = pd.DataFrame({
-        'timestamp': timestamps,
-        'cpu_usage': cpu_data
-    })
-    df.set_index('timestamp', inplace=True)
-    return df
+def generate_synthetic_data(num_points=200, scenarios=("spikes",)):
+    # Vectorized: timestamps from pd.date_range, anomalies injected with index masks
+    # (see synthetic_metrics.SCENARIOS for spikes, level shifts, seasonal drift and leaks)
+    return generate_metric_frame(num_points, scenarios=scenarios, column='cpu_usage', freq='5min')
 
 # --- Anomaly Detection Function (Z-score based) ---
-def detect_anomalies_zscore(df, column, threshold=2.0, window=10):
+def detect_anomalies_zscore(df, column, threshold=2.0, window=10, engine=None):
     """
     Detects anomalies using a rolling Z-score method.
+    Rolling mean / std / z-score come from `engine`, which caches them per
+    (column, window); a threshold change only re-runs the comparison.
     """
-    df_copy = df.copy()
-    
-    # Calculate rolling mean and standard deviation
-    df_copy['rolling_mean'] = df_copy[column].rolling(window=window, min_periods=1).mean()
-    df_copy['rolling_std'] = df_copy[column].rolling(window=window, min_periods=1).std()
-    
-    # Calculate Z-score
-    df_copy['z_score'] = (df_copy[column] - df_copy['rolling_mean']) / df_copy['rolling_std']
-    
+    if engine is None:
+        engine = RollingStatsEngine()
+    stats = engine.get(df, column, window)
+
     # Mark anomalies
-    # Handle NaN z_score (e.g., at beginning where std is 0 or NaN)
-    df_copy['is_anomaly'] = (np.abs(df_copy['z_score']) > threshold) & (df_copy['rolling_std'].notna()) & (df_copy['rolling_std'] != 0)
-    
-    return df_copy
+    # Points with NaN or zero rolling std (e.g. the first point) are never flagged
+    return stats.to_frame(df, threshold)
 
 # --- Streamlit UI ---
 
@@ -74,7 +58,7 @@ with col1:
     
     # State management for data regeneration
     if 'data' not in st.session_state:
-        st.session_state.data = generate_synthetic_data()
+        st.session_state.data = generate_synthetic_data(scenarios=st.session_state.get('scenarios', ['spikes']))
 
     # User input for Z-score threshold
     z_score_threshold = st.slider(
@@ -83,14 +67,18 @@ with col1:
         help="Lower threshold = more sensitive (more anomalies detected), Higher threshold = less sensitive."
     )
 
-    # Perform anomaly detection
-    df_processed = detect_anomalies_zscore(st.session_state.data, 'cpu_usage', threshold=z_score_threshold)
+    # Perform anomaly detection (rolling stats are cached across reruns; the slider only re-thresholds)
+    if 'zscore_engine' not in st.session_state:
+        st.session_state.zscore_engine = RollingStatsEngine()
+    df_processed = detect_anomalies_zscore(st.session_state.data, 'cpu_usage', threshold=z_score_threshold,
+                                           engine=st.session_state.zscore_engine)
     
     # Plotting with Plotly
     fig = go.Figure()
 
-    # Original data trace
-    fig.add_trace(go.Scatter(x=df_processed.index, y=df_processed['cpu_usage'],
+    # Original data trace (decimated to the chart width; spikes kept by min/max buckets)
+    df_plot = downsample_frame(df_processed, 'cpu_usage', method='minmax')
+    fig.add_trace(go.Scatter(x=df_plot.index, y=df_plot['cpu_usage'],
                              mode='lines', name='CPU Usage (%)', line=dict(color='blue')))
 
     # Anomalies trace
@@ -113,8 +101,10 @@ with col2:
     st.subheader("Demo Controls & Insights")
 
     st.write("Click 'Generate New Data' to see different patterns and anomalies.")
+    scenarios = st.multiselect("Scenarios", list(SCENARIOS), default=['spikes'], key='scenarios',
+                               help="Anomaly patterns injected into the simulated data.")
     if st.button("Generate New Data"):
-        st.session_state.data = generate_synthetic_data()
+        st.session_state.data = generate_synthetic_data(scenarios=scenarios)
         st.rerun()
     
     st.markdown("---")
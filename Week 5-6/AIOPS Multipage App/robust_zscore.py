@@ -0,0 +1,105 @@
+"""
+robust_zscore.py
+
+Vectorized robust z-scores for many series at once. Input is a 2-D array with
+one series per row (series x time); every row is scored against its own
+median and MAD (median absolute deviation) in a single NumPy pass:
+
+    z = 0.6745 * (x - median) / MAD          (Iglewicz & Hoaglin modified z-score)
+
+Unlike mean / std, median and MAD are not pulled up by the anomalies
+themselves, so a spike cannot hide by inflating the std. Usual threshold: 3.5.
+
+Arrays larger than memory (e.g. np.load(..., mmap_mode="r")) are scored in
+row chunks with robust_zscores_chunked / score_npy_file.
+"""
+import numpy as np
+
+MAD_SCALE = 0.6745        # makes MAD comparable to the std of normal data
+MEAN_AD_SCALE = 0.7979    # same for the mean absolute deviation (fallback when MAD is 0)
+DEFAULT_THRESHOLD = 3.5
+CHUNK_ROWS = 4096         # rows per chunk for out-of-core scoring
+
+
+def robust_zscores(values):
+    """
+    Robust z-score of every point, per row.
+
+    Args:
+        values (array-like): 2-D array (series x time); a 1-D array is one series.
+            NaN marks missing points and is ignored (its score stays NaN).
+
+    Returns:
+        np.ndarray: float64 array of the same shape with the robust z-scores.
+    """
+    x = np.asarray(values, dtype=np.float64)
+    squeeze = x.ndim == 1
+    x = np.atleast_2d(x)
+
+    has_nan = np.isnan(x).any()
+    median = np.nanmedian if has_nan else np.median
+    mean = np.nanmean if has_nan else np.mean
+
+    center = median(x, axis=1, keepdims=True)
+    deviation = np.abs(x - center)
+    mad = median(deviation, axis=1, keepdims=True) / MAD_SCALE
+    # More than half of a row equal to its median gives MAD 0; fall back to the
+    # mean absolute deviation, and to "no anomaly" (z 0) for perfectly flat rows.
+    spread = np.where(mad > 0, mad, mean(deviation, axis=1, keepdims=True) / MEAN_AD_SCALE)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z = np.where(spread > 0, (x - center) / spread, 0.0)
+    z[np.isnan(x)] = np.nan
+    return z[0] if squeeze else z
+
+
+def robust_zscores_chunked(values, chunk_rows=CHUNK_ROWS, out=None):
+    """
+    Robust z-scores computed chunk by chunk over the rows (bounded memory).
+
+    Args:
+        values (array-like): 2-D array (series x time), e.g. a np.memmap.
+        chunk_rows (int): Number of series per chunk.
+        out (np.ndarray | None): Output array (e.g. a memmap); allocated if None.
+
+    Returns:
+        np.ndarray: The robust z-scores (`out` if given).
+    """
+    if out is None:
+        out = np.empty(values.shape, dtype=np.float64)
+    for start in range(0, values.shape[0], chunk_rows):
+        out[start:start + chunk_rows] = robust_zscores(values[start:start + chunk_rows])
+    return out
+
+
+def detect_anomalies_robust(values, threshold=DEFAULT_THRESHOLD, chunk_rows=None):
+    """
+    Flags anomalies in many series at once.
+
+    Args:
+        values (array-like): 2-D array (series x time).
+        threshold (float): |robust z| above which a point is an anomaly.
+        chunk_rows (int | None): Score in chunks of this many rows (None: one pass).
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: Robust z-scores and boolean anomaly mask.
+    """
+    if chunk_rows:
+        z = robust_zscores_chunked(values, chunk_rows)
+    else:
+        z = robust_zscores(values)
+    with np.errstate(invalid="ignore"):
+        return z, np.abs(z) > threshold
+
+
+def score_npy_file(input_path, output_path, chunk_rows=CHUNK_ROWS):
+    """
+    Scores a series x time .npy file that may not fit in memory.
+
+    Reads the input with mmap_mode="r" and writes the z-scores to a .npy
+    memmap, so only one chunk of rows is in memory at a time.
+    """
+    values = np.load(input_path, mmap_mode="r")
+    out = np.lib.format.open_memmap(output_path, mode="w+", dtype=np.float64, shape=values.shape)
+    robust_zscores_chunked(values, chunk_rows, out)
+    out.flush()
+    return out
@@ -0,0 +1,240 @@
+"""
+streaming_detector.py
+
+Online version of the rolling z-score detector used by pages/z_score_app.py,
+for many series at once. Points arrive one at a time (ingest) or in
+micro-batches (ingest_batch); every point is scored against the rolling
+window of its own series that includes the point itself, exactly like
+detect_anomalies_zscore (rolling mean, sample std, |z| > threshold).
+
+State is O(window) per series and lives in a few NumPy arrays, one row per
+series (the window ring buffer plus the running mean / M2 of a sliding-window
+Welford update). A micro-batch is scored with vectorized array operations,
+so 100k series fit in one process:
+
+    detector = StreamingZScoreDetector(window=10, threshold=2.5)
+    events = detector.ingest_batch(["web01.cpu", "db01.cpu"], [41.0, 97.5])
+
+    python streaming_detector.py --series 100000 --batches 50   # benchmark
+"""
+import argparse
+import time
+
+import numpy as np
+
+RESYNC_EVERY = 1024  # points per series between exact recomputations (bounds rounding drift)
+FLAT_STD = 1e-9      # std below this (relative to |mean|) counts as a flat window
+
+
+class StreamingZScoreDetector:
+    """
+    Rolling z-score anomaly detection over many series.
+
+    Args:
+        window (int): Rolling window size per series.
+        threshold (float): |z| above which a point is an anomaly.
+        capacity (int): Initial number of series rows (grows automatically).
+    """
+
+    def __init__(self, window=10, threshold=2.5, capacity=1024):
+        if window < 2:
+            raise ValueError("window must be at least 2 (a std needs two points)")
+        self.window = int(window)
+        self.threshold = float(threshold)
+        self.series_ids = []   # row -> series id
+        self._rows = {}        # series id -> row
+        self._allocate(max(int(capacity), 1))
+
+    def _allocate(self, capacity):
+        """Creates (or grows, keeping existing rows) the per-series state arrays."""
+        old = getattr(self, "buffer", None)
+        n_old = 0 if old is None else old.shape[0]
+        buffer = np.zeros((capacity, self.window))
+        pos = np.zeros(capacity, dtype=np.int32)      # next slot in the ring buffer
+        count = np.zeros(capacity, dtype=np.int32)    # values in the window (<= window)
+        seen = np.zeros(capacity, dtype=np.int64)     # points ingested in total
+        mean = np.zeros(capacity)
+        m2 = np.zeros(capacity)                       # sum of squared deviations
+        if old is not None:
+            buffer[:n_old] = old
+            pos[:n_old], count[:n_old], seen[:n_old] = self.pos, self.count, self.seen
+            mean[:n_old], m2[:n_old] = self.mean, self.m2
+        self.buffer, self.pos, self.count, self.seen, self.mean, self.m2 = buffer, pos, count, seen, mean, m2
+
+    @property
+    def n_series(self):
+        return len(self.series_ids)
+
+    def rows_for(self, series_ids):
+        """
+        Returns the state row of every series id, registering unknown ids.
+
+        Args:
+            series_ids (list): Series identifiers (any hashable, e.g. "host.metric").
+
+        Returns:
+            np.ndarray: Row index per id.
+        """
+        rows = np.empty(len(series_ids), dtype=np.int64)
+        for i, sid in enumerate(series_ids):
+            row = self._rows.get(sid)
+            if row is None:
+                row = self._rows[sid] = len(self.series_ids)
+                self.series_ids.append(sid)
+            rows[i] = row
+        if self.n_series > self.buffer.shape[0]:
+            self._allocate(max(self.n_series, 2 * self.buffer.shape[0]))
+        return rows
+
+    def _update(self, rows, x):
+        """
+        Adds one value to each of `rows` (all distinct) and returns their mean, std and z.
+        """
+        mean, m2, count = self.mean[rows], self.m2[rows], self.count[rows]
+        slot = self.pos[rows]
+        old = self.buffer[rows, slot]
+        full = count == self.window
+        n = np.where(full, self.window, count + 1)
+
+        # Sliding-window Welford: a plain add while the window fills up,
+        # an add-and-remove-oldest update once it is full.
+        removed = np.where(full, old, 0.0)
+        new_mean = np.where(full, mean + (x - removed) / n, mean + (x - mean) / n)
+        new_m2 = np.where(full,
+                          m2 + (x - removed) * (x - new_mean + removed - mean),
+                          m2 + (x - mean) * (x - new_mean))
+
+        self.buffer[rows, slot] = x
+        self.pos[rows] = (slot + 1) % self.window
+        self.count[rows] = n
+        self.seen[rows] += 1
+        self.mean[rows] = new_mean
+        self.m2[rows] = np.maximum(new_m2, 0.0)
+
+        resync = rows[self.seen[rows] % RESYNC_EVERY == 0]
+        if len(resync):
+            self._resync(resync)
+            new_mean = self.mean[rows]
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            std = np.sqrt(self.m2[rows] / (n - 1))
+            z = (x - new_mean) / std
+        std[n < 2] = np.nan
+        # A flat window has no usable std; rounding can leave it at ~0 with a mean
+        # that is off by one ulp, so treat tiny stds like the batch version treats 0.
+        z[~(std > FLAT_STD * np.maximum(np.abs(new_mean), 1.0))] = np.nan
+        return new_mean, std, z
+
+    def _resync(self, rows):
+        """Recomputes mean / M2 of full windows exactly from their ring buffers."""
+        rows = rows[self.count[rows] == self.window]
+        window = self.buffer[rows]
+        self.mean[rows] = window.mean(axis=1)
+        self.m2[rows] = ((window - self.mean[rows, None]) ** 2).sum(axis=1)
+
+    def ingest_rows(self, rows, values, timestamps=None):
+        """
+        Scores a micro-batch given state rows (see rows_for) instead of series ids.
+
+        Args:
+            rows (array-like): Row index per point; a series may appear several times.
+            values (array-like): Metric value per point, in arrival order.
+            timestamps (array-like | None): Optional timestamp per point, copied into events.
+
+        Returns:
+            list[dict]: One event per anomalous point.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float64)
+        if not len(rows):
+            return []
+
+        # A series can appear several times in one batch. Its k-th point goes
+        # into round k, so each round updates distinct rows in arrival order.
+        order = np.argsort(rows, kind="stable")
+        sorted_rows = rows[order]
+        starts = np.flatnonzero(np.r_[True, sorted_rows[1:] != sorted_rows[:-1]])
+        group_start = np.repeat(starts, np.diff(np.r_[starts, len(rows)]))
+        rank = np.empty(len(rows), dtype=np.int64)
+        rank[order] = np.arange(len(rows)) - group_start
+
+        events = []
+        for k in range(int(rank.max()) + 1):
+            idx = np.flatnonzero(rank == k)
+            r, x = rows[idx], values[idx]
+            mean, std, z = self._update(r, x)
+            hits = np.flatnonzero(np.abs(z) > self.threshold)  # NaN z (no usable std) never hits
+            for h in hits:
+                i = idx[h]
+                events.append({
+                    "series": self.series_ids[r[h]],
+                    "timestamp": None if timestamps is None else timestamps[i],
+                    "value": float(x[h]),
+                    "rolling_mean": float(mean[h]),
+                    "rolling_std": float(std[h]),
+                    "z_score": float(z[h]),
+                })
+        return events
+
+    def ingest_batch(self, series_ids, values, timestamps=None):
+        """
+        Scores a micro-batch of points from any number of series.
+
+        Args:
+            series_ids (list): Series id per point.
+            values (array-like): Metric value per point, in arrival order.
+            timestamps (array-like | None): Optional timestamp per point.
+
+        Returns:
+            list[dict]: One event per anomalous point.
+        """
+        return self.ingest_rows(self.rows_for(series_ids), values, timestamps)
+
+    def ingest(self, series_id, value, timestamp=None):
+        """
+        Scores a single point.
+
+        Returns:
+            dict | None: The anomaly event, or None for a normal point.
+        """
+        events = self.ingest_rows(self.rows_for([series_id]), [value],
+                                  None if timestamp is None else [timestamp])
+        return events[0] if events else None
+
+    def memory_bytes(self):
+        """Bytes used by the per-series state arrays."""
+        return sum(a.nbytes for a in (self.buffer, self.pos, self.count, self.seen, self.mean, self.m2))
+
+
+def _benchmark(n_series, n_batches, window, threshold):
+    rng = np.random.default_rng(42)
+    detector = StreamingZScoreDetector(window=window, threshold=threshold, capacity=n_series)
+    rows = detector.rows_for([f"host{i:06d}.cpu" for i in range(n_series)])
+
+    n_events = 0
+    start = time.perf_counter()
+    for _ in range(n_batches):
+        values = rng.normal(40, 5, n_series)
+        spikes = rng.random(n_series) < 0.001
+        values[spikes] += rng.uniform(20, 40, spikes.sum())
+        n_events += len(detector.ingest_rows(rows, values))
+    elapsed = time.perf_counter() - start
+    points = n_series * n_batches
+    print(f"{points:,} points from {n_series:,} series in {elapsed:.2f}s "
+          f"({elapsed / points * 1e6:.3f} µs/point, {points / elapsed:,.0f} points/s)")
+    print(f"{n_events:,} anomaly events, state {detector.memory_bytes() / 1024**2:.1f} MiB")
+
+    start = time.perf_counter()
+    for i in range(1000):
+        detector.ingest("host000000.cpu", 40.0 + i % 7)
+    print(f"single-point ingest: {(time.perf_counter() - start) / 1000 * 1e6:.1f} µs/point")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the streaming z-score detector.")
+    parser.add_argument("--series", type=int, default=100_000, help="Number of concurrent series")
+    parser.add_argument("--batches", type=int, default=50, help="Micro-batches (one point per series each)")
+    parser.add_argument("--window", type=int, default=10, help="Rolling window size")
+    parser.add_argument("--threshold", type=float, default=2.5, help="Z-score threshold")
+    args = parser.parse_args()
+    _benchmark(args.series, args.batches, args.window, args.threshold)
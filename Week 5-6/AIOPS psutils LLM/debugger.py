@@ -3,7 +3,7 @@ import json
 import argparse
 import logging
 from datetime import datetime
-from system_info import collect_system_data
+from system_info import collect_system_data, get_collector_stats
 from llm_interface import query_llm
 
 # Setup logging
@@ -56,6 +56,7 @@ def main():
 
     print("[*] Collecting system information...")
     data = collect_system_data()
+    logging.info(f"Collector overhead: {get_collector_stats()}")
     if args.json:
         try:
             with open(args.json, "w", encoding="utf-8") as jf:
@@ -1,23 +1,67 @@
-
+import os
+import sys
 import psutil
 import platform
 import time
 import socket
 
-def collect_system_data():
+COMMON_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "common")  # modules shared by the course apps
+if COMMON_DIR not in sys.path:
+    sys.path.append(COMMON_DIR)
+from collector_instrumentation import ProbeRecorder, OVERHEAD_BUDGET_CPU_MS
+
+# Per-probe cost of collect_system_data(). Scanning every partition is the
+# optional probe; over budget it falls back to the root partition only.
+PROBES = ProbeRecorder(budget_cpu_ms=OVERHEAD_BUDGET_CPU_MS, expensive={"disk_usage_all"})
+
+def _disk_usage():
+    if PROBES.enabled("disk_usage_all"):
+        with PROBES.probe("disk_usage_all"):
+            return {part.mountpoint: psutil.disk_usage(part.mountpoint)._asdict()
+                    for part in psutil.disk_partitions()}
+    with PROBES.probe("disk_usage_root"):
+        root = "C:\\" if platform.system() == "Windows" else "/"
+        return {root: psutil.disk_usage(root)._asdict()}
+
+def collect_system_data(cpu_interval=1):
+    # cpu_percent(interval=cpu_interval) sleeps for the whole interval; it shows up
+    # as wall time with almost no CPU time in get_collector_stats().
+    with PROBES.cycle():
+        with PROBES.probe("cpu_percent_blocking"):
+            cpu_percent = psutil.cpu_percent(interval=cpu_interval)
+        with PROBES.probe("host_info"):
+            host_info = {
+                "platform": platform.system(),
+                "platform-release": platform.release(),
+                "hostname": socket.gethostname(),
+                "boot_time": time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(psutil.boot_time())),
+            }
+        with PROBES.probe("cpu_count"):
+            cpu_cores = psutil.cpu_count(logical=False)
+            cpu_threads = psutil.cpu_count(logical=True)
+        with PROBES.probe("memory"):
+            virtual_memory = psutil.virtual_memory()._asdict()
+            swap_memory = psutil.swap_memory()._asdict()
+        disk_usage = _disk_usage()
+        with PROBES.probe("io_counters"):
+            disk_io = psutil.disk_io_counters()._asdict()
+            net_io = psutil.net_io_counters()._asdict()
+        with PROBES.probe("pids"):
+            process_count = len(psutil.pids())
+
     return {
-        "platform": platform.system(),
-        "platform-release": platform.release(),
-        "hostname": socket.gethostname(),
-        "boot_time": time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(psutil.boot_time())),
-        "cpu_percent": psutil.cpu_percent(interval=1),
-        "cpu_cores": psutil.cpu_count(logical=False),
-        "cpu_threads": psutil.cpu_count(logical=True),
-        "virtual_memory": psutil.virtual_memory()._asdict(),
-        "swap_memory": psutil.swap_memory()._asdict(),
-        "disk_usage": {part.mountpoint: psutil.disk_usage(part.mountpoint)._asdict()
-                       for part in psutil.disk_partitions()},
-        "disk_io": psutil.disk_io_counters()._asdict(),
-        "net_io": psutil.net_io_counters()._asdict(),
-        "process_count": len(psutil.pids())
+        **host_info,
+        "cpu_percent": cpu_percent,
+        "cpu_cores": cpu_cores,
+        "cpu_threads": cpu_threads,
+        "virtual_memory": virtual_memory,
+        "swap_memory": swap_memory,
+        "disk_usage": disk_usage,
+        "disk_io": disk_io,
+        "net_io": net_io,
+        "process_count": process_count
     }
+
+def get_collector_stats():
+    """Returns the collector's own cost (wall/CPU time, allocated blocks per probe) as flat metrics."""
+    return PROBES.as_metrics()
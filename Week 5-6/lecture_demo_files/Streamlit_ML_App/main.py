@@ -22,8 +22,9 @@ col1, col2 = st.columns([0.7, 0.3])
 with col2:
     st.subheader("User inputs")
     num_points = st.slider("Number of Data Points", min_value=50, max_value=500, value=200, step=50)
+    scenarios = st.multiselect("Scenarios", list(SCENARIOS), default=['spikes'])
     if st.button("Generate New Data"):
-        st.session_state.data = generate_synthetic_data()
+        st.session_state.data = generate_synthetic_data(num_points, scenarios)
         st.rerun()
     threshold = st.slider("Z-score Threshold", min_value=1.0, max_value=3.0, value=2.0, step=0.5)
     window_size = st.slider("Rolling Window Size", min_value=5, max_value=30, value=10, step=1)
@@ -41,7 +42,11 @@ with col1:
 
     data = st.session_state.data
     
-    df_processed = detect_anomalies_zscore(st.session_state.data, 'cpu_usage', threshold)
+    # Rolling stats are cached per window across reruns; the threshold slider only re-thresholds
+    if 'zscore_engine' not in st.session_state:
+        st.session_state.zscore_engine = RollingStatsEngine()
+    df_processed = detect_anomalies_zscore(st.session_state.data, 'cpu_usage', threshold, window=window_size,
+                                           engine=st.session_state.zscore_engine)
     fig = go.Figure()
 
     # Original data trace
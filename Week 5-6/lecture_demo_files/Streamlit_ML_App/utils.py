@@ -1,48 +1,30 @@
+import os
+import sys
 import pandas as pd
-import numpy as np
-from datetime import datetime, timedelta
 
-# --- Data Generation Function ---
-def generate_synthetic_data(num_points=200):
-    # np.random.seed(42) # for reproducibility
-    base_cpu = np.random.normal(loc=40, scale=5, size=num_points)
-    
-    # Introduce some "normal" fluctuations
-    cpu_data = base_cpu + np.sin(np.linspace(0, 10, num_points)) * 5
-
-    # Introduce anomalies (spikes)
-    anomaly_indices = np.random.choice(num_points, 5, replace=False)
-    for idx in anomaly_indices:
-        cpu_data[idx] += np.random.uniform(20, 40) # Add significant spike
+COMMON_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "common")  # modules shared by the course apps
+if COMMON_DIR not in sys.path:
+    sys.path.append(COMMON_DIR)
+from rolling_stats import RollingStatsEngine
+from synthetic_metrics import SCENARIOS, generate_metric_frame
 
-    # Ensure no negative values
-    cpu_data = np.maximum(cpu_data, 0)
-    
-    timestamps = [datetime.now() - timedelta(minutes=(num_points - 1 - i) * 5) for i in range(num_points)]
-    
-    df = pd.DataFrame({
-        'timestamp': timestamps,
-        'cpu_usage': cpu_data
-    })
-    df.set_index('timestamp', inplace=True)
-    return df
+# --- Data Generation Function ---
+def generate_synthetic_data(num_points=200, scenarios=("spikes",)):
+    # Vectorized: timestamps from pd.date_range, anomalies injected with index masks
+    # (see synthetic_metrics.SCENARIOS for spikes, level shifts, seasonal drift and leaks)
+    return generate_metric_frame(num_points, scenarios=scenarios, column='cpu_usage', freq='5min')
 
 # --- Anomaly Detection Function (Z-score based) ---
-def detect_anomalies_zscore(df, column, threshold=2.0, window=10):
+def detect_anomalies_zscore(df, column, threshold=2.0, window=10, engine=None):
     """
     Detects anomalies using a rolling Z-score method.
+    Rolling mean / std / z-score come from `engine`, which caches them per
+    (column, window); a threshold change only re-runs the comparison.
     """
-    df_copy = df.copy()
-    
-    # Calculate rolling mean and standard deviation
-    df_copy['rolling_mean'] = df_copy[column].rolling(window=window, min_periods=1).mean()
-    df_copy['rolling_std'] = df_copy[column].rolling(window=window, min_periods=1).std()
-    
-    # Calculate Z-score
-    df_copy['z_score'] = (df_copy[column] - df_copy['rolling_mean']) / df_copy['rolling_std']
-    
+    if engine is None:
+        engine = RollingStatsEngine()
+    stats = engine.get(df, column, window)
+
     # Mark anomalies
-    # Handle NaN z_score (e.g., at beginning where std is 0 or NaN)
-    df_copy['is_anomaly'] = (np.abs(df_copy['z_score']) > threshold) & (df_copy['rolling_std'].notna()) & (df_copy['rolling_std'] != 0)
-    
-    return df_copy
\ No newline at end of file
+    # Points with NaN or zero rolling std (e.g. the first point) are never flagged
+    return stats.to_frame(df, threshold)
@@ -0,0 +1,255 @@
+"""
+Benchmarks anomaly detectors on the NAB corpus in data/nab.
+
+Every (series, detector) pair runs in a worker process. For each pair the
+harness records wall time, throughput (points/s), amortized latency per point
+and peak traced memory. With a NAB label file (combined_windows.json from the
+NAB repository, which is not shipped here) it also computes NAB scores for the
+standard, reward_low_FP and reward_low_FN profiles.
+
+    python benchmark_detectors.py --workers 4 --output ../data/benchmark_results.csv
+    python benchmark_detectors.py --labels combined_windows.json --detectors zscore_rolling robust_zscore
+
+The detectors mirror the configurations used elsewhere in the course; the
+original scripts train or connect to Prometheus at import time, so they are
+re-implemented here as functions of a 1-D value array returning anomaly flags.
+"""
+import argparse
+import glob
+import json
+import math
+import os
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import IsolationForest
+from sklearn.neighbors import LocalOutlierFactor
+from sklearn.preprocessing import StandardScaler
+from sklearn.svm import OneClassSVM
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "nab")
+
+# NAB scoring profiles: weights for true positives, false positives and false negatives.
+PROFILES = {
+    "standard": {"tp": 1.0, "fp": 0.11, "fn": 1.0},
+    "reward_low_FP": {"tp": 1.0, "fp": 0.22, "fn": 1.0},
+    "reward_low_FN": {"tp": 1.0, "fp": 0.11, "fn": 2.0},
+}
+PROBATION_PERCENT = 0.15  # detections in the first 15% (max 750 points) of a file are ignored
+
+
+# --- Detectors (value array -> boolean anomaly flags) ---
+def zscore_rolling(values, window=10, threshold=2.5):
+    """Rolling z-score, as in the Streamlit z-score app (pages/z_score_app.py)."""
+    s = pd.Series(values)
+    mean = s.rolling(window=window, min_periods=1).mean()
+    std = s.rolling(window=window, min_periods=1).std()
+    z = (s - mean) / std
+    return ((z.abs() > threshold) & std.notna() & (std != 0)).to_numpy()
+
+
+def zscore_global(values, threshold=2.5):
+    """Global mean/std z-score, as in pages/metric_analytics.py."""
+    std = values.std(ddof=1)
+    if not std > 0:  # flat series (e.g. art_flatline.csv)
+        return np.zeros(len(values), dtype=bool)
+    return np.abs((values - values.mean()) / std) > threshold
+
+
+def robust_zscore(values, threshold=3.5):
+    """Median/MAD modified z-score (robust_zscore.py in the Multipage App)."""
+    median = np.median(values)
+    mad = np.median(np.abs(values - median)) / 0.6745
+    if mad == 0:
+        mad = np.mean(np.abs(values - median)) / 0.7979
+    if mad == 0:
+        return np.zeros(len(values), dtype=bool)
+    return np.abs(values - median) / mad > threshold
+
+
+def _scaled(values):
+    return StandardScaler().fit_transform(values.reshape(-1, 1))
+
+
+def isolation_forest(values):
+    """IsolationForest as configured in anomaly_train_model.py (scaled input)."""
+    X = _scaled(values)
+    return IsolationForest(contamination=0.1, random_state=42).fit(X).predict(X) == -1
+
+
+def one_class_svm(values):
+    """OneClassSVM as configured in anomaly_train_model.py (scaled input)."""
+    X = _scaled(values)
+    return OneClassSVM(kernel="rbf", nu=0.1, gamma="scale").fit(X).predict(X) == -1
+
+
+def local_outlier_factor(values):
+    """LocalOutlierFactor as configured in anomaly_train_model.py (scaled input)."""
+    return LocalOutlierFactor(n_neighbors=20, contamination=0.1).fit_predict(_scaled(values)) == -1
+
+
+def analyze_anomalies_iforest(values):
+    """detect_anomalies() in analyze_anomalies.py: default IsolationForest on the raw value."""
+    return IsolationForest().fit_predict(values.reshape(-1, 1)) == -1
+
+
+DETECTORS = {
+    "zscore_rolling": zscore_rolling,
+    "zscore_global": zscore_global,
+    "robust_zscore": robust_zscore,
+    "isolation_forest": isolation_forest,
+    "one_class_svm": one_class_svm,
+    "lof": local_outlier_factor,
+    "analyze_anomalies": analyze_anomalies_iforest,
+}
+
+
+# --- NAB scoring ---
+def scaled_sigmoid(y):
+    """NAB's scaled sigmoid: ~1 at the start of a window, 0 at its end, -> -1 after it."""
+    return -1.0 if y > 3.0 else 2.0 / (1.0 + math.exp(5.0 * y)) - 1.0
+
+
+def nab_score(timestamps, flags, windows, profile):
+    """
+    NAB score of one file.
+
+    Args:
+        timestamps (np.ndarray): datetime64 timestamps of the series.
+        flags (np.ndarray): Boolean detections per point.
+        windows (list): [start, end] timestamp strings of the labelled anomaly windows.
+        profile (dict): tp / fp / fn weights.
+
+    Returns:
+        dict: raw, perfect and null scores plus TP / FP / FN counts.
+    """
+    starts = np.searchsorted(timestamps, pd.to_datetime([w[0] for w in windows]).values, side="left")
+    ends = np.searchsorted(timestamps, pd.to_datetime([w[1] for w in windows]).values, side="right") - 1
+    probation = min(math.floor(PROBATION_PERCENT * len(flags)), PROBATION_PERCENT * 5000)
+
+    score, detected, fp = 0.0, set(), 0
+    for i in np.flatnonzero(flags):
+        if i < probation:
+            continue
+        w = int(np.searchsorted(starts, i, side="right")) - 1  # last window starting at or before i
+        if w >= 0 and i <= ends[w]:
+            if w not in detected:  # only the first detection in a window counts
+                detected.add(w)
+                length = ends[w] - starts[w] + 1
+                score += profile["tp"] * scaled_sigmoid(-(ends[w] - i + 1) / length)
+        else:
+            fp += 1
+            if w >= 0:  # false positives right after a window are penalized less
+                length = ends[w] - starts[w] + 1
+                score += profile["fp"] * scaled_sigmoid((i - ends[w]) / length)
+            else:
+                score -= profile["fp"]
+    missed = len(windows) - len(detected)
+    score -= profile["fn"] * missed
+    return {
+        "raw": score,
+        "perfect": profile["tp"] * scaled_sigmoid(-1.0) * len(windows),
+        "null": -profile["fn"] * len(windows),
+        "tp": len(detected), "fp": fp, "fn": missed,
+    }
+
+
+# --- Benchmark ---
+def load_series(path):
+    df = pd.read_csv(path, parse_dates=["timestamp"])
+    return df["timestamp"].to_numpy(), df["value"].to_numpy(dtype=np.float64)
+
+
+def run_task(path, name, detector, windows=None, measure_memory=True):
+    """Runs one detector on one NAB file (inside a worker process)."""
+    timestamps, values = load_series(path)
+    detect = DETECTORS[detector]
+
+    start = time.perf_counter()
+    flags = np.asarray(detect(values), dtype=bool)
+    elapsed = time.perf_counter() - start
+
+    peak_mb = float("nan")
+    if measure_memory:  # separate run: tracing would distort the timing above
+        tracemalloc.start()
+        detect(values)
+        peak_mb = tracemalloc.get_traced_memory()[1] / 1024**2
+        tracemalloc.stop()
+
+    result = {
+        "file": name, "detector": detector, "points": len(values),
+        "seconds": elapsed, "points_per_s": len(values) / elapsed if elapsed else float("inf"),
+        "latency_us": elapsed / len(values) * 1e6, "peak_mb": peak_mb,
+        "anomalies": int(flags.sum()),
+    }
+    if windows is not None:
+        for profile_name, profile in PROFILES.items():
+            s = nab_score(timestamps, flags, windows, profile)
+            result.update({f"{profile_name}_{k}": v for k, v in s.items()})
+    return result
+
+
+def summarize(results, with_labels):
+    """Aggregates per-file results into one row per detector."""
+    df = pd.DataFrame(results)
+    summary = df.groupby("detector").agg(
+        files=("file", "count"), points=("points", "sum"), seconds=("seconds", "sum"),
+        anomalies=("anomalies", "sum"), peak_mb=("peak_mb", "max"))
+    summary["points_per_s"] = summary["points"] / summary["seconds"]
+    summary["latency_us"] = summary["seconds"] / summary["points"] * 1e6
+    if with_labels:
+        for p in PROFILES:
+            raw, perfect, null = (df.groupby("detector")[f"{p}_{k}"].sum() for k in ("raw", "perfect", "null"))
+            summary[f"nab_{p}"] = 100 * (raw - null) / (perfect - null)
+        summary = summary.sort_values("nab_standard", ascending=False)
+    else:
+        summary = summary.sort_values("points_per_s", ascending=False)
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark anomaly detectors on the NAB corpus.")
+    parser.add_argument("--data-dir", default=DATA_DIR, help="NAB data directory (category/file.csv)")
+    parser.add_argument("--labels", help="NAB combined_windows.json; enables NAB scores")
+    parser.add_argument("--detectors", nargs="+", default=list(DETECTORS), choices=list(DETECTORS))
+    parser.add_argument("--files", default="*/*.csv", help="Glob of NAB files, relative to --data-dir")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Worker processes")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the traced peak-memory run")
+    parser.add_argument("--output", help="Write per-file results to this CSV")
+    args = parser.parse_args()
+
+    labels = None
+    if args.labels:
+        with open(args.labels) as f:
+            labels = json.load(f)
+
+    paths = sorted(glob.glob(os.path.join(args.data_dir, args.files)))
+    tasks = []
+    for path in paths:
+        name = os.path.relpath(path, args.data_dir).replace(os.sep, "/")
+        windows = None if labels is None else labels.get(name, [])
+        tasks += [(path, name, d, windows, not args.no_memory) for d in args.detectors]
+    print(f"Running {len(args.detectors)} detectors on {len(paths)} NAB files ({len(tasks)} tasks, {args.workers} workers)...")
+
+    results = []
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = {pool.submit(run_task, *task): task for task in tasks}
+        for future in as_completed(futures):
+            path, name, detector = futures[future][:3]
+            try:
+                results.append(future.result())
+            except Exception as e:
+                print(f"  {detector} failed on {name}: {e}")
+
+    if not results:
+        raise SystemExit("No results.")
+    if args.output:
+        pd.DataFrame(results).sort_values(["file", "detector"]).to_csv(args.output, index=False)
+        print(f"Per-file results written to {args.output}")
+    pd.set_option("display.width", 200)
+    print(summarize(results, labels is not None).round(2).to_string())
+    if labels is None:
+        print("NAB scores skipped: pass --labels combined_windows.json from the NAB repository.")
@@ -1,11 +1,18 @@
 print("importing modules...")
 import os
+import sys
 import webbrowser
 import json
 from datetime import datetime
 import streamlit as st
 from flow_define import PromQLFlow
-import plotly.express as px
+import numpy as np
+import plotly.graph_objects as go
+
+COMMON_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "common")  # modules shared by the course apps
+if COMMON_DIR not in sys.path:
+    sys.path.append(COMMON_DIR)
+from downsample import downsample_xy
 print("modules imported successfully.")
 # --- 7. Main Orchestrator ---
 
@@ -85,19 +92,18 @@ def ui_main():
                 final_state_json = json.loads(st.session_state.final_state.model_dump_json())
                 all_results = final_state_json.get("final_prometheus_result")['data']["result"]
                 #plot metrics with line or bar chart (dowpdown option), using plotly
-                x_timestamp = [datetime.fromtimestamp(x[0]) for x in all_results[0]['values']]
-                y_metric_all = []
-                print(x_timestamp,'\n', y_metric_all)
+                # each series is decimated to the chart width before it reaches the browser
+                fig = go.Figure()
                 for result in all_results:
                     metrics = result['metric']
                     values = result['values']
-                    y_single_plot = [y[1] for y in values]
-                    y_metric_all.append(y_single_plot)
-                if st.session_state.chart_type == "line":
-                    fig = px.line(x=x_timestamp, y=y_metric_all)
-                elif st.session_state.chart_type == "bar":
-                    fig = px.bar(x=x_timestamp, y=y_metric_all)
-                    
+                    x_timestamp = np.array([datetime.fromtimestamp(x[0]) for x in values], dtype="datetime64[ns]")
+                    x_plot, y_plot = downsample_xy(x_timestamp, [y[1] for y in values])
+                    if st.session_state.chart_type == "line":
+                        fig.add_trace(go.Scatter(x=x_plot, y=y_plot, mode="lines", name=str(metrics)))
+                    elif st.session_state.chart_type == "bar":
+                        fig.add_trace(go.Bar(x=x_plot, y=y_plot, name=str(metrics)))
+
                 fig.update_layout(showlegend=False)
                 st.plotly_chart(fig)
 
@@ -0,0 +1,133 @@
+import sys
+import time
+from contextlib import contextmanager
+
+# --- Collector Self-Instrumentation ---
+# Measures what each psutil probe costs (wall time, CPU time of the calling
+# thread, net change in allocated memory blocks) and enforces an overhead
+# budget: when one collection cycle spends more CPU time than the budget, the
+# most expensive optional probe (e.g. a full process scan) is switched off.
+# It is retried after REENABLE_AFTER_CYCLES cycles; each time it blows the
+# budget again, the wait doubles (up to MAX_BACKOFF_CYCLES).
+
+OVERHEAD_BUDGET_CPU_MS = 50.0 # Max CPU time (ms) one collection cycle may use.
+REENABLE_AFTER_CYCLES = 20 # Cycles a disabled probe stays off before it is retried.
+MAX_BACKOFF_CYCLES = 640
+
+class ProbeRecorder:
+    """
+    Records per-probe cost and disables expensive probes over budget.
+
+    Args:
+        budget_cpu_ms (float): CPU time budget per collection cycle, in ms.
+        expensive (set[str]): Probe names that may be disabled automatically.
+        reenable_after (int): Cycles before a disabled probe is retried (doubles on each relapse).
+    """
+    def __init__(self, budget_cpu_ms: float = OVERHEAD_BUDGET_CPU_MS, expensive: set[str] | None = None,
+                 reenable_after: int = REENABLE_AFTER_CYCLES):
+        self.budget_cpu_ms = budget_cpu_ms
+        self.expensive = set(expensive or ())
+        self.reenable_after = reenable_after
+        self.disabled = set() # Probes switched off by the budget.
+        self._backoff = {} # Probe name -> cycles it stays off the next time it is disabled.
+        self._retry_in = {} # Disabled probe name -> cycles left until it is retried.
+        self.stats = {} # Probe name -> accumulated cost.
+        self.last_cycle = {} # Probe name -> cost in the latest cycle.
+
+    def enabled(self, name: str) -> bool:
+        return name not in self.disabled
+
+    @contextmanager
+    def probe(self, name: str):
+        """
+        Times one probe: wall time, CPU time and net allocated memory blocks.
+
+        CPU time is thread_time(), so work done by other threads of the process
+        meanwhile is not charged to the probe. The block count is the net change
+        of sys.getallocatedblocks() (allocations minus frees, can be negative),
+        not the number of allocations made.
+        """
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        blocks_start = sys.getallocatedblocks()
+        try:
+            yield
+        finally:
+            wall_ms = (time.perf_counter() - wall_start) * 1000
+            cpu_ms = (time.thread_time() - cpu_start) * 1000
+            blocks = sys.getallocatedblocks() - blocks_start
+            s = self.stats.setdefault(name, {"calls": 0, "wall_ms": 0.0, "cpu_ms": 0.0, "net_alloc_blocks": 0})
+            s["calls"] += 1
+            s["wall_ms"] += wall_ms
+            s["cpu_ms"] += cpu_ms
+            s["net_alloc_blocks"] += blocks
+            self.last_cycle[name] = {"wall_ms": wall_ms, "cpu_ms": cpu_ms, "net_alloc_blocks": blocks}
+
+    @contextmanager
+    def cycle(self):
+        """
+        Wraps one full collection; checks the overhead budget at the end.
+        """
+        self.last_cycle = {}
+        self._count_down()
+        with self.probe("total"):
+            yield
+        cpu_ms = self.last_cycle["total"]["cpu_ms"]
+        if cpu_ms <= self.budget_cpu_ms:
+            # Probes that ran within budget start over with the shortest backoff.
+            for name in self.expensive:
+                if name in self.last_cycle:
+                    self._backoff.pop(name, None)
+            return
+        # Disables the costliest expensive probe that ran in this cycle.
+        candidates = [n for n in self.expensive if n in self.last_cycle and n not in self.disabled]
+        if candidates:
+            worst = max(candidates, key=lambda n: self.last_cycle[n]["cpu_ms"])
+            wait = self._backoff.get(worst, self.reenable_after)
+            self.disabled.add(worst)
+            self._retry_in[worst] = wait
+            self._backoff[worst] = min(wait * 2, MAX_BACKOFF_CYCLES)
+            print(f"[Collector] Cycle used {cpu_ms:.1f} ms CPU (budget {self.budget_cpu_ms} ms); "
+                  f"disabling probe '{worst}' for {wait} cycles.")
+
+    def _count_down(self):
+        """
+        Re-enables disabled probes whose backoff has run out, for a trial cycle.
+        """
+        for name in list(self._retry_in):
+            if self._retry_in[name] > 0:
+                self._retry_in[name] -= 1
+                continue
+            del self._retry_in[name]
+            self.disabled.discard(name)
+            print(f"[Collector] Re-enabling probe '{name}'.")
+
+    def reset(self):
+        """
+        Re-enables all probes and clears the recorded statistics.
+        """
+        self.disabled.clear()
+        self._backoff.clear()
+        self._retry_in.clear()
+        self.stats.clear()
+        self.last_cycle = {}
+
+    def as_metrics(self, prefix: str = "collector") -> dict:
+        """
+        Exports the probe costs as flat metrics (e.g. collector_process_scan_cpu_ms).
+
+        Returns:
+            dict: Latest-cycle and cumulative cost per probe, plus disabled flags.
+        """
+        metrics = {}
+        for name, s in self.stats.items():
+            last = self.last_cycle.get(name, {})
+            metrics[f"{prefix}_{name}_calls_total"] = s["calls"]
+            metrics[f"{prefix}_{name}_wall_ms_total"] = round(s["wall_ms"], 3)
+            metrics[f"{prefix}_{name}_cpu_ms_total"] = round(s["cpu_ms"], 3)
+            metrics[f"{prefix}_{name}_net_alloc_blocks_total"] = s["net_alloc_blocks"]
+            metrics[f"{prefix}_{name}_wall_ms"] = round(last.get("wall_ms", 0.0), 3)
+            metrics[f"{prefix}_{name}_cpu_ms"] = round(last.get("cpu_ms", 0.0), 3)
+        for name in self.expensive:
+            metrics[f"{prefix}_{name}_disabled"] = int(name in self.disabled)
+        return metrics
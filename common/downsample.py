@@ -0,0 +1,139 @@
+"""
+downsample.py
+
+Server-side decimation for time series charts. A chart can only show about
+one point per horizontal pixel, so long series are reduced to a target width
+before they are handed to Plotly / Matplotlib:
+
+  - lttb:    Largest-Triangle-Three-Buckets, keeps the visual shape of the line
+  - minmax:  min and max of every bucket, keeps every spike (good for anomalies)
+
+Both return indices into the original arrays, so any column of a DataFrame
+can be selected with them.
+"""
+import numpy as np
+import pandas as pd
+
+TARGET_WIDTH = 1500  # points per chart, roughly the plot width in pixels
+
+
+def _as_float(x):
+    """Converts datetime-like or numeric x values to float64 for area math."""
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        return x.astype("datetime64[ns]").astype(np.int64).astype(np.float64)
+    return x.astype(np.float64)
+
+
+def _bucket_edges(n, n_buckets):
+    # Bucket i covers [edges[i], edges[i + 1]) of the points between first and last.
+    return np.linspace(1, n - 1, n_buckets + 1).astype(np.int64)
+
+
+def lttb_indices(x, y, n_out=TARGET_WIDTH):
+    """
+    Largest-Triangle-Three-Buckets downsampling.
+
+    Args:
+        x (array-like): X values (numeric or datetime64), ascending.
+        y (array-like): Y values.
+        n_out (int): Number of points to keep (including first and last).
+
+    Returns:
+        np.ndarray: Sorted indices of the points to keep.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = _as_float(x)
+
+    edges = _bucket_edges(n, n_out - 2)
+    starts, ends = edges[:-1], edges[1:]
+    # Average point of every bucket, computed in one pass with reduceat.
+    counts = ends - starts
+    avg_x = np.add.reduceat(x[:n - 1], starts) / counts
+    avg_y = np.add.reduceat(y[:n - 1], starts) / counts
+    # The bucket after the last one is the final point.
+    next_x = np.append(avg_x[1:], x[-1])
+    next_y = np.append(avg_y[1:], y[-1])
+
+    keep = np.empty(n_out, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        # Pick the point forming the largest triangle with the previous pick
+        # and the next bucket's average (vectorized over the bucket).
+        s, e = starts[i], ends[i]
+        area = np.abs((x[a] - next_x[i]) * (y[s:e] - y[a])
+                      - (x[a] - x[s:e]) * (next_y[i] - y[a]))
+        a = s + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
+
+
+def minmax_indices(y, n_out=TARGET_WIDTH):
+    """
+    Min/max-per-bucket decimation (fully vectorized).
+
+    Args:
+        y (array-like): Y values.
+        n_out (int): Approximate number of points to keep (two per bucket).
+
+    Returns:
+        np.ndarray: Sorted, unique indices of the points to keep.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    n_buckets = max(n_out // 2, 1)
+    if n_out >= n:
+        return np.arange(n)
+
+    size = -(-n // n_buckets)  # ceil division
+    padded = np.full(size * n_buckets, np.nan)
+    padded[:n] = y
+    blocks = padded.reshape(n_buckets, size)
+    valid = ~np.all(np.isnan(blocks), axis=1)  # trailing buckets may be pure padding
+    blocks = blocks[valid]
+    offsets = np.flatnonzero(valid) * size
+    lo = offsets + np.nanargmin(blocks, axis=1)
+    hi = offsets + np.nanargmax(blocks, axis=1)
+    return np.unique(np.concatenate(([0, n - 1], lo, hi)))
+
+
+def downsample_indices(x, y, n_out=TARGET_WIDTH, method="lttb"):
+    """Returns indices to keep with the chosen method ("lttb" or "minmax")."""
+    if method == "minmax":
+        return minmax_indices(y, n_out)
+    return lttb_indices(x, y, n_out)
+
+
+def downsample_frame(df, y_col, x_col=None, n_out=TARGET_WIDTH, method="lttb"):
+    """
+    Downsamples a DataFrame for plotting one column.
+
+    Args:
+        df (pd.DataFrame): Data sorted by x.
+        y_col (str): Column to preserve the shape of.
+        x_col (str | None): X column; the index is used when None.
+        n_out (int): Target number of points.
+        method (str): "lttb" or "minmax".
+
+    Returns:
+        pd.DataFrame: The selected rows (all columns kept).
+    """
+    if len(df) <= n_out:
+        return df
+    x = df.index.values if x_col is None else df[x_col].values
+    idx = downsample_indices(x, df[y_col].values, n_out, method)
+    return df.iloc[idx]
+
+
+def downsample_xy(x, y, n_out=TARGET_WIDTH, method="lttb"):
+    """Downsamples parallel x / y sequences and returns them as arrays."""
+    x = np.asarray(x)
+    y = pd.to_numeric(np.asarray(y), errors="coerce")
+    if len(y) <= n_out:
+        return x, y
+    idx = downsample_indices(x, y, n_out, method)
+    return x[idx], y[idx]
@@ -0,0 +1,201 @@
+"""
+rolling_stats.py
+
+Precomputed rolling statistics for z-score anomaly detection. The rolling
+mean / std / z-score of a series depend only on the data and the window, not
+on the threshold, so they are computed once per (series, window) and cached:
+
+  - RollingStats:        mean, std and |z| arrays of one series for one window
+  - RollingStatsEngine:  cache of RollingStats keyed by (column, window, method)
+
+Moving the threshold slider then only runs flags(threshold), a vectorized
+O(n) compare. New points are added online with extend(), using a sliding
+window Welford update ("rolling") or an exponentially weighted one ("ewma"),
+so a growing series never needs a full recomputation either.
+"""
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+METHODS = ("rolling", "ewma")
+
+
+def _ewma_mean_var(values, alpha):
+    """
+    Bulk EWMA mean and variance, identical to applying the online update
+    m_t = m_{t-1} + a * d,  v_t = (1 - a) * (v_{t-1} + a * d^2),  d = x_t - m_{t-1}
+    point by point, but computed with two pandas ewm passes.
+    """
+    s = pd.Series(values)
+    mean = s.ewm(alpha=alpha, adjust=False).mean().to_numpy()
+    prev_mean = np.concatenate(([values[0]], mean[:-1])) if len(values) else mean
+    # v_t = (1 - a) * v_{t-1} + a * [(1 - a) * d_t^2], an EWMA of the bracket with v_0 = 0.
+    scaled_sq = (1 - alpha) * (values - prev_mean) ** 2
+    var = pd.Series(scaled_sq).ewm(alpha=alpha, adjust=False).mean().to_numpy()
+    return mean, var
+
+
+class RollingStats:
+    """
+    Rolling mean / std / z-score of one series for one window.
+
+    Args:
+        values (array-like): The series values.
+        window (int): Rolling window size (for "ewma": the span, alpha = 2 / (window + 1)).
+        method (str): "rolling" (window mean / sample std, like pandas rolling)
+            or "ewma" (exponentially weighted mean / std).
+    """
+
+    def __init__(self, values, window, method="rolling"):
+        if method not in METHODS:
+            raise ValueError(f"method must be one of {METHODS}, got {method!r}")
+        self.window = int(window)
+        self.method = method
+        self.alpha = 2.0 / (self.window + 1)
+        values = np.asarray(values, dtype=np.float64)
+        self.values = values
+
+        if method == "rolling":
+            s = pd.Series(values)
+            self.mean = s.rolling(window=self.window, min_periods=1).mean().to_numpy()
+            self.std = s.rolling(window=self.window, min_periods=1).std().to_numpy()
+        else:
+            self.mean, var = _ewma_mean_var(values, self.alpha)
+            self.std = np.sqrt(var)
+        self._update_z(0)
+        self._init_online_state()
+
+    def _update_z(self, start):
+        """(Re)computes z and |z| from position `start` on."""
+        mean, std, values = self.mean[start:], self.std[start:], self.values[start:]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            z = (values - mean) / std
+        # Points without a usable std (first point, flat window) never count as anomalies.
+        valid = np.isfinite(std) & (std != 0)
+        abs_z = np.where(valid, np.abs(z), -np.inf)
+        if start == 0:
+            self.z, self.abs_z = z, abs_z
+        else:
+            self.z = np.concatenate((self.z[:start], z))
+            self.abs_z = np.concatenate((self.abs_z[:start], abs_z))
+
+    def _init_online_state(self):
+        """Seeds the online update from the tail of the bulk computation."""
+        if self.method == "rolling":
+            tail = self.values[-self.window:]
+            self._tail = deque(tail)
+            self._mean = float(tail.mean()) if len(tail) else 0.0
+            self._m2 = float(((tail - self._mean) ** 2).sum()) if len(tail) else 0.0
+        else:
+            self._mean = float(self.mean[-1]) if len(self.mean) else None
+            self._var = float(self.std[-1] ** 2) if len(self.std) else 0.0
+
+    def _step(self, x):
+        """Online update with one new value; returns (mean, std) including it."""
+        if self.method == "ewma":
+            if self._mean is None:
+                self._mean, self._var = x, 0.0
+            else:
+                delta = x - self._mean
+                self._mean += self.alpha * delta
+                self._var = (1 - self.alpha) * (self._var + self.alpha * delta * delta)
+            return self._mean, np.sqrt(self._var)
+
+        # Sliding-window Welford: add x, and drop the oldest value once the window is full.
+        self._tail.append(x)
+        if len(self._tail) <= self.window:
+            n = len(self._tail)
+            delta = x - self._mean
+            self._mean += delta / n
+            self._m2 += delta * (x - self._mean)
+        else:
+            old = self._tail.popleft()
+            n = self.window
+            new_mean = self._mean + (x - old) / n
+            self._m2 += (x - old) * (x - new_mean + old - self._mean)
+            self._mean = new_mean
+        self._m2 = max(self._m2, 0.0)  # rounding can leave a tiny negative value
+        std = np.sqrt(self._m2 / (n - 1)) if n > 1 else np.nan
+        return self._mean, std
+
+    def extend(self, new_values):
+        """
+        Appends new points using the online update (no recomputation of old points).
+
+        Args:
+            new_values (array-like): Values that arrived after the current series.
+        """
+        new_values = np.asarray(new_values, dtype=np.float64).ravel()
+        if not len(new_values):
+            return
+        start = len(self.values)
+        means = np.empty(len(new_values))
+        stds = np.empty(len(new_values))
+        for i, x in enumerate(new_values):
+            means[i], stds[i] = self._step(float(x))
+        self.values = np.concatenate((self.values, new_values))
+        self.mean = np.concatenate((self.mean, means))
+        self.std = np.concatenate((self.std, stds))
+        self._update_z(start)
+
+    def flags(self, threshold):
+        """
+        Anomaly flags for a threshold: a single vectorized compare on the cached |z|.
+
+        Returns:
+            np.ndarray: Boolean array, True where |z| > threshold.
+        """
+        return self.abs_z > threshold
+
+    def to_frame(self, df, threshold):
+        """
+        Returns a copy of `df` with rolling_mean, rolling_std, z_score and is_anomaly columns.
+        """
+        return df.assign(rolling_mean=self.mean, rolling_std=self.std,
+                         z_score=self.z, is_anomaly=self.flags(threshold))
+
+
+class RollingStatsEngine:
+    """
+    Caches RollingStats per (column, window, method) for a DataFrame.
+
+    Entries remember which DataFrame they were computed from; passing a
+    different DataFrame (e.g. newly generated data) recomputes them.
+    """
+
+    def __init__(self):
+        self._cache = {}
+
+    def get(self, df, column, window, method="rolling"):
+        """
+        Returns the cached RollingStats for df[column], computing them on first use.
+
+        Args:
+            df (pd.DataFrame): The data.
+            column (str): Column to analyze.
+            window (int): Rolling window size.
+            method (str): "rolling" or "ewma".
+
+        Returns:
+            RollingStats: The statistics of the column.
+        """
+        key = (column, int(window), method)
+        entry = self._cache.get(key)
+        if entry is None or entry[0] is not df or len(entry[1].values) != len(df):
+            entry = (df, RollingStats(df[column].to_numpy(), window, method))
+            self._cache[key] = entry
+        return entry[1]
+
+    def extend(self, df, column, new_values):
+        """
+        Feeds new points of df[column] to every cached window of that column.
+        `df` must already contain the new rows at its end.
+        """
+        for key, (_, stats) in list(self._cache.items()):
+            if key[0] == column:
+                stats.extend(new_values)
+                self._cache[key] = (df, stats)
+
+    def clear(self):
+        self._cache.clear()